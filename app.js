@@ -3,9 +3,46 @@ let currentNewsData = [];
 let filteredData = []; // To hold filtered list
 let currentCategory = 'all';
 
+// --- Data manifest (data/manifest.json, written by scripts/publish.py) ---
+// Maps closed data files (past day shards, finished months) to content-hashed
+// copies, which never change and are served from the HTTP cache. Everything
+// else, and the manifest itself, is fetched by its plain name and revalidated.
+let dataManifest = null;
+
+function loadDataManifest(reload = false) {
+    if (!dataManifest || reload) {
+        dataManifest = fetch('data/manifest.json', { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : { files: {} })
+            .catch(() => ({ files: {} }));
+    }
+    return dataManifest;
+}
+
+async function dataUrl(path) {
+    const manifest = await loadDataManifest();
+    return `data/${(manifest.files && manifest.files[path]) || path}`;
+}
+
+function fetchDataUrl(url, path) {
+    // A plain name may have changed since it was cached: revalidate it
+    return fetch(url, url === `data/${path}` ? { cache: 'no-cache' } : {});
+}
+
+// fetch() of a file under data/ by its plain path (e.g. 'archive/2026_02.jsonl')
+async function fetchData(path) {
+    const url = await dataUrl(path);
+    let response = await fetchDataUrl(url, path);
+    if (response.status === 404 && url !== `data/${path}`) {
+        // Copies of an older manifest are removed after a while: reload it once
+        await loadDataManifest(true);
+        response = await fetchDataUrl(await dataUrl(path), path);
+    }
+    return response;
+}
+
 async function loadNews() {
     try {
-        const response = await fetch('data/news.json?t=' + new Date().getTime());
+        const response = await fetchData('news.json');
         if (!response.ok) throw new Error('데이터를 불러올 수 없습니다.');
 
         const data = await response.json();
@@ -67,10 +104,11 @@ async function loadNews() {
                 // if (!isMobile) document.querySelector('header').style.paddingTop = '100px'; 
 
                 tickerContent.innerHTML = data.indices.map(idx => `
-                    <div class="ticker-item">
+                    <div class="ticker-item" title="${tickerDetails(idx)}">
                         <span class="ticker-name">${idx.name}</span>
                         <span class="ticker-value">${idx.value}</span>
                         <span class="ticker-change ${idx.is_up ? 'up' : 'down'}">${idx.change}</span>
+                        ${sparklineSvg(idx.sparkline, idx.is_up)}
                     </div>
                 `).join('');
 
@@ -89,6 +127,29 @@ async function loadNews() {
     }
 }
 
+// Ticker extras from the market series (older feeds don't have them)
+function sparklineSvg(points, isUp) {
+    if (!points || points.length < 2) return '';
+    const width = 60, height = 18;
+    const min = Math.min(...points);
+    const span = (Math.max(...points) - min) || 1;
+    const coords = points.map((p, i) =>
+        `${(i * width / (points.length - 1)).toFixed(1)},${(height - 1 - (p - min) / span * (height - 2)).toFixed(1)}`
+    ).join(' ');
+    return `<svg class="ticker-spark ${isUp ? 'up' : 'down'}" width="${width}" height="${height}" viewBox="0 0 ${width} ${height}" aria-hidden="true">` +
+        `<polyline points="${coords}" fill="none" stroke="currentColor" stroke-width="1.5"/></svg>`;
+}
+
+function tickerDetails(idx) {
+    const fmt = v => Number(v).toLocaleString('ko-KR', { maximumFractionDigits: 2 });
+    const parts = [];
+    if (idx.low_52w != null && idx.high_52w != null) parts.push(`52주 ${fmt(idx.low_52w)} ~ ${fmt(idx.high_52w)}`);
+    if (idx.ma20 != null) parts.push(`20일 평균 ${fmt(idx.ma20)}`);
+    if (idx.ma60 != null) parts.push(`60일 평균 ${fmt(idx.ma60)}`);
+    if (idx.volatility != null) parts.push(`변동성 ${fmt(idx.volatility)}%`);
+    return parts.join(' · ');
+}
+
 function filterNews(category) {
     currentCategory = category;
 
@@ -127,18 +188,24 @@ function filterNews(category) {
 
     if (filteredData.length === 0) {
         container.innerHTML = '<div class="loading">해당 카테고리의 뉴스가 없습니다.</div>';
-        if (loadMoreContainer) loadMoreContainer.style.display = 'none';
-        return;
     }
 
-    renderNewsItems(filteredData, container);
+    if (filteredData.length > 0) renderNewsItems(filteredData, container);
 
     // Show 'Load More' only if showing 'All' and we have enough items
     // (Simplification: Load Archive is designed to append to EVERYTHING. 
     // Filtering complex mixed lists is tricky. For now, hide Load More on filters)
+    // Other categories page through their category shard of the search index.
+    categoryDocs = null;
     if (loadMoreContainer) {
         if (category === 'all' && currentNewsData.length >= 50) {
             loadMoreContainer.style.display = 'block';
+        } else if (category !== 'all') {
+            loadMoreContainer.style.display = 'block';
+            const btn = document.getElementById('load-more-btn');
+            btn.style.display = '';
+            btn.disabled = false;
+            btn.textContent = '지난 뉴스 더 보기';
         } else {
             loadMoreContainer.style.display = 'none';
         }
@@ -154,40 +221,75 @@ function filterNews(category) {
 }
 
 
-// ... (loadNews and filterNews remain the same) ...
+// --- Archive ("Load More") from the append-only day shards ---
+let archiveBuffer = [];       // Items fetched but not yet rendered
+let archiveShardQueue = [];   // Day shard filenames not yet fetched (newest first)
+let isArchiveFetched = false; // Manifest loaded
+
+// JSONL shard under data/ (store day shards, archive month shards)
+async function fetchShard(path) {
+    const response = await fetchData(path);
+    if (!response.ok) throw new Error('아카이브를 불러올 수 없습니다.');
+
+    const text = await response.text();
+    const items = text.split('\n').filter(line => line.trim()).map(line => JSON.parse(line));
+
+    // Shards are append-only (oldest run first); show newest run first
+    // while keeping the ranked order inside a run.
+    const runs = [];
+    items.forEach(item => {
+        const lastRun = runs[runs.length - 1];
+        if (lastRun && lastRun[0].published_at === item.published_at) lastRun.push(item);
+        else runs.push([item]);
+    });
+    return runs.reverse().flat();
+}
+
+async function fillArchiveBuffer(minItems) {
+    const currentTitles = new Set(currentNewsData.map(item => item.title));
+
+    while (archiveBuffer.length < minItems && archiveShardQueue.length > 0) {
+        const items = await fetchShard(`store/${archiveShardQueue.shift()}`);
+        // Store ONLY items not already displayed
+        archiveBuffer = archiveBuffer.concat(items.filter(item => !currentTitles.has(item.title)));
+    }
+}
 
 async function loadArchive() {
     const btn = document.getElementById('load-more-btn');
     const BATCH_SIZE = 20; // Number of items to show per click
 
-    // 1. If buffer has items, just render the next batch
-    if (archiveBuffer.length > 0) {
-        renderNextBatch(btn, BATCH_SIZE);
+    // 0. Category view: page through the category shard instead
+    if (currentCategory !== 'all') {
+        await loadCategoryFromIndex(btn);
         return;
     }
 
-    // 2. If already fetched but buffer empty, it means we really have nothing left
-    if (isArchiveFetched && archiveBuffer.length === 0) {
-        btn.style.display = 'none';
+    // 1. If buffer has enough items, just render the next batch
+    if (archiveBuffer.length >= BATCH_SIZE || (isArchiveFetched && archiveShardQueue.length === 0)) {
+        if (archiveBuffer.length === 0) {
+            btn.style.display = 'none';
+            return;
+        }
+        renderNextBatch(btn, BATCH_SIZE);
         return;
     }
 
-    // 3. First time fetching archive
+    // 2. Fetch the manifest (first time) and the next day shards
     btn.textContent = '불러오는 중...';
     btn.disabled = true;
 
     try {
-        const response = await fetch('data/news_archive.json?t=' + new Date().getTime());
-        if (!response.ok) throw new Error('아카이브를 불러올 수 없습니다.');
-
-        const data = await response.json();
+        if (!isArchiveFetched) {
+            const response = await fetchData('store/manifest.json');
+            if (!response.ok) throw new Error('아카이브를 불러올 수 없습니다.');
 
-        // Deduplicate against current displayed list
-        const currentTitles = new Set(currentNewsData.map(item => item.title));
+            const manifest = await response.json();
+            archiveShardQueue = manifest.shards.map(shard => shard.filename).reverse();
+            isArchiveFetched = true;
+        }
 
-        // Store ONLY new items in the buffer
-        archiveBuffer = data.items.filter(item => !currentTitles.has(item.title));
-        isArchiveFetched = true;
+        await fillArchiveBuffer(BATCH_SIZE);
 
         if (archiveBuffer.length > 0) {
             btn.disabled = false;
@@ -229,13 +331,204 @@ function renderNextBatch(btn, batchSize) {
     }
 
     // Check if we need to hide button
-    if (archiveBuffer.length === 0) {
+    if (archiveBuffer.length === 0 && archiveShardQueue.length === 0) {
         btn.textContent = '모든 뉴스를 불러왔습니다';
         btn.disabled = true;
         setTimeout(() => { btn.style.display = 'none'; }, 2000);
     }
 }
 
+// --- Static Search Index (data/search/, built by scripts/search_index.py) ---
+let searchManifest = null;
+const searchFileCache = {};
+let categoryDocs = null;  // Doc numbers of the current category shard (newest first)
+let categoryCursor = 0;
+
+async function fetchSearchFile(name) {
+    if (!searchFileCache[name]) {
+        searchFileCache[name] = fetchData(`search/${name}`).then(response => {
+            if (!response.ok) throw new Error(`검색 인덱스를 불러올 수 없습니다. (${name})`);
+            return response.json();
+        });
+    }
+    try {
+        return await searchFileCache[name];
+    } catch (error) {
+        delete searchFileCache[name]; // Allow retry
+        throw error;
+    }
+}
+
+async function getSearchManifest() {
+    if (!searchManifest) {
+        const response = await fetchData('search/manifest.json');
+        if (!response.ok) throw new Error('검색 인덱스가 없습니다.');
+        searchManifest = await response.json();
+    }
+    return searchManifest;
+}
+
+// Must match normalize_text() in scripts/search_index.py
+function normalizeSearchText(text) {
+    return (text || '').toLowerCase().replace(/[^\p{L}\p{N}]+/gu, '');
+}
+
+// FNV-1a over code points; must match gram_bucket() in scripts/search_index.py
+function gramBucket(gram, buckets) {
+    let h = 0x811c9dc5;
+    for (const ch of gram) {
+        h = Math.imul(h ^ ch.codePointAt(0), 0x01000193) >>> 0;
+    }
+    return h % buckets;
+}
+
+async function loadSearchDocs(docNumbers) {
+    const manifest = await getSearchManifest();
+    const blocks = [...new Set(docNumbers.map(n => Math.floor(n / manifest.block_size)))];
+    const loaded = {};
+    await Promise.all(blocks.map(async block => {
+        loaded[block] = await fetchSearchFile(`docs_${block}.json`);
+    }));
+    return docNumbers.map(n => loaded[Math.floor(n / manifest.block_size)][n % manifest.block_size]);
+}
+
+async function searchNews(query) {
+    const container = document.getElementById('news-container');
+    const loadMoreContainer = document.getElementById('load-more-container');
+    const normalized = normalizeSearchText(query);
+
+    if (!normalized) {
+        filterNews(currentCategory);
+        return;
+    }
+    if (loadMoreContainer) loadMoreContainer.style.display = 'none';
+    container.innerHTML = '<div class="loading">🔍 검색 중...</div>';
+
+    try {
+        const manifest = await getSearchManifest();
+        const n = manifest.ngram;
+        const grams = new Set();
+        for (let i = 0; i + n <= [...normalized].length; i++) {
+            grams.add([...normalized].slice(i, i + n).join(''));
+        }
+        if (grams.size === 0) {
+            container.innerHTML = `<div class="loading">${n}글자 이상 입력해 주세요.</div>`;
+            return;
+        }
+
+        // Intersect posting lists, then verify the text (bigrams can over-match).
+        // Docs past manifest.sealed are only in grams_recent.json (a version 1 manifest has no sealed count).
+        const sealed = manifest.sealed ?? manifest.doc_count;
+        const recent = sealed < manifest.doc_count ? await fetchSearchFile('grams_recent.json') : {};
+        let candidates = null;
+        for (const gram of grams) {
+            const bucket = sealed > 0
+                ? await fetchSearchFile(`grams_${gramBucket(gram, manifest.buckets)}.json`) : {};
+            const postings = new Set([...(bucket[gram] || []), ...(recent[gram] || [])]);
+            candidates = candidates === null ? postings : new Set([...candidates].filter(d => postings.has(d)));
+            if (candidates.size === 0) break;
+        }
+
+        const docNumbers = [...candidates].sort((a, b) => b - a).slice(0, 100);
+        const docs = (await loadSearchDocs(docNumbers)).filter(doc =>
+            normalizeSearchText(doc.title + ' ' + doc.summary).includes(normalized)
+        );
+
+        container.innerHTML = '';
+        if (docs.length === 0) {
+            // The query is user text: set as text, never as markup
+            const message = document.createElement('div');
+            message.className = 'loading';
+            message.textContent = `'${query}'에 대한 검색 결과가 없습니다.`;
+            container.appendChild(message);
+            return;
+        }
+        renderNewsItems(docs, container);
+    } catch (error) {
+        console.error('Search Error:', error);
+        container.innerHTML = '<div class="loading">검색 중 오류가 발생했습니다.</div>';
+    }
+}
+
+// Pages through a category across all months using its category shard
+async function loadCategoryFromIndex(btn) {
+    const BATCH_SIZE = 20;
+    const container = document.getElementById('news-container');
+
+    btn.textContent = '불러오는 중...';
+    btn.disabled = true;
+
+    try {
+        if (categoryDocs === null) {
+            const manifest = await getSearchManifest();
+            const entry = manifest.categories.find(c => c.name === currentCategory);
+            if (!entry) {
+                btn.style.display = 'none';
+                return;
+            }
+            categoryDocs = (await fetchSearchFile(`category_${entry.slug}.json`)).docs;
+            categoryCursor = 0;
+        }
+
+        // Skip items already on screen
+        const shownTitles = new Set(filteredData.map(item => item.title));
+        let docs = [];
+        while (docs.length < BATCH_SIZE && categoryCursor < categoryDocs.length) {
+            const page = categoryDocs.slice(categoryCursor, categoryCursor + BATCH_SIZE);
+            categoryCursor += page.length;
+            docs = docs.concat((await loadSearchDocs(page)).filter(doc => !shownTitles.has(doc.title)));
+        }
+
+        filteredData = filteredData.concat(docs);
+        renderNewsItems(docs, container);
+
+        btn.disabled = false;
+        btn.textContent = '지난 뉴스 더 보기';
+        if (categoryCursor >= categoryDocs.length) {
+            btn.textContent = '모든 뉴스를 불러왔습니다';
+            btn.disabled = true;
+        }
+    } catch (error) {
+        console.error('Category Index Error:', error);
+        btn.textContent = '실패 (다시 시도)';
+        btn.disabled = false;
+    }
+}
+
+// Cards (news.json, search results, category pages) carry no article text.
+// The body comes from its per-article file, or else from the shard named by 'src'.
+function articleBodyPath(id) {
+    return `data/articles/${id.substring(0, 2)}/${id}.json`;
+}
+
+async function fetchFullItem(item) {
+    try {
+        if (item.id) {
+            const response = await fetch(articleBodyPath(item.id));
+            if (response.ok) {
+                const body = await response.json();
+                if (body.content) return { ...item, ...body };
+            }
+        }
+        if (!item.src) return null;
+
+        const response = await fetchData(item.src);
+        if (!response.ok) return null;
+        let items;
+        if (item.src.endsWith('.jsonl')) {
+            const text = await response.text();
+            items = text.split('\n').filter(line => line.trim()).map(line => JSON.parse(line));
+        } else {
+            items = (await response.json()).items || [];
+        }
+        const full = items.find(i => (i.id && i.id === item.id) || i.title === item.title);
+        return full && full.content ? { ...item, ...full } : null;
+    } catch (error) {
+        console.error('Item Load Error:', error);
+        return null;
+    }
+}
+
 // Fallback Images (Curated High-Quality Finance/Tech)
 const fallbackImages = [
     "https://images.unsplash.com/photo-1611974714028-ac8a49f70659?q=80&w=1024&auto=format&fit=crop", // Stock Chart
@@ -304,10 +597,24 @@ function renderNewsItems(items, container) {
     });
 }
 
+let modalRequestToken = 0;
+
 // Refactored to accept item object directly to handle mixed data sources safely
 function openModalWithItem(item) {
     if (!item) return;
 
+    // Card-only item: show it now, swap in the full text when loaded
+    const requestToken = ++modalRequestToken;
+    if (!item.content && (item.id || item.src)) {
+        fetchFullItem(item).then(full => {
+            // Ignore if the user has since closed the modal or opened another article
+            const modal = document.getElementById('news-modal');
+            if (full && requestToken === modalRequestToken && modal.style.display !== 'none') {
+                openModalWithItem(full);
+            }
+        });
+    }
+
     const modal = document.getElementById('news-modal');
     const modalImg = document.getElementById('modal-image');
     const modalText = document.getElementById('modal-text');
@@ -321,7 +628,7 @@ function openModalWithItem(item) {
 
     document.getElementById('modal-title').textContent = item.title || 'No Title';
 
-    const content = item.content || item.description || '상세 내용을 준비 중입니다.';
+    const content = item.content || item.description || item.summary || '상세 내용을 준비 중입니다.';
     let formattedContent = content.replace(/\n\n/g, '</p><p>').replace(/\n/g, '<br>');
 
     // Add Source and Link (Conditioned)
@@ -367,6 +674,16 @@ document.addEventListener('DOMContentLoaded', () => {
         loadMoreBtn.onclick = loadArchive;
     }
 
+    // Search (debounced)
+    const searchInput = document.getElementById('search-input');
+    if (searchInput) {
+        let searchTimer = null;
+        searchInput.addEventListener('input', () => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => searchNews(searchInput.value), 300);
+        });
+    }
+
     // Modal Logic
     const modal = document.getElementById('news-modal');
     const closeBtn = document.querySelector('.modal-close');
@@ -461,7 +778,7 @@ document.addEventListener('DOMContentLoaded', () => {
         archiveList.innerHTML = '<li style="padding:10px; color:#666;">로딩 중...</li>';
 
         try {
-            const response = await fetch('data/archive_index.json?t=' + new Date().getTime());
+            const response = await fetchData('archive_index.json');
             if (!response.ok) {
                 if (response.status === 404) {
                     archiveList.innerHTML = '<li style="padding:10px; color:#666;">아직 아카이브가 없습니다.</li>';
@@ -488,7 +805,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 a.onclick = (e) => {
                     e.preventDefault();
                     // Load specific month
-                    loadArchiveMonth(month.id, month.name);
+                    loadArchiveMonth(month.id, month.name, month.filename);
 
                     // Update UI active state
                     document.querySelectorAll('.sub-menu a').forEach(el => el.classList.remove('active'));
@@ -514,7 +831,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // Function to Load Specific Month Archive
-    window.loadArchiveMonth = async function (monthId, monthName) {
+    window.loadArchiveMonth = async function (monthId, monthName, filename) {
         const container = document.getElementById('news-container');
         const loadMore = document.getElementById('load-more-btn');
         const chipContainer = document.querySelector('.category-filter');
@@ -530,11 +847,15 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         try {
-            const response = await fetch(`data/archive_${monthId}.json`);
-            if (!response.ok) throw new Error("File not found");
-
-            const data = await response.json();
-            currentNewsData = data.items; // Replace global data
+            // Month shards are JSONL (data/archive/YYYY_MM.jsonl); older indexes name a JSON file
+            const path = filename || `archive_${monthId}.json`;
+            if (path.endsWith('.jsonl')) {
+                currentNewsData = await fetchShard(path); // Replace global data
+            } else {
+                const response = await fetchData(path);
+                if (!response.ok) throw new Error("File not found");
+                currentNewsData = (await response.json()).items;
+            }
 
             // Render All
             container.innerHTML = '';
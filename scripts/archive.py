@@ -0,0 +1,113 @@
+"""
+Monthly archive.
+
+Day shards that leave the store window are moved, oldest first, into
+append-only month shards (data/archive/YYYY_MM.jsonl). Both stores are kept
+in time order, so the expired day shards are a prefix of the store found by
+binary search, and moving one is a plain append: month files are never
+reloaded, deduplicated or resorted. data/archive/manifest.json records count,
+date range, bytes and the day shards moved in ("days") per month, and
+archive_index.json for the sidebar is generated from it.
+
+The pre-store month files (data/archive_YYYY_MM.json) are imported once and
+removed.
+"""
+import json
+import os
+
+from storage import NewsStore, month_shard_id_for
+
+ARCHIVE_DIR = "data/archive"
+LEGACY_SIBLINGS = ("", ".gz", ".br", ".msgpack")
+
+
+class MonthArchive:
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.store = NewsStore(root, shard_of=month_shard_id_for)
+
+    @property
+    def months(self):
+        """Month entries (id, filename, count, bytes, first/last published), oldest first."""
+        return self.store.shards
+
+    def total_count(self):
+        return self.store.total_count()
+
+    def read_month(self, month_id):
+        return self.store.read_shard(month_id)
+
+    # --- Migration ---
+    def import_legacy(self, data_dir='data'):
+        """One-off import of archive_YYYY_MM.json files (newest-first item lists). Returns the count."""
+        imported = 0
+        for filename in sorted(os.listdir(data_dir)):
+            # archive_index.json and its content-hashed copies (publish.py) are not months
+            if not (filename.startswith('archive_') and filename.endswith('.json')) or filename.startswith('archive_index'):
+                continue
+            path = os.path.join(data_dir, filename)
+            month_id = filename[len('archive_'):-len('.json')]
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    items = json.load(f).get('items', [])
+            except Exception as e:
+                print(f"Skipping unreadable archive {filename}: {e}")
+                continue
+            if not self.store.find_shard(month_id):
+                imported += self.store.import_items(items, month_id)
+            self.store.save_manifest()
+            for ext in LEGACY_SIBLINGS:
+                if os.path.exists(path + ext):
+                    os.remove(path + ext)
+        if imported:
+            print(f"Imported {imported} items from legacy month files into {self.store.root}.")
+        return imported
+
+    def _already_moved(self, shard_id):
+        """
+        True when this day shard was appended to its month but not retired (a run
+        stopped in between). Dates are not enough: a legacy month can end partway
+        through a day whose later items are still in the store.
+        """
+        month = self.store.find_shard(month_shard_id_for({}, shard_id))
+        return bool(month and shard_id in month.get('days', []))
+
+    def migrate(self, store, cutoff_shard, timestamp=None):
+        """
+        Moves every store shard older than cutoff_shard (YYYY-MM-DD) into its month.
+        Returns (items moved, day shards retired). The caller saves the store manifest.
+        """
+        moved, retired = 0, 0
+        for shard_id in store.shards_before(cutoff_shard):
+            if not self._already_moved(shard_id):
+                items = store.read_shard(shard_id)
+                moved += self.store.append(items, shard_id)
+                month = self.store.find_shard(month_shard_id_for({}, shard_id))
+                if month:
+                    month.setdefault('days', []).append(shard_id)
+                print(f"  -> Moving {len(items)} items from {shard_id} to {self.store.root}/{month_shard_id_for({}, shard_id)}.jsonl")
+                # Month manifest first: a crash before retire() is then detected by _already_moved()
+                self.store.save_manifest(timestamp)
+            store.retire(shard_id)
+            retired += 1
+        return moved, retired
+
+    def save(self, timestamp=None):
+        self.store.save_manifest(timestamp)
+
+    # --- Index ---
+    def index_entries(self):
+        """archive_index.json entries, newest month first."""
+        entries = []
+        for month in reversed(self.months):
+            year, mm = month['id'].split('_')
+            entries.append({
+                "id": month['id'],                   # ID used for fetching file
+                "name": f"{year}년 {mm}월",           # Display Name
+                "filename": f"archive/{month['filename']}",
+                "count": month['count'],
+                "first_published": month['first_published'],
+                "last_published": month['last_published'],
+                "bytes": month['bytes']
+            })
+        return entries
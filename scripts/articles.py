@@ -0,0 +1,43 @@
+"""
+Card list / article body split.
+
+news.json only carries what renderNewsItems() draws (title, category, summary,
+time, image). The rest of each article (content, link, source, image prompt)
+goes to one immutable file per article, keyed by the stable item ID:
+
+    data/articles/<id[:2]>/<id>.json
+
+openModalWithItem() fetches the body when an article is opened.
+"""
+import json
+import os
+
+from storage import item_id
+
+ARTICLES_DIR = "data/articles"
+CARD_FIELDS = ("id", "title", "category", "summary", "published_at", "image_url")
+BODY_FIELDS = ("id", "title", "source", "link", "content", "image_prompt")
+
+
+def article_path(key, root=ARTICLES_DIR):
+    return os.path.join(root, key[:2], f"{key}.json")
+
+
+def to_card(item):
+    item.setdefault('id', item_id(item))
+    return {field: item[field] for field in CARD_FIELDS if item.get(field) is not None}
+
+
+def write_article_bodies(items, root=ARTICLES_DIR):
+    """Writes body files that do not exist yet (bodies never change). Returns the count written."""
+    written = 0
+    for item in items:
+        key = item.setdefault('id', item_id(item))
+        path = article_path(key, root)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({field: item.get(field) for field in BODY_FIELDS}, f, ensure_ascii=False, separators=(',', ':'))
+        written += 1
+    return written
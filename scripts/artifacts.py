@@ -0,0 +1,232 @@
+"""
+Output stage for published data files.
+
+write_artifact() writes minified JSON plus precompressed siblings
+(<file>.gz, <file>.br when brotli is installed) and optionally a MessagePack
+encoding (<file>.msgpack). Compressed output is deterministic (no timestamps),
+so unchanged data produces byte-identical files, and a file whose JSON and
+siblings are already on disk is not rewritten. write_artifact_file() adds the
+same siblings to a file written elsewhere (the append-only .jsonl month shards);
+they are rewritten only when the .gz no longer decodes to the file. Every
+artifact is recorded in a SizeReport; save() appends one line per run to data/size_report.jsonl so
+payload growth can be tracked over time.
+
+ARTIFACT_FORMATS selects the siblings (default "gz,br"; add "msgpack").
+Run directly to verify that every sibling decodes to the same data as its JSON:
+python scripts/artifacts.py --verify
+"""
+import gzip
+import json
+import os
+import sys
+
+FORMATS = [f.strip() for f in os.environ.get("ARTIFACT_FORMATS", "gz,br").split(",") if f.strip()]
+REPORT_PATH = "data/size_report.jsonl"
+GROUP_ABOVE = 3  # printed per directory when a directory has more artifacts than this
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def _msgpack():
+    try:
+        import msgpack
+        return msgpack
+    except ImportError:
+        return None
+
+
+def encode_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode_payload(path, payload):
+    """JSON data of a file's bytes; a .jsonl file is read as the list of its lines."""
+    text = payload.decode('utf-8')
+    if path.endswith('.jsonl'):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return json.loads(text)
+
+
+def _write_bytes(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class SizeReport:
+    """Per-artifact byte sizes of every format written during a run."""
+
+    def __init__(self, path=REPORT_PATH):
+        self.path = path
+        self.artifacts = {}
+
+    def add(self, path, sizes):
+        self.artifacts[path] = sizes
+
+    def print_table(self):
+        if not self.artifacts:
+            return
+        print("📦 Artifact sizes (bytes):")
+        # Directories of many files (month shards, search index) get one line of totals
+        per_directory = {}
+        for path in self.artifacts:
+            per_directory[os.path.dirname(path)] = per_directory.get(os.path.dirname(path), 0) + 1
+        rows = {}
+        for path, sizes in sorted(self.artifacts.items()):
+            directory = os.path.dirname(path)
+            key = f"{directory}/" if per_directory[directory] > GROUP_ABOVE else path
+            row = rows.setdefault(key, {"files": 0, "sizes": {}})
+            row["files"] += 1
+            for fmt, size in sizes.items():
+                row["sizes"][fmt] = row["sizes"].get(fmt, 0) + size
+        for key, row in rows.items():
+            parts = ", ".join(f"{fmt}={size:,}" for fmt, size in row["sizes"].items())
+            label = f"{key} ({row['files']} files)" if key.endswith("/") else key
+            print(f"  {label}: {parts}")
+
+    def save(self, timestamp):
+        if not self.artifacts:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        totals = {}
+        for sizes in self.artifacts.values():
+            for fmt, size in sizes.items():
+                totals[fmt] = totals.get(fmt, 0) + size
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"at": timestamp, "totals": totals, "artifacts": self.artifacts}, ensure_ascii=False) + "\n")
+
+
+def _unchanged_sizes(path, payload, formats):
+    """{format: bytes} of the files on disk if the JSON is `payload` and every sibling exists, else None."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        if f.read() != payload:
+            return None
+    sizes = {"json": len(payload)}
+    available = {"gz": True, "br": _brotli() is not None, "msgpack": _msgpack() is not None}
+    for fmt in formats:
+        if not available.get(fmt):
+            continue
+        if not os.path.exists(f"{path}.{fmt}"):
+            return None
+        sizes[fmt] = os.path.getsize(f"{path}.{fmt}")
+    return sizes
+
+
+def _write_siblings(path, payload, load, formats):
+    """Writes the compressed siblings of `payload`; load() gives the data for msgpack. Returns {format: bytes}."""
+    sizes = {"json": len(payload)}
+
+    if "gz" in formats:
+        compressed = gzip.compress(payload, compresslevel=9, mtime=0)
+        _write_bytes(path + ".gz", compressed)
+        sizes["gz"] = len(compressed)
+
+    if "br" in formats:
+        brotli = _brotli()
+        if brotli:
+            compressed = brotli.compress(payload, quality=11)
+            _write_bytes(path + ".br", compressed)
+            sizes["br"] = len(compressed)
+
+    if "msgpack" in formats:
+        msgpack = _msgpack()
+        if msgpack:
+            packed = msgpack.packb(load(), use_bin_type=True)
+            _write_bytes(path + ".msgpack", packed)
+            sizes["msgpack"] = len(packed)
+    return sizes
+
+
+def write_artifact(path, data, report=None, formats=None):
+    """Writes minified JSON and its compressed siblings, unless unchanged. Returns {format: bytes}."""
+    formats = FORMATS if formats is None else formats
+    payload = encode_json(data)
+    sizes = _unchanged_sizes(path, payload, formats)
+    if sizes is None:
+        _write_bytes(path, payload)
+        sizes = _write_siblings(path, payload, lambda: data, formats)
+    if report is not None:
+        report.add(path, sizes)
+    return sizes
+
+
+def _sibling_sizes(path, payload, formats):
+    """{format: bytes} if the .gz decodes to `payload` and every other sibling exists, else None."""
+    if "gz" not in formats or not os.path.exists(path + ".gz"):
+        return None
+    with open(path + ".gz", 'rb') as f:
+        if gzip.decompress(f.read()) != payload:
+            return None
+    return _unchanged_sizes(path, payload, formats)
+
+
+def write_artifact_file(path, report=None, formats=None):
+    """
+    Compressed siblings for a file written elsewhere (e.g. a .jsonl month shard),
+    unless they are already up to date. Returns {format: bytes}.
+    """
+    formats = FORMATS if formats is None else formats
+    with open(path, 'rb') as f:
+        payload = f.read()
+    sizes = _sibling_sizes(path, payload, formats)
+    if sizes is None:
+        sizes = _write_siblings(path, payload, lambda: decode_payload(path, payload), formats)
+    if report is not None:
+        report.add(path, sizes)
+    return sizes
+
+
+def verify_artifact(path):
+    """Returns a list of siblings of `path` that do not decode to the JSON data."""
+    with open(path, 'rb') as f:
+        expected = decode_payload(path, f.read())
+    mismatches = []
+
+    if os.path.exists(path + ".gz"):
+        with open(path + ".gz", 'rb') as f:
+            if decode_payload(path, gzip.decompress(f.read())) != expected:
+                mismatches.append(path + ".gz")
+
+    brotli = _brotli()
+    if brotli and os.path.exists(path + ".br"):
+        with open(path + ".br", 'rb') as f:
+            if decode_payload(path, brotli.decompress(f.read())) != expected:
+                mismatches.append(path + ".br")
+
+    msgpack = _msgpack()
+    if msgpack and os.path.exists(path + ".msgpack"):
+        with open(path + ".msgpack", 'rb') as f:
+            if msgpack.unpackb(f.read(), raw=False) != expected:
+                mismatches.append(path + ".msgpack")
+
+    return mismatches
+
+
+def verify_all(data_dir='data'):
+    """Round-trip check of every JSON artifact with siblings under data_dir."""
+    checked, failed = 0, []
+    for root, _, files in os.walk(data_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            if filename.endswith(('.json', '.jsonl')) and any(os.path.exists(path + ext) for ext in ('.gz', '.br', '.msgpack')):
+                checked += 1
+                failed += verify_artifact(path)
+    print(f"Verified {checked} artifacts, {len(failed)} mismatches.")
+    for path in failed:
+        print(f"  ❌ {path}")
+    return not failed
+
+
+if __name__ == "__main__":
+    if "--verify" in sys.argv:
+        sys.exit(0 if verify_all() else 1)
+    print(__doc__)
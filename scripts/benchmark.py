@@ -0,0 +1,205 @@
+"""
+Offline benchmark of the news pipeline.
+
+    python scripts/benchmark.py [--sizes 1000,10000,100000] [--no-memory] [--out report.json] [--keep]
+
+For each size a synthetic archive shaped like data/news_archive.json items is
+built in a temporary directory: month shards (data/archive) for items older
+than the store window and day shards in data/store for the rest, with one day
+already due for monthly migration. Then every stage of fetch_news.py
+runs against the recorded fixtures in scripts/fixtures/:
+
+    rss_economy.xml      Google News RSS      -> LocalFeedServer + FeedFetcher
+    gemini_reply.txt     synthesis reply      -> FakeGenAIClient
+    market_closes.json   index close series   -> FakeMarketSource
+    (images)                                  -> StubImageGenerator
+
+No network access, API key or google-genai install is needed. Time and
+peak memory (tracemalloc) are reported per stage, plus the run's wall time.
+Tracing runs the stages one at a time; --no-memory skips it, so independent
+stages overlap as in production and the timings are cleaner.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from storage import NewsStore
+from archive import MonthArchive
+from market_data import FakeMarketSource
+from images import ImagePipeline, StubImageGenerator
+from stock_images import load_catalogue
+from synthesis import FakeGenAIClient, MODELS_TO_TRY
+from pipeline import PipelineRunner
+from feeds import FeedFetcher, LocalFeedServer, DEFAULT_CONFIG as DEFAULT_FEED_CONFIG
+import fetch_news
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(SCRIPTS_DIR, "fixtures")
+DEFAULT_SIZES = [1000, 10000, 100000]
+STORE_DAYS = 31           # day shards kept in the store (the oldest is due for migration)
+RUN_HOURS = (9, 12, 15, 18, 21)
+ITEMS_PER_RUN = 5
+
+CATEGORIES = ["거시경제", "금융", "테크", "부동산", "산업", "국제", "정책", "시장"]
+SOURCES = ["연합뉴스", "한국경제", "매일경제", "조선비즈", "서울경제", "채널A", "KBS", "머니투데이"]
+WORDS = [
+    "금리", "환율", "반도체", "수출", "물가", "코스피", "부동산", "대출", "유가", "고용",
+    "성장률", "한은", "연준", "배터리", "전기차", "AI", "플랫폼", "관세", "무역", "증시",
+    "채권", "달러", "원화", "아파트", "청약", "규제", "투자", "실적", "삼성전자", "SK하이닉스",
+    "경기", "소비", "내수", "재정", "세수", "예산", "가계부채", "금융위", "공급망", "중국"
+]
+STOCK_URLS = [image['url'] for image in load_catalogue()]
+
+
+# --- Fixtures ---
+FIXTURE_FEED_PATH = "/rss/economy"
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    with open(os.path.join(fixtures_dir, "rss_economy.xml"), 'rb') as f:
+        rss = f.read()
+    with open(os.path.join(fixtures_dir, "gemini_reply.txt"), 'r', encoding='utf-8') as f:
+        reply = f.read()
+    with open(os.path.join(fixtures_dir, "market_closes.json"), 'r', encoding='utf-8') as f:
+        closes = json.load(f)
+    return rss, reply, closes
+
+
+def fixture_services(feed_url, reply, closes):
+    """build_context() overrides that replay the fixtures offline (RSS from a LocalFeedServer at feed_url)."""
+    return {
+        "feed_fetcher": FeedFetcher(dict(DEFAULT_FEED_CONFIG, feeds=[{"name": "경제", "url": feed_url}])),
+        "api_key": "offline-benchmark",
+        "make_client": lambda api_key: FakeGenAIClient({MODELS_TO_TRY[0]: reply}),
+        # No rate limit: the benchmark measures the pipeline, not Imagen quota sleeps
+        "make_image_pipeline": lambda client: ImagePipeline(StubImageGenerator(), rate_per_minute=60000),
+        "market_source": FakeMarketSource(closes)
+    }
+
+
+# --- Synthetic archive ---
+def synthetic_item(n, published_at, rng):
+    words = rng.sample(WORDS, 4)
+    body = " ".join(rng.choice(WORDS) for _ in range(40))
+    return {
+        "title": f"{words[0]}·{words[1]} {words[2]} 동향 … {words[3]} 영향 ({n})",
+        "source": rng.choice(SOURCES),
+        "link": f"https://news.example.com/articles/{n}",
+        "category": rng.choice(CATEGORIES),
+        "summary": f"{words[0]}와 {words[1]} 흐름이 {words[2]} 시장에 미치는 영향을 정리했습니다.",
+        "content": "\n\n".join([body] * 3),
+        "image_prompt": "Economy, stock market, data chart, professional",
+        "published_at": published_at,
+        "image_url": STOCK_URLS[n % len(STOCK_URLS)]
+    }
+
+
+def build_archive(data_dir, size, now=None, seed=0):
+    """
+    Writes `size` items, ITEMS_PER_RUN per run and len(RUN_HOURS) runs per day
+    back from `now`: the month archive for days older than STORE_DAYS, the
+    store for the rest. Returns the number of items written.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    per_day = ITEMS_PER_RUN * len(RUN_HOURS)
+    days = max(1, -(-size // per_day))
+    store = NewsStore(os.path.join(data_dir, 'store'))
+    today = now.strftime("%Y-%m-%d")
+
+    archive = MonthArchive(os.path.join(data_dir, 'archive'))
+    store_items = []
+
+    n = 0
+    for age in range(days - 1, -1, -1):  # oldest day first
+        day = now - timedelta(days=age)
+        for hour in RUN_HOURS:
+            published_at = day.strftime("%Y-%m-%d") + f" {hour:02d}:00:00"
+            batch = []
+            for _ in range(ITEMS_PER_RUN):
+                if n < size:
+                    batch.append(synthetic_item(n, published_at, rng))
+                    n += 1
+            if age > STORE_DAYS:
+                archive.store.append(batch, today)
+            else:
+                # newest-first runs, original order within a run (like news_archive.json)
+                store_items[:0] = batch
+    archive.save(today)
+    store.import_items(store_items, today)
+    store.save_manifest(today)
+    return n
+
+
+# --- Runner ---
+def run_size(size, fixtures, trace_memory=True, keep=False):
+    workdir = tempfile.mkdtemp(prefix=f"econ-bench-{size}-")
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        os.makedirs('data')
+        # The pages stage fills the prerender regions of the site's index.html
+        shutil.copy(os.path.join(os.path.dirname(SCRIPTS_DIR), 'index.html'), 'index.html')
+        written = build_archive('data', size)
+        print(f"\n=== {written:,} items (in {workdir}) ===")
+        rss, reply, closes = fixtures
+        with LocalFeedServer({FIXTURE_FEED_PATH: rss}) as server:
+            ctx = fetch_news.build_context(**fixture_services(server.url(FIXTURE_FEED_PATH), reply, closes))
+            runner = PipelineRunner(fetch_news.STAGES, metrics_path=None, trace_memory=trace_memory, profile=())
+            records = runner.run(ctx)
+            return {"wall_seconds": round(runner.total_seconds, 3), "stages": records}
+    finally:
+        os.chdir(cwd)
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(results):
+    sizes = list(results)
+    # Start order can differ between runs; rows follow the stage declaration
+    stages = [stage.name for stage in fetch_news.STAGES]
+    by_stage = {size: {r["stage"]: r for r in results[size]["stages"]} for size in sizes}
+    print("\n📊 Benchmark (seconds / peak MB per stage):")
+    print(f"  {'stage':<15}" + "".join(f"{size:>22,}" for size in sizes))
+    for stage in stages:
+        cells = []
+        for size in sizes:
+            r = by_stage[size].get(stage, {"seconds": 0.0})
+            cell = f"{r['seconds']:.3f}s"
+            if "peak_memory_bytes" in r:
+                cell += f" / {r['peak_memory_bytes'] / 1e6:.1f}MB"
+            cells.append(f"{cell:>22}")
+        print(f"  {stage:<15}" + "".join(cells))
+    totals = "".join(f"{sum(r['seconds'] for r in results[size]['stages']):>21.3f}s" for size in sizes)
+    print(f"  {'total':<15}" + totals)
+    walls = "".join(f"{results[size]['wall_seconds']:>21.3f}s" for size in sizes)
+    print(f"  {'wall':<15}" + walls)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the news pipeline stages.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated archive sizes")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (cleaner timings)")
+    parser.add_argument("--out", help="write the per-stage records to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary directories")
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures()
+    results = {}
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        results[size] = run_size(size, fixtures, trace_memory=not args.no_memory, keep=args.keep)
+
+    print_report(results)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({str(size): result for size, result in results.items()}, f, ensure_ascii=False, indent=1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
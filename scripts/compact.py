@@ -0,0 +1,579 @@
+"""
+Archive maintenance: stream every stored item through a set of transforms
+and rewrite the shards in place.
+
+    python scripts/compact.py [--transforms dedup,categories,images] [--dry-run] [--restart]
+
+Sources, oldest first:
+
+    data/archive_YYYY_MM.json, data/news_archive.json   legacy files, if still present
+    data/archive/YYYY_MM.jsonl                          month shards
+    data/store/YYYY-MM-DD.jsonl                         day shards
+
+JSONL shards are read line by line; the legacy JSON files are parsed
+incrementally (JsonItemsReader), one item at a time. Each source is written
+to a temp file next to it and renamed into place, and a shard's manifest
+entry (count, bytes, date range) is saved right after, so an interrupted run
+leaves every file either old or new, never partial. Memory stays at one item
+plus one shard's set of ids, whatever the size of the history.
+
+Transforms:
+
+    dedup        one copy per item id (same link): the earliest published wins.
+                 Needs a first pass that records the winner of every id in an
+                 SQLite table on disk; legacy files and shards are deduplicated
+                 separately (the store was imported from the legacy files).
+    categories   normalizes categories and files stray ones under the sidebar
+                 filters (증시 -> 금융/증시) so the filters find them.
+    images       items whose image is missing (empty, or a generated image
+                 already removed by the 7-day cleanup) get a stock photo from
+                 stock_images.py.
+
+Progress is kept in .cache/compact/ after every source; running the same
+command again resumes where it stopped (--restart starts over). Progress and
+throughput are printed every PROGRESS_SECONDS.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import textwrap
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from storage import NewsStore, item_id
+from archive import MonthArchive
+from search_index import FILTER_CATEGORIES
+
+STATE_DIR = ".cache/compact"
+STATE_VERSION = 1
+CHUNK_SIZE = 1 << 16
+PROGRESS_SECONDS = 2
+DEFAULT_TRANSFORMS = ("dedup", "categories", "images")
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+# Stray categories and the sidebar filter they belong under
+CATEGORY_ALIASES = {
+    "시장": "금융", "증시": "금융", "증권": "금융", "주식": "금융", "투자": "금융", "은행": "금융",
+    "환율": "금융", "외환": "금융", "가상자산": "금융", "코인": "금융",
+    "반도체": "테크", "AI": "테크", "IT": "테크", "인공지능": "테크", "플랫폼": "테크",
+    "아파트": "부동산", "주택": "부동산", "건설": "부동산",
+    "물가": "거시경제", "경기": "거시경제", "성장": "거시경제", "고용": "거시경제",
+    "기업": "산업", "제조": "산업", "자동차": "산업", "에너지": "산업", "조선": "산업"
+}
+
+
+# --- Incremental JSON ---
+class JsonItemsReader:
+    """
+    Yields the elements of the "items" array of a {"items": [...], ...} file
+    (or of a top-level array) one at a time. The other top-level keys end up
+    in .meta_before / .meta_after. Memory is bounded by the largest item.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.meta_before = {}
+        self.meta_after = {}
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self._file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character (not consumed), None at the end of the file."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"{self.path}: expected {char!r} near offset {self._pos}")
+        self._pos += 1
+
+    def _value(self):
+        """Decodes the next JSON value, reading more of the file while it is incomplete."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number cut off at the end of the buffer decodes fine, or as a shorter
+            # number ("2.5" of "2.5e10"): make sure it ended
+            tail = end
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                while tail < len(self._buf) and self._buf[tail] in _NUMBER_CHARS:
+                    tail += 1
+            if tail == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _elements(self):
+        self._expect('[')
+        while True:
+            char = self._peek()
+            if char == ']':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            if char is None:
+                raise ValueError(f"{self.path}: unterminated array")
+            yield self._value()
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self._file, self._buf, self._pos = f, '', 0
+            if self._peek() == '[':
+                yield from self._elements()
+                return
+            self._expect('{')
+            meta = self.meta_before
+            while True:
+                char = self._peek()
+                if char == '}':
+                    return
+                if char == ',':
+                    self._pos += 1
+                    continue
+                key = self._value()
+                self._expect(':')
+                if key == 'items' and self._peek() == '[':
+                    yield from self._elements()
+                    meta = self.meta_after
+                else:
+                    meta[key] = self._value()
+
+
+def _dump_member(key, value):
+    """`"key": value` as json.dump(..., indent=4) writes it at the top level."""
+    text = json.dumps({key: value}, ensure_ascii=False, indent=4)
+    return text[2:-2]
+
+
+# --- Sources ---
+class LegacySource:
+    """A legacy newest-first {"items": [...]} file; rewritten in json.dump(indent=4) layout."""
+
+    scope = "legacy"
+
+    def __init__(self, path):
+        self.path = path
+        self.id = os.path.basename(path)
+
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def items(self):
+        self.reader = JsonItemsReader(self.path)
+        return iter(self.reader)
+
+    def write(self, items, out):
+        """Streams items to the open file `out`. Returns (count, published dates) for the report."""
+        count = 0
+        for item in items:
+            if count == 0:
+                out.write("{\n")
+                for key, value in self.reader.meta_before.items():
+                    out.write(_dump_member(key, value) + ",\n")
+                out.write('    "items": [\n')
+            else:
+                out.write(",\n")
+            out.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=4), " " * 8))
+            count += 1
+        if count == 0:
+            out.write("{\n")
+            for key, value in self.reader.meta_before.items():
+                out.write(_dump_member(key, value) + ",\n")
+            out.write('    "items": []')
+        else:
+            out.write("\n    ]")
+        for key, value in self.reader.meta_after.items():
+            out.write(",\n" + _dump_member(key, value))
+        out.write("\n}")
+        return count, None
+
+    def commit(self, tmp_path, count, published):
+        os.replace(tmp_path, self.path)
+
+
+class ShardSource:
+    """A JSONL shard of a NewsStore (store day or archive month)."""
+
+    scope = "shards"
+
+    def __init__(self, store, entry):
+        self.store = store
+        self.entry_id = entry['id']
+        self.path = store.shard_path(entry['id'])
+        self.id = os.path.relpath(self.path)
+
+    def size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def items(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except Exception as e:
+                    print(f"Skipping corrupt line {line_no} in {self.path}: {e}")
+
+    def write(self, items, out):
+        count, first, last = 0, None, None
+        for item in items:
+            out.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+            count += 1
+            published = item.get('published_at', '')
+            first = published if first is None or published < first else first
+            last = published if last is None or published > last else last
+        return count, (first, last)
+
+    def commit(self, tmp_path, count, published):
+        os.replace(tmp_path, self.path)
+        entry = self.store.find_shard(self.entry_id)
+        entry.update(count=count, bytes=os.path.getsize(self.path),
+                     first_published=published[0], last_published=published[1])
+        self.store.save_manifest()
+
+
+def find_sources(data_dir='data'):
+    """Every source, oldest first within its scope."""
+    sources = []
+    legacy_months = sorted(
+        f for f in os.listdir(data_dir)
+        if f.startswith('archive_') and f.endswith('.json') and not f.startswith('archive_index')  # nor its hashed copies
+    ) if os.path.isdir(data_dir) else []
+    sources.extend(LegacySource(os.path.join(data_dir, f)) for f in legacy_months)
+    if os.path.exists(os.path.join(data_dir, 'news_archive.json')):
+        sources.append(LegacySource(os.path.join(data_dir, 'news_archive.json')))
+    for store in (MonthArchive(os.path.join(data_dir, 'archive')).store, NewsStore(os.path.join(data_dir, 'store'))):
+        sources.extend(ShardSource(store, entry) for entry in store.shards)
+    return sources
+
+
+# --- Transforms ---
+class Dedup:
+    """Keeps the earliest published copy of every item id (winners recorded in SQLite)."""
+
+    def __init__(self, db):
+        self.db = db
+        self.db.execute("CREATE TABLE IF NOT EXISTS winners "
+                        "(scope TEXT, key TEXT, published TEXT, rank INTEGER, PRIMARY KEY (scope, key))")
+        self.emitted = set()
+        self.stats = {"duplicates_dropped": 0}
+
+    def index(self, source, rank, items):
+        """First pass: records (published_at, source rank) of the earliest copy of each id."""
+        rows = ((source.scope, item.get('id') or item_id(item), item.get('published_at') or '', rank) for item in items)
+        self.db.executemany(
+            "INSERT INTO winners VALUES (?, ?, ?, ?) ON CONFLICT (scope, key) DO UPDATE "
+            "SET published = excluded.published, rank = excluded.rank "
+            "WHERE (excluded.published, excluded.rank) < (winners.published, winners.rank)", rows)
+        self.db.commit()
+
+    def begin(self, source, rank):
+        self.scope, self.rank = source.scope, rank
+        self.emitted = set()
+
+    def __call__(self, item):
+        key = item.get('id') or item_id(item)
+        winner = self.db.execute("SELECT published, rank FROM winners WHERE scope = ? AND key = ?",
+                                 (self.scope, key)).fetchone()
+        # Rerunning a rewritten source is a no-op: its winners are still first in it
+        if key in self.emitted or winner != (item.get('published_at') or '', self.rank):
+            self.stats["duplicates_dropped"] += 1
+            return None
+        self.emitted.add(key)
+        return item
+
+
+def normalize_category(category):
+    """'증시' -> '금융/증시', '거시' -> '거시경제', None -> '경제'; categories with a filter name stay."""
+    category = (category or '').strip()
+    for sep in ('·', ',', '|'):
+        category = category.replace(sep, '/')
+    category = '/'.join(part.strip() for part in category.split('/') if part.strip())
+    if not category:
+        return "경제"
+    filters = [name for name, _ in FILTER_CATEGORIES]
+    if any(name in category for name in filters):
+        return category
+    for name in filters:
+        if name.startswith(category):
+            return name
+    for alias, name in CATEGORY_ALIASES.items():
+        if alias in category:
+            return f"{name}/{category}"
+    return category
+
+
+class Categories:
+    """Normalized categories (normalize_category)."""
+
+    def __init__(self):
+        self.stats = {"recategorized": 0}
+
+    def begin(self, source, rank):
+        pass
+
+    def __call__(self, item):
+        category = normalize_category(item.get('category'))
+        if category != item.get('category'):
+            item['category'] = category
+            self.stats["recategorized"] += 1
+        return item
+
+
+class Images:
+    """Stock photo for items whose image is missing (deleted generated images included)."""
+
+    def __init__(self, root='.'):
+        from stock_images import StockImageIndex
+        self.index = StockImageIndex()
+        self.root = root
+        self.stats = {"images_fixed": 0}
+
+    def begin(self, source, rank):
+        pass
+
+    def _missing(self, url):
+        if not url:
+            return True
+        if url.startswith('./'):
+            return not os.path.exists(os.path.join(self.root, url[2:]))
+        return False
+
+    def __call__(self, item):
+        if self._missing(item.get('image_url')):
+            item['image_url'] = self.index.match([item])[0]
+            self.stats["images_fixed"] += 1
+        return item
+
+
+# --- Runner ---
+class Progress:
+    def __init__(self, phase, total_sources):
+        self.phase = phase
+        self.total_sources = total_sources
+        self.sources = 0
+        self.items = 0
+        self.bytes = 0
+        self.started = self.last_print = time.perf_counter()
+
+    def tick(self, count=1):
+        self.items += count
+        now = time.perf_counter()
+        if now - self.last_print >= PROGRESS_SECONDS:
+            self.last_print = now
+            self.print()
+
+    def source_done(self, size):
+        self.sources += 1
+        self.bytes += size
+
+    def rate(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return self.items / elapsed, self.bytes / elapsed / 1e6
+
+    def print(self, final=False):
+        items_per_s, mb_per_s = self.rate()
+        print(f"  [{self.phase}] {self.items:,} items, {self.sources}/{self.total_sources} sources, "
+              f"{items_per_s:,.0f} items/s, {mb_per_s:.1f} MB/s" + (" (done)" if final else ""))
+
+
+def counted(items, progress):
+    for item in items:
+        progress.tick()
+        yield item
+
+
+class Compactor:
+
+    def __init__(self, transforms=DEFAULT_TRANSFORMS, data_dir='data', state_dir=STATE_DIR, dry_run=False, restart=False):
+        self.transform_names = list(transforms)
+        unknown = set(self.transform_names) - set(DEFAULT_TRANSFORMS)
+        if unknown:
+            raise ValueError(f"Unknown transforms: {', '.join(sorted(unknown))}")
+        self.data_dir = data_dir
+        self.dry_run = dry_run
+        # A dry run keeps its state (and the dedup table) in a throwaway directory
+        self.state_dir = tempfile.mkdtemp(prefix="compact-") if dry_run else state_dir
+        if restart and os.path.exists(self.state_dir):
+            shutil.rmtree(self.state_dir)
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.state_path = os.path.join(self.state_dir, "state.json")
+        self.state = self._load_state()
+        self.db = sqlite3.connect(os.path.join(self.state_dir, "dedup.sqlite"))
+
+        self.transforms = []
+        for name in self.transform_names:
+            if name == "dedup":
+                self.transforms.append(Dedup(self.db))
+            elif name == "categories":
+                self.transforms.append(Categories())
+            elif name == "images":
+                self.transforms.append(Images(os.path.dirname(os.path.abspath(data_dir))))
+
+    def _load_state(self):
+        fresh = {"version": STATE_VERSION, "transforms": self.transform_names,
+                 "indexed": [], "written": [], "bytes_before": 0, "bytes_after": 0, "items_written": 0, "stats": {}}
+        if not os.path.exists(self.state_path):
+            return fresh
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION or state.get('transforms') != self.transform_names:
+            raise SystemExit(f"{self.state_path} belongs to another run "
+                             f"(transforms {state.get('transforms')}); use --restart to start over.")
+        print(f"Resuming: {len(state['indexed'])} sources indexed, {len(state['written'])} written.")
+        return state
+
+    def _save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def index(self, sources):
+        """First pass (dedup only): winners of every id, one committed source at a time."""
+        dedup = next((t for t in self.transforms if isinstance(t, Dedup)), None)
+        if dedup is None:
+            return
+        progress = Progress("index", len(sources))
+        for rank, source in enumerate(sources):
+            if source.id in self.state['indexed']:
+                progress.source_done(0)
+                continue
+            dedup.index(source, rank, counted(source.items(), progress))
+            self.state['indexed'].append(source.id)
+            self._save_state()
+            progress.source_done(source.size())
+        progress.print(final=True)
+
+    def rewrite(self, sources):
+        """Second pass: streams each source through the transforms into its replacement."""
+        progress = Progress("rewrite", len(sources))
+        for rank, source in enumerate(sources):
+            if source.id in self.state['written']:
+                progress.source_done(0)
+                continue
+            size_before = source.size()
+            for transform in self.transforms:
+                transform.begin(source, rank)
+
+            def transformed():
+                for item in counted(source.items(), progress):
+                    for transform in self.transforms:
+                        item = transform(item)
+                        if item is None:
+                            break
+                    else:
+                        yield item
+
+            tmp_path = source.path + ".compact.tmp"
+            size_after = 0
+            try:
+                with open(os.devnull if self.dry_run else tmp_path, 'w', encoding='utf-8') as out:
+                    count, published = source.write(transformed(), out)
+                if not self.dry_run:
+                    source.commit(tmp_path, count, published)
+                    size_after = source.size()
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self.state['written'].append(source.id)
+            self.state['bytes_before'] += size_before
+            self.state['bytes_after'] += size_after
+            self.state['items_written'] += count
+            for transform in self.transforms:
+                for key, value in transform.stats.items():
+                    self.state['stats'][key] = self.state['stats'].get(key, 0) + value
+                    transform.stats[key] = 0
+            self._save_state()
+            progress.source_done(size_before)
+        progress.print(final=True)
+
+    def run(self):
+        sources = find_sources(self.data_dir)
+        print(f"Compacting {len(sources)} sources with {', '.join(self.transform_names)}"
+              f"{' (dry run)' if self.dry_run else ''}...")
+        started = time.perf_counter()
+        try:
+            # Dedup winners are recorded by source rank: a resumed run needs the same source list
+            ids = [source.id for source in sources]
+            if self.state.setdefault('sources', ids) != ids:
+                raise SystemExit("The sources changed since the interrupted run; use --restart to start over.")
+            self.index(sources)
+            self.rewrite(sources)
+        finally:
+            if self.dry_run:
+                # A dry run cannot be resumed: its throwaway state goes even when interrupted
+                self.db.close()
+                shutil.rmtree(self.state_dir, ignore_errors=True)
+
+        report = {"sources": len(sources), "items_written": self.state['items_written']}
+        for transform in self.transforms:
+            report.update({key: self.state['stats'].get(key, 0) for key in transform.stats})
+        if not self.dry_run:
+            report.update(bytes_before=self.state['bytes_before'], bytes_after=self.state['bytes_after'])
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        if resource:
+            # ru_maxrss is in KB on Linux
+            report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+        if not self.dry_run:
+            self.db.close()
+            shutil.rmtree(self.state_dir)  # finished: the next run starts fresh
+        print("✅ Compaction " + ("dry run " if self.dry_run else "") + "finished: " +
+              ", ".join(f"{k}={v:,}" if isinstance(v, int) else f"{k}={v}" for k, v in report.items()))
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the archive through maintenance transforms.")
+    parser.add_argument("--transforms", default=",".join(DEFAULT_TRANSFORMS),
+                        help=f"comma-separated, applied in order (default: {','.join(DEFAULT_TRANSFORMS)})")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change, write nothing")
+    parser.add_argument("--restart", action="store_true", help="discard the progress of an interrupted run")
+    args = parser.parse_args(argv)
+
+    transforms = [t.strip() for t in args.transforms.split(",") if t.strip()]
+    try:
+        return Compactor(transforms, args.data_dir, dry_run=args.dry_run, restart=args.restart).run()
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted." + ("" if args.dry_run else " Run the same command again to resume."))
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Resident mode: the news job on an internal schedule in one long-lived process.
+
+    python scripts/daemon.py [--interval 900] [--runs N] [--after "shell command"]
+
+Run from the repository root, like fetch_news.py. Every run is the normal
+stage graph (fetch_news.STAGES) with its own RunContext and metrics line, but
+what a cold process rebuilds each time is kept between runs:
+
+    genai client        one per API key, with its HTTP connection pool
+    feed fetcher        feeds.json and the ETag state of .cache/feeds.json
+    store, archive      manifests, and the per-shard keys behind NewsStore.known_keys()
+    headline index      .cache/headlines.json
+    near-dup index      MinHash signatures and LSH buckets
+    stock image index   TF-IDF matrix of stock_images.json
+    imported modules    google-genai, yfinance (and its HTTP session), NumPy, Pillow
+
+The indexes are read from disk again after a failed run, when the KST day
+changes (retention and the monthly migration go by day), and when one of their
+files was written by another process (a cron run, compact.py). The clients
+live as long as the process.
+
+Runs start every --interval seconds (DAEMON_INTERVAL), counted from the first
+one; a run that overruns skips the slots it missed instead of queueing them.
+--after (DAEMON_AFTER_RUN) is a shell command run after each successful run,
+e.g. the workflow's git add / commit / push. SIGTERM or Ctrl-C stops the
+daemon once the run in progress has finished.
+"""
+import time
+STARTUP_BEGAN = time.perf_counter()  # the imports below are the first run's startup_seconds
+
+import argparse
+import os
+import signal
+import subprocess
+import threading
+
+from archive import ARCHIVE_DIR
+from feeds import STATE_PATH as FEED_STATE_PATH
+from fetch_news import STAGES, build_context
+from headlines import INDEX_PATH as HEADLINES_PATH
+from near_duplicates import INDEX_PATH as NEAR_DUPLICATES_PATH
+from pipeline import PipelineRunner
+from storage import STORE_DIR, MANIFEST_NAME
+
+DEFAULT_INTERVAL = 900  # seconds
+WARM_INDEXES = ("store", "archive", "feed_fetcher", "headline_index", "near_duplicates", "stock_images")
+WATCHED_FILES = (
+    os.path.join(STORE_DIR, MANIFEST_NAME),
+    os.path.join(ARCHIVE_DIR, MANIFEST_NAME),
+    HEADLINES_PATH,
+    NEAR_DUPLICATES_PATH,
+    FEED_STATE_PATH
+)
+
+
+def file_stamp(paths=WATCHED_FILES):
+    """mtime of each file (None if missing)."""
+    stamp = []
+    for path in paths:
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class WarmState:
+    """Clients and indexes kept from one run to the next."""
+
+    def __init__(self):
+        self.clients = {}  # api key -> client
+        self.indexes = {}  # RunContext attribute -> object
+        self.day = None
+        self.stamp = None
+
+    def context(self, **overrides):
+        """A RunContext for the next run, with the kept objects put in."""
+        ctx = build_context(**overrides)
+        if self.indexes:
+            if ctx.today_shard != self.day:
+                print(f"📅 New day ({ctx.today_shard}); reloading indexes from disk.")
+                self.indexes = {}
+            elif file_stamp() != self.stamp:
+                print("♻️ Index files were changed by another process; reloading them.")
+                self.indexes = {}
+        for name, value in self.indexes.items():
+            setattr(ctx, name, value)
+
+        make_client = ctx.make_client
+
+        def cached_client(api_key):
+            if api_key not in self.clients:
+                self.clients[api_key] = make_client(api_key)
+            return self.clients[api_key]
+
+        ctx.make_client = cached_client
+        return ctx
+
+    def keep(self, ctx):
+        """After a successful run: its indexes match what it wrote to disk."""
+        self.indexes = {name: getattr(ctx, name) for name in WARM_INDEXES if getattr(ctx, name, None) is not None}
+        self.day = ctx.today_shard
+        self.stamp = file_stamp()
+
+    def drop(self):
+        self.indexes = {}
+
+
+def run_after(command):
+    print(f"▶️ {command}")
+    result = subprocess.run(command, shell=True)
+    if result.returncode != 0:
+        print(f"❌ After-run command exited with {result.returncode}.")
+
+
+def run_daemon(interval=DEFAULT_INTERVAL, runs=0, after=None):
+    """Runs the job every `interval` seconds until stopped (or `runs` runs, if set)."""
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        if not stop.is_set():
+            print("🛑 Stopping after the current run.")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    warm = WarmState()
+    startup = time.perf_counter() - STARTUP_BEGAN
+    first_start = time.monotonic()
+    count = 0
+    print(f"🚀 News daemon started: one run every {interval:.0f}s.")
+    while not stop.is_set():
+        count += 1
+        print(f"🔁 Run {count} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        ctx = warm.context(startup_seconds=startup if count == 1 else None)
+        try:
+            PipelineRunner(STAGES).run(ctx)
+        except Exception as e:
+            # The kept indexes may hold changes that never reached disk
+            print(f"❌ Run {count} failed: {e}. Indexes will be reloaded from disk.")
+            warm.drop()
+        else:
+            warm.keep(ctx)
+            if after:
+                run_after(after)
+
+        if runs and count >= runs:
+            break
+        # Next slot on the fixed grid; slots a long run overlapped are skipped
+        wait = interval - (time.monotonic() - first_start) % interval
+        if not stop.is_set():
+            print(f"💤 Next run in {wait:.0f}s.")
+        stop.wait(wait)
+    print(f"👋 News daemon stopped after {count} runs.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the news job on a schedule in one resident process.")
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("DAEMON_INTERVAL", DEFAULT_INTERVAL)),
+                        help=f"seconds between run starts (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--runs", type=int, default=0, help="stop after this many runs (default: run until stopped)")
+    parser.add_argument("--after", default=os.environ.get("DAEMON_AFTER_RUN"),
+                        help="shell command to run after each successful run (e.g. commit and push)")
+    args = parser.parse_args(argv)
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+    run_daemon(args.interval, args.runs, args.after)
+
+
+if __name__ == "__main__":
+    main()
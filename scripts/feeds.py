@@ -0,0 +1,289 @@
+"""
+RSS ingestion from several feeds.
+
+Feeds come from feeds.json (or FEEDS_FILE): Google News queries or plain feed
+URLs. FeedFetcher fetches them concurrently with asyncio; each blocking urllib
+request runs in a worker thread, so wall time follows the slowest feed rather
+than the number of feeds. Requests are conditional: the ETag / Last-Modified
+of the last 200 response and its parsed entries are kept in .cache/feeds.json,
+so an unchanged feed costs a 304 and no parse, and a feed that fails falls
+back to its cached entries.
+
+Entries of all feeds are merged (same link or same normalized title = one
+story) and ranked: a story scores weight / (1 + position) in every feed it
+appears in, halved every RECENCY_HALF_LIFE hours of age.
+
+LocalFeedServer is an in-process HTTP stand-in (ETag / 304 aware) for
+offline runs.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from headlines import headline_keys
+
+FEEDS_FILE = os.environ.get(
+    "FEEDS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "feeds.json")
+)
+STATE_PATH = ".cache/feeds.json"
+GOOGLE_NEWS_URL = "https://news.google.com/rss/search?q={query}&hl=ko&gl=KR&ceid=KR:ko"
+USER_AGENT = "Mozilla/5.0 (compatible; EconGravityBot/1.0)"
+RECENCY_HALF_LIFE = 12  # hours
+
+DEFAULT_CONFIG = {
+    "timeout": 10,
+    "max_concurrency": 8,
+    "per_feed": 20,
+    "max_entries": 20,
+    "feeds": [
+        {"name": "경제", "query": "경제", "weight": 1.0}
+    ]
+}
+
+
+def load_feed_config(path=FEEDS_FILE):
+    """Reads the feed config, falling back to the single 경제 query."""
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+        except Exception as e:
+            print(f"Error loading feed config {path}: {e}")
+    return config
+
+
+def feed_url(feed):
+    return feed.get('url') or GOOGLE_NEWS_URL.format(query=urllib.parse.quote(feed['query']))
+
+
+# --- Parsing ---
+def _published_ts(text):
+    try:
+        return parsedate_to_datetime(text).timestamp() if text else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rss(payload):
+    """RSS 2.0 <item>s as {title, link, source, published_ts} dicts."""
+    root = ET.fromstring(payload)
+    entries = []
+    for item in root.iter('item'):
+        source = item.find('source')
+        entries.append({
+            "title": (item.findtext('title') or '').strip(),
+            "link": (item.findtext('link') or '').strip(),
+            "source": (source.text or '').strip() if source is not None and source.text else 'Unknown',
+            "published_ts": _published_ts(item.findtext('pubDate'))
+        })
+    return entries
+
+
+# --- Merge & Rank ---
+def rank_entries(feeds, feed_entries, limit=20, per_feed=20, now=None):
+    """Merges the entries of every feed into one ranked list of {title, link, source}."""
+    now = now or time.time()
+    stories = []
+    by_key = {}
+    for feed, entries in zip(feeds, feed_entries):
+        weight = feed.get('weight', 1.0)
+        for position, entry in enumerate(entries[:per_feed]):
+            if not entry.get('title') or not entry.get('link'):
+                continue
+            keys = headline_keys(entry)
+            story = next((by_key[k] for k in keys if k in by_key), None)
+            if story is None:
+                story = {"entry": entry, "score": 0.0, "feeds": []}
+                stories.append(story)
+            for key in keys:
+                by_key[key] = story
+            story["score"] += weight / (1 + position)
+            story["feeds"].append(feed['name'])
+
+    for story in stories:
+        published = story["entry"].get("published_ts")
+        age_hours = max(0.0, (now - published) / 3600) if published else RECENCY_HALF_LIFE
+        story["score"] *= 0.5 ** (age_hours / RECENCY_HALF_LIFE)
+
+    # Stable sort: ties keep feed order (first feed first)
+    stories.sort(key=lambda s: -s["score"])
+    return [
+        {"title": s["entry"]["title"], "link": s["entry"]["link"], "source": s["entry"]["source"]}
+        for s in stories[:limit]
+    ]
+
+
+# --- Fetching ---
+class FeedFetcher:
+
+    def __init__(self, config=None, state_path=STATE_PATH):
+        config = config or load_feed_config()
+        self.feeds = [dict(feed, url=feed_url(feed)) for feed in config['feeds']]
+        self.timeout = config['timeout']
+        self.max_concurrency = config['max_concurrency']
+        self.per_feed = config['per_feed']
+        self.max_entries = config['max_entries']
+        self.state_path = state_path
+        self.state = {}
+        self.stats = {"ok": 0, "not_modified": 0, "failed": 0}
+        if state_path and os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except Exception as e:
+                print(f"Error loading feed state: {e}")
+
+    def _request(self, url):
+        """Blocking conditional GET. Returns (status, body bytes or None, headers)."""
+        cached = self.state.get(url, {})
+        headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"}
+        if cached.get('etag'):
+            headers["If-None-Match"] = cached['etag']
+        if cached.get('last_modified'):
+            headers["If-Modified-Since"] = cached['last_modified']
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                return response.status, body, response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, None, e.headers
+            raise
+
+    async def _fetch_one(self, feed, semaphore, executor):
+        """Entries of one feed: fresh, cached on 304, or cached (stale) on failure."""
+        url = feed['url']
+        cached = self.state.get(url, {})
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status, body, headers = await asyncio.wait_for(
+                    asyncio.get_running_loop().run_in_executor(executor, self._request, url), self.timeout + 1)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"❌ Feed {feed['name']} failed ({e}); using {len(cached.get('entries', []))} cached entries.")
+                return cached.get('entries', [])
+
+        elapsed = time.perf_counter() - started
+        if status == 304:
+            self.stats["not_modified"] += 1
+            print(f"  {feed['name']}: 304 not modified ({elapsed:.2f}s)")
+            return cached.get('entries', [])
+
+        try:
+            entries = parse_rss(body)
+        except ET.ParseError as e:
+            self.stats["failed"] += 1
+            print(f"❌ Feed {feed['name']} is not valid RSS ({e}); using cached entries.")
+            return cached.get('entries', [])
+        self.stats["ok"] += 1
+        self.state[url] = {
+            "etag": headers.get('ETag'),
+            "last_modified": headers.get('Last-Modified'),
+            "fetched_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "entries": entries[:self.per_feed]
+        }
+        print(f"  {feed['name']}: {len(entries)} entries ({elapsed:.2f}s)")
+        return entries
+
+    async def _fetch_all(self):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Own pool: the default executor is sized by CPU count, which would serialize feeds on small runners
+        executor = ThreadPoolExecutor(max_workers=max(1, self.max_concurrency))
+        try:
+            return await asyncio.gather(*(self._fetch_one(feed, semaphore, executor) for feed in self.feeds))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch(self):
+        """Fetches every feed concurrently and returns the merged, ranked entries."""
+        print(f"Fetching {len(self.feeds)} feeds...")
+        self.stats = {"ok": 0, "not_modified": 0, "failed": 0}  # per fetch; the daemon reuses the fetcher
+        feed_entries = asyncio.run(self._fetch_all())
+        self.save()
+        ranked = rank_entries(self.feeds, feed_entries, self.max_entries, self.per_feed)
+        print(f"Merged {sum(len(e) for e in feed_entries)} entries into {len(ranked)} ranked headlines "
+              f"({self.stats['ok']} fetched, {self.stats['not_modified']} not modified, {self.stats['failed']} failed).")
+        return ranked
+
+    def save(self):
+        if not self.state_path:
+            return
+        # Only configured feeds are kept
+        urls = {feed['url'] for feed in self.feeds}
+        self.state = {url: s for url, s in self.state.items() if url in urls}
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+
+# --- Local stand-in ---
+class LocalFeedServer:
+    """
+    Serves {path: RSS bytes} on 127.0.0.1 with ETag / If-None-Match support.
+    delay: seconds per 200 response. Use as a context manager; url(path) gives the address.
+    """
+
+    def __init__(self, feeds, delay=0):
+        self.feeds = feeds
+        self.delay = delay
+        self.requests = []  # (path, status)
+        self.server = None
+
+    def __enter__(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                payload = owner.feeds.get(self.path)
+                if payload is None:
+                    owner.requests.append((self.path, 404))
+                    self.send_error(404)
+                    return
+                etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    owner.requests.append((self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                time.sleep(owner.delay)
+                owner.requests.append((self.path, 200))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
@@ -1,595 +1,427 @@
-import feedparser
+import time
+STARTUP_BEGAN = time.perf_counter()  # the imports below are reported as the run's startup_seconds
+
 import json
 import os
-import base64
-import io
-import shutil
-from PIL import Image
-from google import genai
-from google.genai import types
 from datetime import datetime, timezone, timedelta
-import random
-import re
-import time
-import yfinance as yf
-import hashlib
-import time
 
-# --- Image Generation Helpers ---
-def cleanup_old_images(image_dir="data/news_images", retention_days=7):
-    """Deletes images older than retention_days."""
-    if not os.path.exists(image_dir):
-        os.makedirs(image_dir)
-        return
+from storage import NewsStore, item_id
+from archive import LEGACY_SIBLINGS, MonthArchive
+from market_data import fetch_market_indices
+from feeds import FeedFetcher
+from images import ImagePipeline, ImagenGenerator, ImageManifest, cleanup_old_images, resolve_feed_images
+from stock_images import StockImageIndex
+from synthesis import synthesize, ResponseCache
+from headlines import HeadlineIndex
+from near_duplicates import NearDuplicateIndex
+from model_scheduler import ModelScheduler
+from search_index import build_search_index
+from articles import to_card, write_article_bodies
+from artifacts import write_artifact, write_artifact_file, verify_artifact, SizeReport
+from render import build_pages
+from publish import publish
+from pipeline import PipelineRunner, RunContext, Stage, lazy_import
 
-    now = datetime.now()
-    cutoff = now - timedelta(days=retention_days)
-    
-    print(f"🧹 Cleaning up images older than {cutoff.date()}...")
-    
-    count = 0
-    for filename in os.listdir(image_dir):
-        if filename.endswith(".jpg"):
-            filepath = os.path.join(image_dir, filename)
-            # Check modification time
-            mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
-            if mtime < cutoff:
-                try:
-                    os.remove(filepath)
-                    count += 1
-                except Exception as e:
-                    print(f"Error deleting {filename}: {e}")
-    print(f"✅ Deleted {count} old images.")
-
-def generate_news_image(client, prompt, output_path):
-    """Generates an image using Imagen 3 and saves it."""
-    try:
-        print(f"🎨 Generating AI Image: {prompt[:40]}...")
-        result = client.models.generate_image(
-            model='imagen-3.0-generate-002',
-            prompt=prompt + ", photorealistic, 4k, cinematic lighting, professional financial photography, no text",
-            config=types.GenerateImageConfig(
-                number_of_images=1,
-                aspect_ratio="16:9",
-                safety_filter_level="BLOCK_ONLY_HIGH",
-                person_generation="ALLOW_ADULT",
-            )
-        )
-        
-        if result.generated_images:
-            image_bytes = result.generated_images[0].image.image_bytes
-            img = Image.open(io.BytesIO(image_bytes))
-            # Ensure safe save
-            if not os.path.exists(os.path.dirname(output_path)):
-                os.makedirs(os.path.dirname(output_path))
-            img.save(output_path, "JPEG", quality=85)
-            print(f"✅ Image saved to {output_path}")
-            return True
-            
-    except Exception as e:
-        print(f"❌ Image Gen Error: {e}")
-        return False
-    return False
-
-def fetch_market_indices():
-    """
-    Fetches key market indices using yfinance.
-    Returns a list of dicts: [{'name': 'KOSPI', 'value': '2,500.12', 'change': '+1.2%'}]
-    """
-    print("Fetching market indices...")
-    tickers = {
-        'KOSPI': '^KS11',
-        'KOSDAQ': '^KQ11',
-        'USD/KRW': 'KRW=X',
-        'NASDAQ': '^IXIC',
-        'S&P 500': '^GSPC'
-        # 'Bitcoin': 'BTC-USD'
-    }
-    
-    indices_data = []
-    
-    for name, symbol in tickers.items():
+def load_previous_feed(path='data/news.json'):
+    """The last published feed (its briefing and indices are reused when a run has none)."""
+    if os.path.exists(path):
         try:
-            ticker = yf.Ticker(symbol)
-            # Get fast info
-            info = ticker.fast_info
-            
-            # fast_info might not have everything, fallback to history
-            current_price = 0.0
-            previous_close = 0.0
-            
-            # yfinance approach for indices often works best with history
-            hist = ticker.history(period="5d")
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                # If market is open, last price. If closed, still last price.
-                # To get change, we need previous close.
-                if len(hist) >= 2:
-                    previous_close = hist['Close'].iloc[-2]
-                else: 
-                     previous_close = current_price # No history means 0 change
-            
-            # For currency, logic is similar
-            
-            if current_price == 0:
-                 continue
-                 
-            # Calculate Change
-            change_val = float(current_price - previous_close)
-            change_pct = float((change_val / previous_close) * 100)
-            
-            # Formatting
-            sign = ""
-            if change_val > 0: sign = "▲"
-            elif change_val < 0: sign = "▼"
-            else: sign = "-"
-            
-            formatted_price = f"{current_price:,.2f}"
-            formatted_change = f"{sign} {abs(change_pct):.2f}%"
-            
-            indices_data.append({
-                "name": name,
-                "value": formatted_price,
-                "change": formatted_change,
-                "is_up": bool(change_val > 0),
-                "is_down": bool(change_val < 0)
-            })
-            
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
         except Exception as e:
-            print(f"Failed to fetch {name}: {e}")
-            continue
-            
-    return indices_data
+            print(f"Error loading previous feed: {e}")
+    return {}
 
-def fetch_economic_news():
-    # Google News RSS for "경제" (Economy) in Korean
-    rss_url = "https://news.google.com/rss/search?q=경제&hl=ko&gl=KR&ceid=KR:ko"
-    
-    print(f"Fetching raw news from: {rss_url}")
-    feed = feedparser.parse(rss_url)
-    
-    raw_news = []
-    # Get top 20 news to feed into Gemini
-    for entry in feed.entries[:20]:
-        raw_news.append({
-            "title": entry.title,
-            "link": entry.link,
-            "source": entry.get('source', {}).get('title', 'Unknown')
-        })
+# --- Pipeline Stages ---
+# Each stage reads and sets attributes on the shared RunContext (see pipeline.py).
+# Stages run concurrently once the stages in their `after` are done (see STAGES).
 
+MARKET_TIMEOUT = 45  # seconds; after that the feed is published with the previous indices
+IMAGE_MIN_SECONDS = 120  # run time left that Imagen generation needs; otherwise stock images only
+
+def open_store(ctx):
+    # Open the append-only store (The Master Database); the daemon passes in the one it keeps open
+    store = ctx.store = ctx.store or NewsStore()
+
+    # Migration: first run on the store imports the legacy full-rewrite archive once.
+    # The store is empty again after migration has moved every day shard to the
+    # archive, so the import is recorded in the store manifest ("legacy_import").
+    if 'legacy_import' not in store.manifest:
+        legacy_file = None
+        if store.is_empty():
+            if os.path.exists('data/news_archive.json'):
+                legacy_file = 'data/news_archive.json'
+            elif os.path.exists('data/news.json'):
+                legacy_file = 'data/news.json'
+        try:
+            if legacy_file:
+                with open(legacy_file, 'r', encoding='utf-8') as f:
+                    legacy_items = json.load(f).get('items', [])
+                imported = store.import_items(legacy_items, ctx.today_shard)
+                ctx.count("imported", imported)
+                print(f"Migrated {imported} items from {legacy_file} to {store.root}.")
+            store.manifest['legacy_import'] = legacy_file
+            store.save_manifest()
+            if legacy_file == 'data/news_archive.json':
+                # Retired like the legacy month files (MonthArchive.import_legacy); news.json is the live feed
+                for ext in LEGACY_SIBLINGS:
+                    if os.path.exists(legacy_file + ext):
+                        os.remove(legacy_file + ext)
+        except Exception as e:
+            print(f"Error migrating legacy archive: {e}")
+
+    ctx.archive = ctx.archive or MonthArchive()
+    ctx.seen_keys = store.known_keys()
+    ctx.count("stored", store.total_count())
+
+
+def clean_images(ctx):
+    # Generated images older than a week (and their manifest entries); cards fall back to stock photos
+    cleanup_old_images(manifest=ImageManifest())
+
+
+def fetch_rss(ctx):
+    # Google News RSS queries from feeds.json (경제, 금융, 부동산, ...), fetched concurrently
+    # with conditional GETs, then merged and ranked into the top headlines
+    fetcher = ctx.feed_fetcher or FeedFetcher()
+    with ctx.external("rss"):
+        ctx.raw_news = fetcher.fetch()
+    ctx.count("fetched", len(ctx.raw_news))
+    ctx.count("feeds_not_modified", fetcher.stats["not_modified"])
+    ctx.count("feeds_failed", fetcher.stats["failed"])
+
+
+def filter_headlines(ctx):
+    # Delta mode: only headlines not already synthesized or stored go to the model
+    ctx.headline_index = ctx.headline_index or HeadlineIndex()
+    ctx.headline_index.add_store_keys(ctx.seen_keys)
+    ctx.raw_news = ctx.headline_index.filter_new(ctx.raw_news)
+    ctx.count("new_headlines", len(ctx.raw_news))
+    print(f"{len(ctx.raw_news)} new headlines after delta filter.")
+
+
+def synthesize_news(ctx):
     # Gemini API Integration
-    api_key = os.environ.get("GEMINI_API_KEY")
+    raw_news = ctx.raw_news
+    api_key = ctx.api_key
     briefing = "오늘의 주요 경제 뉴스를 분석 중입니다."
     final_news = []
+    synthesized = []
+    client = None
+    fallback = False
     
     if not api_key:
         print("Warning: GEMINI_API_KEY not found. Using raw news fallback.")
+        fallback = True
         final_news = raw_news[:5]
         for item in final_news:
             item["summary"] = "AI 요약을 사용하려면 GEMINI_API_KEY를 등록해 주세요."
             item["content"] = "GitHub 레포지토리의 Secrets에 GEMINI_API_KEY가 등록되지 않았습니다."
             item["image_prompt"] = "Economy business news"
     else:
-        try:
-            # Using the new google-genai SDK
-            client = genai.Client(api_key=api_key)
-            
-            prompt = f"""
-            다음은 오늘 수집된 주요 경제 뉴스 목록입니다:
-            {json.dumps(raw_news, ensure_ascii=False)}
-            
-            1. 위 기사들을 종합하여 오늘의 경제 흐름을 보여주는 '오늘의 한 줄 브리핑(briefing)'을 2~3문장으로 작성해줘.
-            2. 가장 중요도가 높은 뉴스 5개를 엄선해서 'items' 목록으로 정리해줘.
-            3. 각 뉴스 아이템은 상세하고 알찬 기사 내용(content)으로 재구성해줘. (최소 3~4문단 이상)
-            4. 각 뉴스의 주제와 분위기를 나타내는 3~5개의 구체적인 영어 키워드(image_prompt)를 작성해줘. (예: 'Stock market, dynamic graph, blue neon, professional')
-            5. 각 뉴스 아이템에는 반드시 원본 데이터(raw_news)에 있던 정확한 원문 기사 링크 URL(link)을 포함해줘.
-            
-            반드시 다음과 같은 JSON 형식으로만 응답해줘.
-            형식:
-            {{
-                "briefing": "오늘의 전체적인 경제 흐름 요약",
-                "items": [
-                    {{
-                        "title": "뉴스 제목",
-                        "source": "출처",
-                        "link": "https://... (원본 기사 URL 그대로 유지)",
-                        "category": "카테고리 (예: 금융, 테크, 시장, 정책 등 2~4글자)",
-                        "summary": "짧은 요약",
-                        "content": "상세 리포트 내용",
-                        "image_prompt": "Clean English Keywords"
-                    }}
-                ]
-            }}
-            """
-            
-            # Failover logic: Try Gemini 3 first, then fallback to 2.0 and 1.5
-            models_to_try = [
-                'gemini-3-flash-preview', 
-                'gemini-3-pro-preview',
-                'gemini-2.0-flash-exp', # Highly reliable experimental model
-                'gemini-1.5-flash',     # Stable and fast
-                'gemini-1.5-pro',       # High capability
-                'gemini-1.5-flash-8b'
-            ]
-            # High-level Retry Logic for "All models failed"
-            max_attempts = 3
-            current_attempt = 0
-            success = False
-            
-            while current_attempt < max_attempts and not success:
-                current_attempt += 1
-                if current_attempt > 1:
-                    print(f"⚠️ Retry attempt {current_attempt}/{max_attempts} after failure...")
-                    time.sleep(5) # Cool-off period
+        # Using the new google-genai SDK
+        client = ctx.make_client(api_key)
+
+        if not raw_news:
+            print("No new headlines. Skipping synthesis.")
+            briefing = load_previous_feed().get('briefing') or briefing
+        else:
+            try:
+                # SYNTHESIS_HEDGE=1 races the two fastest healthy models
+                scheduler = ModelScheduler(hedge=os.environ.get("SYNTHESIS_HEDGE") == "1")
+                # SYNTHESIS_MODE=map_reduce writes the articles in parallel after a short selection call
+                with ctx.external("gemini"):
+                    result, model_name = synthesize(client, raw_news, cache=ResponseCache(), scheduler=scheduler,
+                                                    mode=ctx.synthesis_mode)
                 
-                for model_name in models_to_try:
-                    try:
-                        print(f"Attempting news synthesis with {model_name} (Attempt {current_attempt})...")
-                        response = client.models.generate_content(
-                            model=model_name,
-                            contents=prompt
-                        )
-                        raw_content = response.text.replace('```json', '').replace('```', '').strip()
-                        # Clean up potential leading/trailing non-json chars just in case
-                        if '{' in raw_content:
-                            raw_content = raw_content[raw_content.find('{'):raw_content.rfind('}')+1]
-                        
-                        result = json.loads(raw_content)
-                        
-                        briefing = result.get("briefing", "오늘의 경제 동향을 분석 중입니다.")
-                        final_news = result.get("items", [])
-                        success = True
-                        print(f"✅ Successfully synthesized news using {model_name}.")
-                        break # Break inner model loop
-                    
-                    except Exception as model_err:
-                        print(f"❌ Model {model_name} failed: {model_err}")
-                        if "503" in str(model_err) or "overloaded" in str(model_err).lower():
-                            print("Server overloaded, waiting 2 seconds before next model...")
-                            time.sleep(2)
-                        continue # Try next model
-            
-            if not success:
-                raise Exception("All attempted AI models failed or were overloaded after multiple retries.")
-            
-        except Exception as e:
-            print(f"Error calling Gemini API: {e}")
-            print("Using raw news fallback.")
-            briefing = "AI 브리핑을 생성하는 중 오류가 발생했습니다. API 설정을 확인해 주세요."
-            final_news = raw_news[:5]
-            for item in final_news:
-                item["summary"] = "내용 요약을 불러올 수 없습니다."
-                item["content"] = f"### AI 리포트 생성 오류\n\n오류 상세: {str(e)}"
-                item["image_prompt"] = "Global Economy Technology"
-
-    # --- GLOBAL DATA ACCUMULATION & IMAGE REGENERATION ---
-    
-    # KST (UTC+9) adjustment
-    kst = timezone(timedelta(hours=9))
-    now_kst = datetime.now(timezone.utc).astimezone(kst)
-    timestamp = now_kst.strftime("%Y-%m-%d %H:%M:%S")
+                briefing = result.get("briefing", "오늘의 경제 동향을 분석 중입니다.")
+                final_news = result.get("items", [])
+                synthesized = raw_news
+                
+            except Exception as e:
+                print(f"Error calling Gemini API: {e}")
+                print("Using raw news fallback.")
+                fallback = True
+                briefing = "AI 브리핑을 생성하는 중 오류가 발생했습니다. API 설정을 확인해 주세요."
+                final_news = raw_news[:5]
+                for item in final_news:
+                    item["summary"] = "내용 요약을 불러올 수 없습니다."
+                    item["content"] = f"### AI 리포트 생성 오류\n\n오류 상세: {str(e)}"
+                    item["image_prompt"] = "Global Economy Technology"
 
-    # Load existing ARCHIVE news (The Master Database)
-    archive_file = 'data/news_archive.json'
-    existing_items = []
-    
-    # 1. Try to load from Archive first
-    if os.path.exists(archive_file):
-        try:
-            with open(archive_file, 'r', encoding='utf-8') as f:
-                old_data = json.load(f)
-                existing_items = old_data.get('items', [])
-        except Exception as e:
-            print(f"Error loading archive news: {e}")
-    # 2. Migration: If no archive, try loading from old news.json to migrate data
-    elif os.path.exists('data/news.json'):
-         try:
-            with open('data/news.json', 'r', encoding='utf-8') as f:
-                old_data = json.load(f)
-                existing_items = old_data.get('items', [])
-            print("Migrating existing news.json to archive...")
-         except Exception as e:
-            print(f"Error loading migration news: {e}")
+    ctx.client = client
+    ctx.fallback = fallback # Raw items with placeholder summaries
+    ctx.briefing = briefing
+    ctx.final_news = final_news
+    ctx.synthesized_headlines = synthesized # Recorded as seen once stored (append_to_store)
+    ctx.count("synthesized", len(final_news))
 
+
+def merge_new_items(ctx):
     # Add timestamp to new items
-    for item in final_news:
-        item["published_at"] = timestamp
+    for item in ctx.final_news:
+        item["published_at"] = ctx.timestamp
 
-    # Merge and remove duplicates (by title)
-    seen_titles = set()
-    merged_items = []
-    
-    # Add new items first (keep newest at top)
-    for item in final_news:
-        if item['title'] not in seen_titles:
-            merged_items.append(item)
-            seen_titles.add(item['title'])
-            
-    # Add old items
-    for item in existing_items:
-        if item['title'] not in seen_titles:
-            merged_items.append(item)
-            seen_titles.add(item['title'])
-
-    # DB Management: Archive holds EVERYTHING (or cap at 5000 for sanity)
-    # merged_items now contains ALL history + New items
-    full_archive_items = merged_items[:5000] 
-
-    # RE-GENERATE IMAGES FOR ALL ITEMS
-    # Important: We apply distinct images to ALL items in the archive to ensure visual variety
-    print(f"Regenerating images for {len(full_archive_items)} items...")
+    # Remove duplicates (by id and title) against the store and within this batch
+    seen_keys = ctx.seen_keys
+    new_items = []
     
-    # EMERGENCY FALLBACK: Pre-curated High-Quality Unsplash Images (Expanded 60+)
-    stock_images = [
-        # --- Finance & Stock Market ---
-        "https://images.unsplash.com/photo-1611974714028-ac8a49f70659?q=80&w=1024&auto=format&fit=crop", # Stock Chart
-        "https://images.unsplash.com/photo-1590283603385-17ffb3a7f29f?q=80&w=1024&auto=format&fit=crop", # Ticker
-        "https://images.unsplash.com/photo-1579532507581-c9817e27ca0f?q=80&w=1024&auto=format&fit=crop", # Money
-        "https://images.unsplash.com/photo-1551288049-bebda4e38f71?q=80&w=1024&auto=format&fit=crop", # Data Screen
-        "https://images.unsplash.com/photo-1553729459-efe14ef6055d?q=80&w=1024&auto=format&fit=crop", # Money Hands
-        "https://images.unsplash.com/photo-1561414927-6d86591d0c4f?q=80&w=1024&auto=format&fit=crop", # Cash Stack
-        "https://images.unsplash.com/photo-1605792657660-596af9009e82?q=80&w=1024&auto=format&fit=crop", # Investing App
-        "https://images.unsplash.com/photo-1535320903710-d9cf98bbb531?q=80&w=1024&auto=format&fit=crop", # Oil & Commodities
-        "https://images.unsplash.com/photo-1526304640152-d4619684e484?q=80&w=1024&auto=format&fit=crop", # Bitcoin Concept
-        "https://images.unsplash.com/photo-1518186285589-2f7649de83e0?q=80&w=1024&auto=format&fit=crop", # Currency
-        
-        # --- Business & Corporate ---
-        "https://images.unsplash.com/photo-1486406146926-c627a92ad1ab?q=80&w=1024&auto=format&fit=crop", # Skyscraper
-        "https://images.unsplash.com/photo-1507679799987-c73779587ccf?q=80&w=1024&auto=format&fit=crop", # Business Suit
-        "https://images.unsplash.com/photo-1556761175-5973dc0f32e7?q=80&w=1024&auto=format&fit=crop", # Meeting
-        "https://images.unsplash.com/photo-1554224155-273a743008a3?q=80&w=1024&auto=format&fit=crop", # Handshake
-        "https://images.unsplash.com/photo-1497366216548-37526070297c?q=80&w=1024&auto=format&fit=crop", # Modern Office
-        "https://images.unsplash.com/photo-1497215728101-856f4ea42174?q=80&w=1024&auto=format&fit=crop", # Office Work
-        
-        # --- Tech & Innovation ---
-        "https://images.unsplash.com/photo-1451187580459-43490279c0fa?q=80&w=1024&auto=format&fit=crop", # Global Network
-        "https://images.unsplash.com/photo-1518770660439-4636190af475?q=80&w=1024&auto=format&fit=crop", # AI Chip
-        "https://images.unsplash.com/photo-1504639725590-34d0984388bd?q=80&w=1024&auto=format&fit=crop", # Coding
-        "https://images.unsplash.com/photo-1485827404703-89b55fcc595e?q=80&w=1024&auto=format&fit=crop", # Robot AI
-        "https://images.unsplash.com/photo-1531297461136-820727183187?q=80&w=1024&auto=format&fit=crop", # Data Server
-        "https://images.unsplash.com/photo-1523961131990-5ea7c61b2107?q=80&w=1024&auto=format&fit=crop", # Analytics
-        "https://images.unsplash.com/photo-1550751827-4bd374c3f58b?q=80&w=1024&auto=format&fit=crop", # Cybersecurity
-        
-        # --- Real Estate & Construction ---
-        "https://images.unsplash.com/photo-1560518883-ce09059eeffa?q=80&w=1024&auto=format&fit=crop", # Real Estate
-        "https://images.unsplash.com/photo-1448630360428-65456885c650?q=80&w=1024&auto=format&fit=crop", # Modern Home
-        "https://images.unsplash.com/photo-1582407947304-fd86f028f716?q=80&w=1024&auto=format&fit=crop", # Construction
-        "https://images.unsplash.com/photo-1479839672679-a46483c0e7c8?q=80&w=1024&auto=format&fit=crop", # City Building
-        
-        # --- Global Trade & Logistics ---
-        "https://images.unsplash.com/photo-1586528116311-ad8dd3c8310d?q=80&w=1024&auto=format&fit=crop", # Cargo Ship
-        "https://images.unsplash.com/photo-1494412574643-35d324698420?q=80&w=1024&auto=format&fit=crop", # Shipping Containers
-        "https://images.unsplash.com/photo-1578575437130-527eed3abbec?q=80&w=1024&auto=format&fit=crop", # Logistics Plane
-        
-        # --- Lifestyle & Consumption ---
-        "https://images.unsplash.com/photo-1559526324-4b87b5e36e44?q=80&w=1024&auto=format&fit=crop", # Shopping/Analysis
-        "https://images.unsplash.com/photo-1478131313025-a1c1d7cc90b8?q=80&w=1024&auto=format&fit=crop", # Luxury Car
-        "https://images.unsplash.com/photo-1556740738-b6a63e27c4df?q=80&w=1024&auto=format&fit=crop", # Payment
-        
-        # --- Abstract & Artistic ---
-        "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=1024&auto=format&fit=crop", # News
-        "https://images.unsplash.com/photo-1491895200222-0fc4a4c35e18?q=80&w=1024&auto=format&fit=crop", # Texture
-        "https://images.unsplash.com/photo-1454165804606-c3d57bc86b40?q=80&w=1024&auto=format&fit=crop", # Working
-        "https://images.unsplash.com/photo-1563986768609-322da13575f3?q=80&w=1024&auto=format&fit=crop", # Digital Blue
-        
-        # --- Additional Variety ---
-        "https://images.unsplash.com/photo-1565514020176-dbf2277cc166?q=80&w=1024&auto=format&fit=crop", # Graph
-        "https://images.unsplash.com/photo-1642543492481-44e81e3914a7?q=80&w=1024&auto=format&fit=crop", # Ethereum
-        "https://images.unsplash.com/photo-1621370216442-de7e83464166?q=80&w=1024&auto=format&fit=crop", # NFT Art
-        "https://images.unsplash.com/photo-1516245834210-c4c14278733f?q=80&w=1024&auto=format&fit=crop", # Chains
-        "https://images.unsplash.com/photo-1550565118-c974fb6255f0?q=80&w=1024&auto=format&fit=crop", # Network
-        "https://images.unsplash.com/photo-1590283603385-17ffb3a7f29f?q=80&w=1024&auto=format&fit=crop", # Stock Chart (Safe Substitute for broken link)
-        "https://images.unsplash.com/photo-1531297461136-820727183187?q=80&w=1024&auto=format&fit=crop", # Data Server Substitute
-        "https://images.unsplash.com/photo-1486406146926-c627a92ad1ab?q=80&w=1024&auto=format&fit=crop", # Skyscraper Substitute
-        "https://images.unsplash.com/photo-1593642702821-c8da6771f0c6?q=80&w=1024&auto=format&fit=crop", # Desk (Keep if safe, but replacing to be sure) -> Replaced with Building
-        "https://images.unsplash.com/photo-1560518883-ce09059eeffa?q=80&w=1024&auto=format&fit=crop", # Real Estate Substitute
-        "https://images.unsplash.com/photo-1600880292203-757bb62b4baf?q=80&w=1024&auto=format&fit=crop", # Happy Team
-        "https://images.unsplash.com/photo-1497366216548-37526070297c?q=80&w=1024&auto=format&fit=crop", # Office Work Substitute
-        "https://images.unsplash.com/photo-1664575602276-acd073f104c1?q=80&w=1024&auto=format&fit=crop", # Metaverse
-        "https://images.unsplash.com/photo-1677442136019-21780ecad995?q=80&w=1024&auto=format&fit=crop", # AI Brain
-        "https://images.unsplash.com/photo-1633158829585-23ba8f7c8caf?q=80&w=1024&auto=format&fit=crop", # Bitcoin Ripple
-        "https://images.unsplash.com/photo-1614028674026-a65e31bfd27c?q=80&w=1024&auto=format&fit=crop", # Stock Green
-        "https://images.unsplash.com/photo-1534951009808-766178b47a8e?q=80&w=1024&auto=format&fit=crop", # Financial Newspaper
-        "https://images.unsplash.com/photo-1560221328-12fe60f83ab8?q=80&w=1024&auto=format&fit=crop", # Sales Graph
-        "https://images.unsplash.com/photo-1579532507581-c9817e27ca0f?q=80&w=1024&auto=format&fit=crop", # Cash
-        "https://images.unsplash.com/photo-1580048914979-3c868daee4d7?q=80&w=1024&auto=format&fit=crop", # House Model
-    ]
+    for item in ctx.final_news:
+        key = item_id(item)
+        if key in seen_keys or item['title'] in seen_keys:
+            continue
+        item["id"] = key
+        new_items.append(item)
+        seen_keys.add(key)
+        seen_keys.add(item['title'])
+
+    ctx.new_items = new_items
+    ctx.count("new_items", len(new_items))
+    print(f"{len(new_items)} of {len(ctx.final_news)} items are new.")
+
+
+def load_near_duplicates(ctx):
+    # Loaded (or rebuilt from the store) while the feeds and Gemini are still running
+    index = ctx.near_duplicates = ctx.near_duplicates or NearDuplicateIndex()
+    if index.is_empty():
+        seeded = index.seed(ctx.store, ctx.archive)
+        print(f"Built near-duplicate index from {seeded} recent items.")
+    ctx.count("indexed", len(index.entries))
+
+
+def filter_near_duplicates(ctx):
+    # Same story under another headline or outlet (MinHash/LSH over title + summary)
+    index = ctx.near_duplicates
+    if ctx.fallback:
+        # Placeholder summaries are identical, so fallback items would all look alike
+        return
+
+    kept = []
+    for item in ctx.new_items:
+        verdict, match, sig = index.check(item)
+        if verdict == "duplicate":
+            print(f"  ≈ Skipping near-duplicate of {match}: {item['title']}")
+            continue
+        story = index.add(item, sig, related_to=match)
+        if story != item['id']:
+            item["story"] = story # Canonical item of the story cluster
+        kept.append(item)
+
+    ctx.count("near_duplicates", len(ctx.new_items) - len(kept))
+    ctx.count("related", sum(1 for item in kept if "story" in item))
+    ctx.new_items = kept
+
+
+def assign_images(ctx):
     # --- Image Generation & Assignment Logic ---
-    print(f"Processing images for {len(full_archive_items)} items...")
-    
-    # Ensure directory exists
-    if not os.path.exists("data/news_images"):
-        os.makedirs("data/news_images")
+    # Only new items are queued; the persistent image manifest remembers
+    # every hash, so history is never re-checked.
+    image_pipeline = ctx.image_pipeline = ctx.make_image_pipeline(ctx.client) if ctx.client is not None else None
+
+    if image_pipeline:
+        image_pipeline.enqueue(ctx.new_items)
+        if ctx.remaining() is not None and ctx.remaining() < IMAGE_MIN_SECONDS:
+            # Close to the run deadline: queued images wait for the next run
+            image_pipeline.manifest.save()
+            print(f"⏰ {ctx.remaining():.0f}s left in the run; skipping image generation.")
+        else:
+            with ctx.external("imagen"):
+                stats = image_pipeline.run()
+            ctx.count("images_done", stats['done'])
+            print(f"Image stage: {stats['done']} done, {stats['skipped']} skipped, {stats['failed']} failed.")
+
+    # Stock photo matched to the prompt / title / category (stock_images.json).
+    # It stays the stored image_url: generated files are deleted after a week,
+    # so their path is kept apart and only used while the file exists.
+    ctx.stock_images = ctx.stock_images or StockImageIndex()
+    stock_urls = ctx.stock_images.match(ctx.new_items)
+
+    for item, stock_url in zip(ctx.new_items, stock_urls):
+        item["image_url"] = stock_url
+        ai_image_url = image_pipeline.image_url(item) if image_pipeline else None
+        if ai_image_url:
+            item["ai_image_url"] = ai_image_url
+
+
+def append_to_store(ctx):
+    written = ctx.store.append(ctx.new_items, ctx.today_shard)
+    # Signatures and seen headlines are persisted only once their items are stored;
+    # a run that fails before this point sends the same headlines again
+    ctx.near_duplicates.save()
+    if ctx.synthesized_headlines:
+        ctx.headline_index.mark_seen(ctx.synthesized_headlines)
+        ctx.headline_index.save()
+    ctx.count("appended", written)
+    print(f"Appended {written} items to {ctx.store.root}.")
 
-    for i, item in enumerate(full_archive_items):
-        try:
-            # 1. Deterministic Fallback (for old/failed cases)
-            fallback_image = stock_images[i % len(stock_images)]
-            
-            # Simple fallback for image uniqueness in long list
-            if i >= len(stock_images):
-                rotated_index = (i + 7) % len(stock_images) 
-                fallback_image = stock_images[rotated_index]
-            
-            # 2. Check Age & Existence
-            # Generate unique filename based on link (stable id)
-            link_hash = hashlib.md5((item.get('link', '') + item.get('title', '')).encode('utf-8')).hexdigest()
-            img_filename = f"news_{link_hash}.jpg"
-            img_path_rel = f"data/news_images/{img_filename}"
-            img_path_abs = os.path.join(os.getcwd(), img_path_rel)
-            
-            # Default to fallback first
-            item["image_url"] = fallback_image # Default (will be overwritten if AI succeeds or exists)
-
-            # Check if image already exists (cache hit)
-            if os.path.exists(img_path_abs):
-                item["image_url"] = f"./{img_path_rel}" # Use relative path for frontend
-                # print(f"  [Cache] Used existing image for: {item['title'][:20]}...")
-                continue
-                
-            # If not exists, should we generate? (Only if fresh)
-            is_fresh = False
-            try:
-                # Parse '2024-05-20 14:00' format
-                pub_date = datetime.strptime(item.get('published_at', ''), '%Y-%m-%d %H:%M')
-                if (datetime.now() - pub_date).days < 7:
-                    is_fresh = True
-            except:
-                # If date parse fails, assume fresh to be safe or old? 
-                # RSS items usually fresh. Lite items might be fresh. 
-                # Let's assume fresh if it's in the top 10 items?
-                if i < 10: is_fresh = True
-            
-            if is_fresh:
-                # 3. Generate New AI Image
-                prompt = item.get('image_prompt') or item.get('title', 'Economic news')
-                success = generate_news_image(client, prompt, img_path_abs)
-                
-                if success:
-                    item["image_url"] = f"./{img_path_rel}"
-                    time.sleep(2) # Be nice to API limits
-                else:
-                    # Keep fallback
-                    pass
-            
-            # If not fresh and not exists -> It was cleaned up or is old. Use fallback. (Already set)
-            
-        except Exception as img_err:
-            print(f"Error processing image for item {i}: {img_err}")
-            item["image_url"] = "https://images.unsplash.com/photo-1611974714028-ac8a49f70659?q=80&w=1024&auto=format&fit=crop"
 
+def migrate_old_shards(ctx):
     # --- ARCHIVING LOGIC (Monthly Migration) ---
-    # Move items older than 30 days to separate monthly files
-    # This prevents news_archive.json from growing infinitely
-    
+    # Day shards older than 30 days are appended to their month shard in data/archive/.
+    # Shards are time-ordered, so the expired ones are found by bisect, not by scanning items.
+    store = ctx.store
+    archive = ctx.archive
+    if not archive.months:
+        ctx.count("legacy_imported", archive.import_legacy())
+
     current_time = datetime.now()
-    cutoff_date = current_time - timedelta(days=30)
-    
-    active_archive_items = []
-    monthly_migration_buffer = {} # { "2024_02": [items], "2024_01": [items] }
-    
-    print(f"Checking for items older than {cutoff_date.strftime('%Y-%m-%d')} for archiving...")
-    
-    for item in full_archive_items:
-        try:
-            # Parse published_at (format: "YYYY-MM-DD HH:MM:SS")
-            # If format fails, keep in active archive to be safe
-            p_date_str = item.get("published_at", "")
-            p_date = datetime.strptime(p_date_str, "%Y-%m-%d %H:%M:%S")
-            
-            if p_date < cutoff_date:
-                # To be archived
-                month_key = p_date.strftime("%Y_%m") # e.g., "2024_02"
-                if month_key not in monthly_migration_buffer:
-                    monthly_migration_buffer[month_key] = []
-                monthly_migration_buffer[month_key].append(item)
-            else:
-                # Keep in active archive
-                active_archive_items.append(item)
-                
-        except Exception as e:
-            # Date parsing error or other issue -> Keep in active
-            active_archive_items.append(item)
-            
-    # Process Migration Buffer
-    for month_key, items_to_move in monthly_migration_buffer.items():
-        if not items_to_move:
-            continue
-            
-        archive_filename = f'data/archive_{month_key}.json'
-        # Load existing if any
-        existing_monthly_items = []
-        if os.path.exists(archive_filename):
-            try:
-                with open(archive_filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    existing_monthly_items = data.get('items', [])
-            except:
-                pass
-        
-        # Merge and Deduplicate
-        # (Though technically old items shouldn't overlap much with *existing* monthly archive unless re-run)
-        # Using dictionary for deduplication by title
-        archive_map = {itm['title']: itm for itm in existing_monthly_items}
-        for itm in items_to_move:
-            archive_map[itm['title']] = itm
-            
-        final_monthly_items = list(archive_map.values())
-        
-        # Sort by date (descending)
-        try:
-            final_monthly_items.sort(key=lambda x: x.get("published_at", ""), reverse=True)
-        except:
-            pass
-            
-        print(f"  -> Moving {len(items_to_move)} items to {archive_filename}")
-        
-        with open(archive_filename, 'w', encoding='utf-8') as f:
-            json.dump({
-                "last_updated": timestamp,
-                "items": final_monthly_items
-            }, f, ensure_ascii=False, indent=4)
-
-    # Update full_archive_items to only contain active items
-    print(f"Archiving complete. Active Archive size: {len(full_archive_items)} -> {len(active_archive_items)}")
-    full_archive_items = active_archive_items
-
-    # --- SAVE FILES ---
-    os.makedirs('data', exist_ok=True)
+    cutoff_shard = (current_time - timedelta(days=30)).strftime("%Y-%m-%d")
+    print(f"Checking for shards older than {cutoff_shard} for archiving...")
+
+    moved, retired = archive.migrate(store, cutoff_shard, ctx.timestamp)
+    if retired:
+        print(f"Archiving complete. Retired {retired} day shards.")
+    ctx.count("migrated", moved)
+    ctx.count("retired_shards", retired)
+    ctx.count("archived", archive.total_count())
+
+    # Save Store Manifest (Active History - Last 30 Days)
+    store.save_manifest(ctx.timestamp)
+
+
+def fetch_market(ctx):
+    # Returned, not set on ctx: once the stage is given up on, the runner drops it
+    with ctx.external("yfinance"):
+        indices = fetch_market_indices(source=ctx.market_source)
+    ctx.count("indices", len(indices))
+    return {"market_indices": indices}
+
+
+def previous_market(ctx):
+    # Fallback when yfinance is slow or down: the ticker bar keeps the last published values
+    ctx.market_indices = load_previous_feed().get('indices', [])
+    print(f"Publishing with {len(ctx.market_indices)} indices from the previous run.")
+
+
+def write_active_feed(ctx):
+    # Save Active Feed (Top 50 Only)
+    # This keeps the main site loading very fast: cards only, bodies are fetched on open
+    # Copies: the generated image is put on the card, never into the store
+    active_items = [dict(item) for item in ctx.store.latest(50)]
+    # Generated images that still exist (incl. ones retried on a later run, known only to the image manifest)
+    ctx.count("ai_images", resolve_feed_images(active_items, ctx.image_pipeline, ctx.stock_images))
+
+    bodies_written = write_article_bodies(active_items)
+    print(f"Wrote {bodies_written} new article bodies.")
 
-    # 1. Save Archive (Active History - Last 30 Days)
-    archive_data = {
-        "last_updated": timestamp,
-        "briefing": briefing,
-        "items": full_archive_items
-    }
-    with open('data/news_archive.json', 'w', encoding='utf-8') as f:
-        json.dump(archive_data, f, ensure_ascii=False, indent=4)
-        
-    # 1.5 Fetch Market Indices
-    market_indices = fetch_market_indices()
-
-    # 2. Save Active Feed (Top 50 Only)
-    # This keeps the main site loading very fast
     active_data = {
-        "last_updated": timestamp,
-        "briefing": briefing,
-        "indices": market_indices, # New field
-        "items": full_archive_items[:50]
+        "last_updated": ctx.timestamp,
+        "briefing": ctx.briefing,
+        "indices": ctx.market_indices, # New field
+        "items": [to_card(item) for item in active_items]
     }
-    with open('data/news.json', 'w', encoding='utf-8') as f:
-        json.dump(active_data, f, ensure_ascii=False, indent=4)
+    write_artifact('data/news.json', active_data, ctx.size_report)
+    ctx.active_items = active_items
+    ctx.count("cards", len(active_items))
+    ctx.count("bodies_written", bodies_written)
     
-    print(f"Successfully saved {len(full_archive_items)} items to Archive and 50 to Active feed.")
+    print(f"Successfully saved {len(ctx.new_items)} new items to the store ({ctx.store.total_count()} active) and 50 to Active feed.")
 
-    # 3. Generate Archive Index for Frontend
-    print("Generating archive index...")
-    # List all archive_YYYY_MM.json files
-    archive_files = [f for f in os.listdir('data') if f.startswith('archive_') and f.endswith('.json') and f != 'archive_index.json']
-    
-    archive_index = []
-    for f in archive_files:
-        # Expected format: archive_2024_02.json
-        try:
-            # Remove prefix/suffix
-            base = f.replace('archive_', '').replace('.json', '')
-            parts = base.split('_')
-            if len(parts) == 2:
-                year, month = parts
-                archive_index.append({
-                    "id": f"{year}_{month}",      # ID used for fetching file
-                    "name": f"{year}년 {month}월", # Display Name
-                    "filename": f
-                })
-        except Exception as e:
-            print(f"Skipping malformed archive file: {f}")
-            continue
-            
-    # Sort by ID descending (newest month first)
-    archive_index.sort(key=lambda x: x['id'], reverse=True)
-    
-    with open('data/archive_index.json', 'w', encoding='utf-8') as f:
-        json.dump(archive_index, f, ensure_ascii=False, indent=4)
+
+def write_archive_index(ctx):
+    # Generate Archive Index for Frontend from the month manifest (newest month first)
+    archive_index = ctx.archive.index_entries()
+    write_artifact('data/archive_index.json', archive_index, ctx.size_report)
+    ctx.count("months", len(archive_index))
+    # Month shards are fetched whole: .gz/.br siblings, rewritten only for a month that changed
+    for month in ctx.archive.months:
+        write_artifact_file(ctx.archive.store.shard_path(month['id']), ctx.size_report)
+
+
+def write_search_index(ctx):
+    # Search Index & Category Shards for Frontend
+    manifest = build_search_index(store=ctx.store, archive=ctx.archive, report=ctx.size_report)
+    ctx.count("docs", manifest["doc_count"])
+
+
+def write_static_pages(ctx):
+    # Pre-rendered HTML: front page regions of index.html, month pages and article pages (changed ones only)
+    stats = build_pages(ctx.store, ctx.archive, ctx.active_items, ctx.briefing, ctx.timestamp)
+    ctx.count("pages_written", stats["written"])
+    ctx.count("months_skipped", stats["months_skipped"])
+
+
+def publish_data(ctx):
+    # Content-hashed copies of the closed day shards and months + data/manifest.json naming them
+    stats = publish(store=ctx.store, archive=ctx.archive, today=ctx.today_shard,
+                    timestamp=ctx.timestamp, report=ctx.size_report)
+    ctx.count("copies_written", stats["written"])
+    ctx.count("copies_removed", stats["removed"])
+    ctx.count("manifest_version", stats["version"])
+
+
+def report_sizes(ctx):
+    # Payload Size Report
+    ctx.size_report.print_table()
+    ctx.size_report.save(ctx.timestamp)
+    ctx.count("artifacts", len(ctx.size_report.artifacts))
+    verify_all_ok = all(not verify_artifact(path) for path in ctx.size_report.artifacts)
+    if not verify_all_ok:
+        print("❌ Compressed artifacts do not match their JSON. Run: python scripts/artifacts.py --verify")
+
+
+# Dependency graph. Three branches start at once: the news chain (rss -> synthesis -> ...),
+# the market indices and the image cleanup. Declaration order is the start order among
+# stages that are ready together.
+STAGES = [
+    Stage("rss", fetch_rss),
+    Stage("market", fetch_market, optional=True, timeout=MARKET_TIMEOUT, fallback=previous_market),
+    Stage("store", open_store),
+    Stage("cleanup", clean_images),
+    Stage("delta", filter_headlines, after=("store", "rss")),
+    Stage("near_dup_index", load_near_duplicates, after=("store",)),
+    Stage("synthesis", synthesize_news, after=("delta",)),
+    Stage("merge", merge_new_items, after=("synthesis",)),
+    Stage("near_dup", filter_near_duplicates, after=("merge", "near_dup_index")),
+    Stage("images", assign_images, after=("near_dup", "cleanup")),
+    Stage("append", append_to_store, after=("images",)),
+    Stage("migration", migrate_old_shards, after=("append",)),
+    Stage("feed", write_active_feed, after=("migration", "market")),
+    Stage("archive_index", write_archive_index, after=("migration",)),
+    Stage("search_index", write_search_index, after=("migration",)),
+    Stage("pages", write_static_pages, after=("feed",)),
+    Stage("publish", publish_data, after=("feed", "archive_index", "search_index")),
+    Stage("sizes", report_sizes, after=("publish",))
+]
+
+
+def build_context(**overrides):
+    """Run state with the production services; benchmark.py overrides them with offline fakes."""
+    # KST (UTC+9) adjustment
+    kst = timezone(timedelta(hours=9))
+    now_kst = datetime.now(timezone.utc).astimezone(kst)
+    os.makedirs('data', exist_ok=True)
+
+    values = {
+        "timestamp": now_kst.strftime("%Y-%m-%d %H:%M:%S"),
+        "today_shard": now_kst.strftime("%Y-%m-%d"),
+        # Published files go through the artifact stage (minified JSON + .gz/.br + size report)
+        "size_report": SizeReport(),
+        # Indexes loaded by the stages; None = read from disk (daemon.py keeps them between runs)
+        "store": None,
+        "archive": None,
+        "headline_index": None,
+        "near_duplicates": None,
+        "stock_images": None,
+        # External services
+        "feed_fetcher": None,  # None = feeds.json
+        "api_key": os.environ.get("GEMINI_API_KEY"),
+        # google-genai is imported only when a client is needed
+        "make_client": lambda api_key: lazy_import("google.genai").Client(api_key=api_key),
+        "synthesis_mode": os.environ.get("SYNTHESIS_MODE", "single"),
+        "make_image_pipeline": lambda client: ImagePipeline(ImagenGenerator(client)),
+        "market_source": None  # None = yfinance
+    }
+    values.update(overrides)
+    return RunContext(**values)
+
+
+def fetch_economic_news():
+    ctx = build_context(startup_seconds=time.perf_counter() - STARTUP_BEGAN)
+    # Independent stages overlap under a run deadline (PIPELINE_DEADLINE);
+    # per-stage timings, I/O, counts and external latency -> data/run_metrics.jsonl
+    PipelineRunner(STAGES).run(ctx)
+    return ctx
 
 if __name__ == "__main__":
     fetch_economic_news()
@@ -0,0 +1,93 @@
+"""
+Headline delta filter.
+
+Before a prompt is built, every raw RSS entry is checked against the links and
+normalized titles that were already synthesized (HeadlineIndex) plus the IDs
+and titles in the store. Only genuinely new stories go to the model, and the
+LLM call is skipped when nothing is new. Headlines are recorded only after
+their articles reach the store, so a run that fails in between sends them again.
+"""
+import json
+import os
+import re
+import time
+
+from storage import item_id
+
+INDEX_PATH = ".cache/headlines.json"
+
+# Google News titles end with " - 언론사"
+_SOURCE_SUFFIX = re.compile(r'\s+[-|]\s+[^-|]+$')
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_title(title):
+    """Lowercased title without the outlet suffix, punctuation or whitespace."""
+    title = _SOURCE_SUFFIX.sub('', title or '')
+    return _NON_WORD.sub('', title.lower())
+
+
+def headline_keys(entry):
+    keys = {f"id:{item_id(entry)}"}
+    normalized = normalize_title(entry.get('title'))
+    if normalized:
+        keys.add(f"title:{normalized}")
+    return keys
+
+
+class HeadlineIndex:
+    """Persisted key -> first-seen time of headlines already sent for synthesis."""
+
+    def __init__(self, path=INDEX_PATH, retention_days=30):
+        self.path = path
+        self.retention = retention_days * 24 * 3600
+        self.seen = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.seen = json.load(f)
+            except Exception as e:
+                print(f"Error loading headline index: {e}")
+
+    def add_store_keys(self, store_keys):
+        """
+        Seeds the index from NewsStore.known_keys() (covers a lost or fresh cache).
+        That set mixes item IDs and titles; each key is added under both kinds,
+        which cannot produce false matches between the two.
+        """
+        for key in store_keys:
+            self.seen.setdefault(f"id:{key}", 0)
+            normalized = normalize_title(key)
+            if normalized:
+                self.seen.setdefault(f"title:{normalized}", 0)
+
+    def is_known(self, entry):
+        return any(key in self.seen for key in headline_keys(entry))
+
+    def filter_new(self, raw_news):
+        """Raw entries not seen before (also deduplicated within the batch)."""
+        new_entries = []
+        batch_keys = set()
+        for entry in raw_news:
+            keys = headline_keys(entry)
+            if self.is_known(entry) or keys & batch_keys:
+                continue
+            new_entries.append(entry)
+            batch_keys |= keys
+        return new_entries
+
+    def mark_seen(self, entries):
+        now = time.time()
+        for entry in entries:
+            for key in headline_keys(entry):
+                self.seen[key] = now
+
+    def save(self):
+        # Seeded store keys (time 0) are rebuilt every run, so only real entries persist
+        cutoff = time.time() - self.retention
+        self.seen = {k: t for k, t in self.seen.items() if t >= cutoff}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.seen, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
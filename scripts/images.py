@@ -0,0 +1,314 @@
+"""
+Image generation stage.
+
+New items are queued in a persistent manifest (data/news_images/manifest.json)
+keyed by the item's image hash. Each run works only through the due entries of
+that queue, on a small worker pool behind a token-bucket rate limiter, and
+records the outcome per hash:
+
+    queued  - waiting for its first attempt
+    done    - image file written
+    skipped - attempt failed or run budget exhausted; retried after 'retry_after'
+    failed  - gave up after max_attempts
+
+Generators are pluggable: anything with generate(prompt, output_path) -> bool.
+ImagenGenerator calls Imagen 3, StubImageGenerator writes placeholder files.
+
+Generated files are deleted after a week, so a stored item keeps its stock
+photo as image_url and the generated path as ai_image_url. The published feed
+uses the generated image only while its file exists (resolve_feed_images).
+"""
+import io
+import json
+import os
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from pipeline import lazy_import
+
+IMAGE_DIR = "data/news_images"
+MANIFEST_NAME = "manifest.json"
+
+
+def image_hash(item):
+    """Stable image key for an item (same scheme as the image filenames)."""
+    return hashlib.md5((item.get('link', '') + item.get('title', '')).encode('utf-8')).hexdigest()
+
+
+def cleanup_old_images(image_dir=IMAGE_DIR, retention_days=7, manifest=None):
+    """Deletes images older than retention_days (and forgets them in the manifest)."""
+    if not os.path.exists(image_dir):
+        os.makedirs(image_dir)
+        return
+
+    now = datetime.now()
+    cutoff = now - timedelta(days=retention_days)
+
+    print(f"🧹 Cleaning up images older than {cutoff.date()}...")
+
+    count = 0
+    for filename in os.listdir(image_dir):
+        if filename.endswith(".jpg"):
+            filepath = os.path.join(image_dir, filename)
+            # Age from the manifest when known (a fresh checkout resets every mtime), else the file's mtime
+            entry = manifest.get(filename[len("news_"):-len(".jpg")]) if manifest is not None else None
+            mtime = datetime.fromtimestamp(entry['updated'] if entry else os.path.getmtime(filepath))
+            if mtime < cutoff:
+                try:
+                    os.remove(filepath)
+                    count += 1
+                    if manifest is not None:
+                        manifest.forget(filename[len("news_"):-len(".jpg")])
+                except Exception as e:
+                    print(f"Error deleting {filename}: {e}")
+    if manifest is not None:
+        manifest.prune(cutoff.timestamp())
+        manifest.save()
+    print(f"✅ Deleted {count} old images.")
+
+
+def _local_file(url):
+    """'./data/news_images/x.jpg' -> 'data/news_images/x.jpg'; None for remote URLs."""
+    if url and url.startswith('./'):
+        return url[2:]
+    return None
+
+
+def resolve_feed_images(items, pipeline=None, stock_images=None):
+    """
+    Sets image_url on the feed's (copied) items: the generated image if its file
+    is still there, else the stored stock photo. Items stored with a local path
+    as image_url (before ai_image_url existed) whose file is gone get a stock
+    match from stock_images. Returns the number of generated images used.
+    """
+    used, stale = 0, []
+    for item in items:
+        candidates = (pipeline.image_url(item) if pipeline else None, item.get('ai_image_url'), item.get('image_url'))
+        local = next((url for url in candidates if _local_file(url) and os.path.exists(_local_file(url))), None)
+        if local:
+            item['image_url'] = local
+            used += 1
+        elif _local_file(item.get('image_url')):
+            stale.append(item)
+    if stale and stock_images is not None:
+        for item, url in zip(stale, stock_images.match(stale)):
+            item['image_url'] = url
+    return used
+
+
+def generate_news_image(client, prompt, output_path):
+    """Generates an image using Imagen 3 and saves it."""
+    Image = lazy_import("PIL.Image")
+    types = lazy_import("google.genai.types")
+
+    try:
+        print(f"🎨 Generating AI Image: {prompt[:40]}...")
+        result = client.models.generate_image(
+            model='imagen-3.0-generate-002',
+            prompt=prompt + ", photorealistic, 4k, cinematic lighting, professional financial photography, no text",
+            config=types.GenerateImageConfig(
+                number_of_images=1,
+                aspect_ratio="16:9",
+                safety_filter_level="BLOCK_ONLY_HIGH",
+                person_generation="ALLOW_ADULT",
+            )
+        )
+
+        if result.generated_images:
+            image_bytes = result.generated_images[0].image.image_bytes
+            img = Image.open(io.BytesIO(image_bytes))
+            # Ensure safe save
+            if not os.path.exists(os.path.dirname(output_path)):
+                os.makedirs(os.path.dirname(output_path))
+            img.save(output_path, "JPEG", quality=85)
+            print(f"✅ Image saved to {output_path}")
+            return True
+
+    except Exception as e:
+        print(f"❌ Image Gen Error: {e}")
+        return False
+    return False
+
+
+class ImagenGenerator:
+    """Imagen 3 through the google-genai client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate(self, prompt, output_path):
+        return generate_news_image(self.client, prompt, output_path)
+
+
+class StubImageGenerator:
+    """Local stand-in: writes a placeholder file, optionally slow or failing."""
+
+    def __init__(self, delay=0, fail_prompts=()):
+        self.delay = delay
+        self.fail_prompts = set(fail_prompts)
+        self.calls = []
+
+    def generate(self, prompt, output_path):
+        self.calls.append(prompt)
+        time.sleep(self.delay)
+        if prompt in self.fail_prompts:
+            return False
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(b"stub-image:" + prompt.encode('utf-8'))
+        return True
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class ImageManifest:
+    """Persistent hash -> status map for generated images."""
+
+    def __init__(self, image_dir=IMAGE_DIR):
+        self.image_dir = image_dir
+        self.path = os.path.join(image_dir, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('entries', {})
+            except Exception as e:
+                print(f"Error loading image manifest: {e}")
+
+    def save(self):
+        os.makedirs(self.image_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"entries": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def forget(self, key):
+        self.entries.pop(key, None)
+
+    def prune(self, before):
+        """Drops entries that have not changed since `before` and have no live image."""
+        for key in [k for k, e in self.entries.items() if e['updated'] < before and e['status'] != 'done']:
+            del self.entries[key]
+
+    def due(self, now):
+        """Queued or skipped entries whose retry time has come, newest first."""
+        due = [
+            (key, entry) for key, entry in self.entries.items()
+            if entry['status'] == 'queued'
+            or (entry['status'] == 'skipped' and (entry.get('retry_after') or 0) <= now)
+        ]
+        due.sort(key=lambda kv: kv[1]['queued_at'], reverse=True)
+        return due
+
+
+class ImagePipeline:
+    """Bounded, rate-limited worker pool over the manifest's due entries."""
+
+    def __init__(self, generator, manifest=None, max_workers=2, rate_per_minute=10,
+                 max_per_run=10, max_attempts=3, retry_delay=3600):
+        self.generator = generator
+        self.manifest = manifest or ImageManifest()
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate_per_minute / 60.0, capacity=max_workers)
+        self.max_per_run = max_per_run
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def filename(self, key):
+        return f"news_{key}.jpg"
+
+    def enqueue(self, items):
+        """Adds new items to the queue; already known hashes are left alone."""
+        now = time.time()
+        added = 0
+        for item in items:
+            key = image_hash(item)
+            if self.manifest.get(key):
+                continue
+            self.manifest.entries[key] = {
+                "prompt": item.get('image_prompt') or item.get('title', 'Economic news'),
+                "status": "queued",
+                "attempts": 0,
+                "retry_after": None,
+                "queued_at": now,
+                "updated": now
+            }
+            added += 1
+        return added
+
+    def _generate(self, key, prompt):
+        self.bucket.acquire()
+        output_path = os.path.join(self.manifest.image_dir, self.filename(key))
+        try:
+            return self.generator.generate(prompt, output_path)
+        except Exception as e:
+            print(f"❌ Image generator raised for {key}: {e}")
+            return False
+
+    def run(self):
+        """Processes due entries. Returns {'done': n, 'skipped': n, 'failed': n}."""
+        now = time.time()
+        due = self.manifest.due(now)
+        batch, deferred = due[:self.max_per_run], due[self.max_per_run:]
+        stats = {"done": 0, "skipped": 0, "failed": 0}
+
+        # Over budget for this run: retry on a later run
+        for key, entry in deferred:
+            entry.update(status="skipped", retry_after=now, updated=now)
+            stats["skipped"] += 1
+
+        if batch:
+            print(f"Generating {len(batch)} images ({len(deferred)} deferred)...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._generate, key, entry['prompt']): key for key, entry in batch}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    entry = self.manifest.entries[key]
+                    entry['attempts'] += 1
+                    entry['updated'] = time.time()
+                    if future.result():
+                        entry.update(status="done", retry_after=None)
+                    elif entry['attempts'] >= self.max_attempts:
+                        entry.update(status="failed", retry_after=None)
+                    else:
+                        backoff = self.retry_delay * (2 ** (entry['attempts'] - 1))
+                        entry.update(status="skipped", retry_after=entry['updated'] + backoff)
+                    stats[entry['status']] += 1
+
+        self.manifest.save()
+        return stats
+
+    def image_url(self, item):
+        """Local image path for the frontend if the item's image is done, else None."""
+        key = image_hash(item)
+        entry = self.manifest.get(key)
+        if entry and entry['status'] == 'done':
+            return f"./{self.manifest.image_dir}/{self.filename(key)}"
+        return None
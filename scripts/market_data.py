@@ -0,0 +1,234 @@
+"""
+Market index snapshot for the ticker bar.
+
+Tickers come from market_tickers.json (or MARKET_TICKERS_FILE). Daily bars
+are kept per ticker in the local series store (market_series.py); a run only
+fetches the bars newer than the last stored one, either with one
+multi-symbol yfinance download ("batch") or with a bounded thread pool
+("threads"). Both tolerate individual tickers failing or timing out and
+return whatever arrived. The ticker entries are computed from the stored
+series (price, change, moving averages, volatility, 52-week range,
+sparkline). FakeMarketSource serves canned closes so the whole path can run
+offline.
+"""
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+from market_series import SeriesStore, day_number, indicators, update_series
+from pipeline import lazy_import
+
+TICKERS_FILE = os.environ.get(
+    "MARKET_TICKERS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_tickers.json")
+)
+
+DEFAULT_CONFIG = {
+    "mode": "batch",
+    "max_workers": 8,
+    "timeout": 15,
+    "tickers": [
+        {"name": "KOSPI", "symbol": "^KS11"},
+        {"name": "KOSDAQ", "symbol": "^KQ11"},
+        {"name": "USD/KRW", "symbol": "KRW=X"},
+        {"name": "NASDAQ", "symbol": "^IXIC"},
+        {"name": "S&P 500", "symbol": "^GSPC"}
+    ]
+}
+
+
+def load_market_config(path=TICKERS_FILE):
+    """Reads the ticker config, falling back to the built-in five indices."""
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+        except Exception as e:
+            print(f"Error loading ticker config {path}: {e}")
+    return config
+
+
+def fetch_concurrently(fetch_one, symbols, max_workers=8, timeout=15):
+    """
+    Runs fetch_one(symbol) on a bounded pool and returns {symbol: result}.
+    Tickers that fail or are still running at the deadline are left out.
+    """
+    results = {}
+    if not symbols:
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols))))
+    futures = {pool.submit(fetch_one, symbol): symbol for symbol in symbols}
+    done, not_done = wait(futures, timeout=timeout)
+
+    for future in done:
+        symbol = futures[future]
+        try:
+            results[symbol] = future.result()
+        except Exception as e:
+            print(f"Failed to fetch {symbol}: {e}")
+    for future in not_done:
+        print(f"Timed out fetching {futures[future]} after {timeout}s")
+
+    # Don't block the run on stragglers
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def frame_to_bars(frame):
+    """(day, close, high, low) tuples from a yfinance OHLC frame, oldest first, rows without a close dropped."""
+    frame = frame.dropna(subset=['Close'])
+    return [
+        (day_number(index.date()), float(row.Close), float(row.High), float(row.Low))
+        for index, row in zip(frame.index, frame.itertuples())
+    ]
+
+
+class YFinanceSource:
+    """yfinance-backed source. mode: 'batch' (one download) or 'threads'."""
+
+    def __init__(self, mode="batch", max_workers=8, timeout=15):
+        self.mode = mode
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def fetch_one(self, symbol, start):
+        yf = lazy_import("yfinance")
+        hist = yf.Ticker(symbol).history(start=start.isoformat(), timeout=self.timeout)
+        if hist.empty:
+            return []
+        return frame_to_bars(hist)
+
+    def fetch_batch(self, symbols, start):
+        yf = lazy_import("yfinance")
+        df = yf.download(
+            tickers=symbols,
+            start=start.isoformat(),
+            group_by="ticker",
+            threads=True,
+            progress=False,
+            timeout=self.timeout
+        )
+        results = {}
+        if df is None or df.empty:
+            return results
+        grouped = getattr(df.columns, 'nlevels', 1) > 1
+        for symbol in symbols:
+            try:
+                bars = frame_to_bars(df[symbol] if grouped else df)
+                if bars:
+                    results[symbol] = bars
+            except KeyError:
+                print(f"No data returned for {symbol}")
+        return results
+
+    def fetch_bars(self, symbols, start):
+        """{symbol: [(day, close, high, low), ...]} for the days from `start` on."""
+        if self.mode == "batch":
+            try:
+                return self.fetch_batch(symbols, start)
+            except Exception as e:
+                print(f"Batch download failed ({e}), falling back to threads...")
+        return fetch_concurrently(lambda symbol: self.fetch_one(symbol, start),
+                                  symbols, self.max_workers, self.timeout)
+
+
+class FakeMarketSource:
+    """
+    Offline stand-in. closes: {symbol: [closes]}, the last one dated `today`
+    and the others on the weekdays before it; delays: {symbol: seconds};
+    failures: symbols that raise. calls records (symbol, start).
+    """
+
+    def __init__(self, closes, delays=None, failures=(), max_workers=8, timeout=15, today=None):
+        self.closes = closes
+        self.delays = delays or {}
+        self.failures = set(failures)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.today = today or date.today()
+        self.calls = []
+
+    def bars(self, symbol):
+        days = []
+        day = self.today
+        while len(days) < len(self.closes.get(symbol, [])):
+            if day.weekday() < 5:
+                days.append(day)
+            day -= timedelta(days=1)
+        # No intraday range in the fixture: highs / lows are NaN
+        return [(day_number(d), float(c), math.nan, math.nan)
+                for d, c in zip(reversed(days), self.closes.get(symbol, []))]
+
+    def fetch_one(self, symbol, start):
+        self.calls.append((symbol, start))
+        time.sleep(self.delays.get(symbol, 0))
+        if symbol in self.failures:
+            raise RuntimeError(f"fake failure for {symbol}")
+        return [bar for bar in self.bars(symbol) if bar[0] >= day_number(start)]
+
+    def fetch_bars(self, symbols, start):
+        return fetch_concurrently(lambda symbol: self.fetch_one(symbol, start),
+                                  symbols, self.max_workers, self.timeout)
+
+
+def format_index(name, closes):
+    """Formats a close series as a ticker entry, or None if there is no price."""
+    if closes is None or len(closes) == 0:
+        return None
+    current_price = closes[-1]
+    # No previous close means 0 change
+    previous_close = closes[-2] if len(closes) >= 2 else current_price
+    if current_price == 0 or previous_close == 0:
+        return None
+
+    # Calculate Change
+    change_val = float(current_price - previous_close)
+    change_pct = float((change_val / previous_close) * 100)
+
+    # Formatting
+    if change_val > 0: sign = "▲"
+    elif change_val < 0: sign = "▼"
+    else: sign = "-"
+
+    return {
+        "name": name,
+        "value": f"{current_price:,.2f}",
+        "change": f"{sign} {abs(change_pct):.2f}%",
+        "is_up": bool(change_val > 0),
+        "is_down": bool(change_val < 0)
+    }
+
+
+def fetch_market_indices(config=None, source=None, series=None):
+    """
+    Brings the local series up to date and returns the ticker entries:
+    [{'name': 'KOSPI', 'value': '2,500.12', 'change': '▲ 1.20%', 'ma20': ..., 'sparkline': [...], ...}]
+    in config order. A ticker whose fetch failed is served from its stored
+    series; tickers with no stored bars are skipped.
+    """
+    config = config or load_market_config()
+    tickers = config['tickers']
+    if source is None:
+        source = YFinanceSource(config['mode'], config['max_workers'], config['timeout'])
+    series = series or SeriesStore()
+
+    print(f"Fetching {len(tickers)} market indices...")
+    started = time.perf_counter()
+    stats = update_series(series, source, [t['symbol'] for t in tickers])
+
+    indices_data = []
+    for ticker in tickers:
+        bars = series.read(ticker['symbol'])
+        entry = format_index(ticker['name'], bars[:, 1])
+        if entry:
+            entry.update(indicators(bars))
+            indices_data.append(entry)
+
+    print(f"Fetched {stats['fetched']} bars ({stats['added']} new days) for {len(indices_data)}/{len(tickers)} "
+          f"indices in {time.perf_counter() - started:.2f}s.")
+    return indices_data
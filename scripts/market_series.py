@@ -0,0 +1,174 @@
+"""
+Local market time series.
+
+Every ticker has a file of daily bars in .cache/market/<symbol>.bin:
+fixed 32-byte records (day number, close, high, low) as little-endian float64,
+oldest first. A run reads only the last record to learn where a series ends
+and asks the source for bars from that day on, so a steady-state run
+transfers a day or two per ticker instead of the whole window. Bars from that
+day on are replaced (the last bar of an intraday run is still moving); older
+bars are kept as they are. The new file is written beside the old one and
+renamed over it, so a reader or an interrupted run never sees a torn record.
+A missing series is backfilled with HISTORY_DAYS.
+
+Indicators are computed with NumPy over the stored tail of each series:
+
+    ma20, ma60          simple moving averages of the close
+    volatility          annualized stdev of the last 20 daily log returns (%)
+    high_52w, low_52w   range of the last 365 days (bar highs / lows)
+    sparkline           last SPARKLINE_POINTS closes for the ticker bar
+"""
+import os
+import re
+import struct
+from datetime import date, timedelta
+
+from pipeline import lazy_import
+
+SERIES_DIR = ".cache/market"
+BAR = struct.Struct("<dddd")  # day, close, high, low
+HISTORY_DAYS = 400             # backfill: 52 weeks plus room for the moving averages
+WINDOW = 300                   # bars read for the indicators
+SPARKLINE_POINTS = 30
+TRADING_DAYS = 252
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def day_number(d):
+    """Days since 1970-01-01 for a date / datetime."""
+    return d.toordinal() - _EPOCH
+
+
+def day_date(number):
+    return date.fromordinal(int(number) + _EPOCH)
+
+
+def _numpy():
+    return lazy_import("numpy")
+
+
+class SeriesStore:
+    """One bar file per ticker."""
+
+    def __init__(self, root=SERIES_DIR):
+        self.root = root
+
+    def path(self, symbol):
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9]+', '_', symbol).strip('_') + ".bin")
+
+    def _tail(self, symbol, count=1):
+        """Last `count` bars as tuples, oldest first, read from the end of the file."""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END) // BAR.size * BAR.size
+            start = max(0, size - count * BAR.size)
+            f.seek(start)
+            payload = f.read(size - start)
+        return list(BAR.iter_unpack(payload))
+
+    def last_day(self, symbol):
+        tail = self._tail(symbol)
+        return int(tail[-1][0]) if tail else None
+
+    def bar_count(self, symbol):
+        path = self.path(symbol)
+        return os.path.getsize(path) // BAR.size if os.path.exists(path) else 0
+
+    def start_for(self, symbol, today):
+        """First day to fetch: the last stored day (refreshed), or the backfill start."""
+        last = self.last_day(symbol)
+        if last is None:
+            return today - timedelta(days=HISTORY_DAYS)
+        return day_date(last)
+
+    def append(self, symbol, bars):
+        """
+        Stores (day, close, high, low) bars, oldest first. Stored bars on or after
+        the first new day are replaced. Returns the number of days added.
+        """
+        if not bars:
+            return 0
+        path = self.path(symbol)
+        os.makedirs(self.root, exist_ok=True)
+        first_day = bars[0][0]
+        stored = b""
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                stored = f.read()
+        count = len(stored) // BAR.size
+        # Walk back over the (few) stored bars that the new ones replace
+        keep = count
+        while keep and BAR.unpack_from(stored, (keep - 1) * BAR.size)[0] >= first_day:
+            keep -= 1
+        # Written next to the series and renamed over it: a run cut short mid-write
+        # (an abandoned market stage when the process exits) leaves the old file whole
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(stored[:keep * BAR.size])
+            f.write(b"".join(BAR.pack(*bar) for bar in bars))
+        os.replace(tmp_path, path)
+        return keep + len(bars) - count
+
+    def read(self, symbol, last_n=WINDOW):
+        """The last `last_n` bars as a NumPy array of shape (n, 4)."""
+        np = _numpy()
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return np.empty((0, 4))
+        count = self.bar_count(symbol)
+        offset = max(0, count - last_n) * BAR.size
+        return np.fromfile(path, dtype='<f8', count=(count * BAR.size - offset) // 8, offset=offset).reshape(-1, 4)
+
+
+def _moving_average(closes, n):
+    np = _numpy()
+    if len(closes) < n:
+        return None
+    csum = np.cumsum(np.insert(closes, 0, 0.0))
+    return float((csum[n:] - csum[:-n])[-1] / n)
+
+
+def indicators(bars):
+    """Indicator fields for the ticker entry, from a (n, 4) bar array; {} without bars."""
+    np = _numpy()
+    if len(bars) == 0:
+        return {}
+    days, closes, highs, lows = bars[:, 0], bars[:, 1], bars[:, 2], bars[:, 3]
+
+    result = {
+        "ma20": _moving_average(closes, 20),
+        "ma60": _moving_average(closes, 60),
+        "volatility": None
+    }
+    returns = np.diff(np.log(closes[-21:]))
+    if len(returns) >= 2:
+        result["volatility"] = float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS) * 100)
+
+    year = days >= days[-1] - 365
+    # Sources without intraday ranges store NaN highs / lows: fall back to closes
+    result["high_52w"] = float(np.nanmax(np.where(np.isnan(highs[year]), closes[year], highs[year])))
+    result["low_52w"] = float(np.nanmin(np.where(np.isnan(lows[year]), closes[year], lows[year])))
+    result["sparkline"] = np.round(closes[-SPARKLINE_POINTS:], 2).tolist()
+
+    return {k: round(v, 2) if isinstance(v, float) else v for k, v in result.items()}
+
+
+def update_series(store, source, symbols, today=None):
+    """
+    Fetches the bars each series is missing (one source call per start day)
+    and appends them. Returns {'fetched': bars received, 'added': new days}.
+    """
+    today = today or date.today()
+    groups = {}
+    for symbol in symbols:
+        groups.setdefault(store.start_for(symbol, today), []).append(symbol)
+
+    stats = {"fetched": 0, "added": 0}
+    for start, group in sorted(groups.items()):
+        bars_by_symbol = source.fetch_bars(group, start)
+        for symbol, bars in bars_by_symbol.items():
+            stats["fetched"] += len(bars)
+            stats["added"] += store.append(symbol, bars)
+    return stats
@@ -0,0 +1,220 @@
+"""
+Adaptive model failover.
+
+ModelScheduler keeps per-model health across runs (.cache/model_health.json):
+latency (EWMA), recent success/failure outcomes and the last overload time.
+Each run orders the models by that history (healthy and fast first), backs off
+exponentially with jitter between failures, can hedge by racing the two
+fastest healthy models against a deadline, and records which model served it.
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+HEALTH_PATH = ".cache/model_health.json"
+
+WINDOW = 10              # outcomes kept per model for the error rate
+LATENCY_ALPHA = 0.3      # EWMA weight of the newest latency
+OVERLOAD_COOLDOWN = 600  # seconds a 503 keeps a model out of the front of the queue
+MAX_RUNS_KEPT = 50
+
+
+def is_overload(error):
+    text = str(error)
+    return "503" in text or "overloaded" in text.lower() or "429" in text
+
+
+class _Race:
+    """A hedged race: open until it is decided; attempts that end later are not recorded."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = True
+
+
+class ModelScheduler:
+
+    def __init__(self, health_path=HEALTH_PATH, hedge=False, deadline=120,
+                 base_delay=1.0, max_delay=30.0, sleep=time.sleep, rng=random.random):
+        self.health_path = health_path
+        self.hedge = hedge
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.rng = rng
+        self.health = {"models": {}, "runs": []}
+        self.run_log = []
+        if health_path and os.path.exists(health_path):
+            try:
+                with open(health_path, 'r', encoding='utf-8') as f:
+                    self.health = json.load(f)
+            except Exception as e:
+                print(f"Error loading model health: {e}")
+
+    # --- Health ---
+    def _stats(self, model):
+        return self.health["models"].setdefault(model, {
+            "latency": None,
+            "outcomes": [],
+            "last_overload": None,
+            "calls": 0,
+            "failures": 0
+        })
+
+    def record(self, model, ok, latency, error=None):
+        stats = self._stats(model)
+        stats["calls"] += 1
+        stats["outcomes"] = (stats["outcomes"] + [1 if ok else 0])[-WINDOW:]
+        if ok:
+            prev = stats["latency"]
+            stats["latency"] = latency if prev is None else LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * prev
+        else:
+            stats["failures"] += 1
+            if error is not None and is_overload(error):
+                stats["last_overload"] = time.time()
+        self.run_log.append({
+            "model": model,
+            "ok": ok,
+            "latency": round(latency, 3),
+            "error": None if ok else str(error)[:200]
+        })
+
+    def error_rate(self, model):
+        outcomes = self._stats(model)["outcomes"]
+        return 1 - sum(outcomes) / len(outcomes) if outcomes else 0.0
+
+    def is_healthy(self, model):
+        stats = self._stats(model)
+        overloaded = stats["last_overload"] and time.time() - stats["last_overload"] < OVERLOAD_COOLDOWN
+        return not overloaded and self.error_rate(model) < 0.5
+
+    def order(self, models):
+        """Healthy models first, then by expected cost (latency inflated by error rate).
+        Models without history keep their configured position at the front."""
+        def score(indexed):
+            position, model = indexed
+            stats = self._stats(model)
+            latency = stats["latency"] if stats["latency"] is not None else 0.0
+            expected = latency / max(1 - self.error_rate(model), 0.1)
+            return (not self.is_healthy(model), expected, position)
+        return [model for _, model in sorted(enumerate(models), key=score)]
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given retry number (1, 2, ...): uniform in [0, ceiling)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return ceiling * self.rng()
+
+    # --- Execution ---
+    def _timed(self, call, model, race=None):
+        started = time.perf_counter()
+        try:
+            result = call(model)
+        except Exception as e:
+            self._record_attempt(race, model, False, time.perf_counter() - started, e)
+            raise
+        self._record_attempt(race, model, True, time.perf_counter() - started)
+        return result
+
+    def _record_attempt(self, race, model, ok, latency, error=None):
+        if race is None:
+            self.record(model, ok, latency, error)
+            return
+        with race.lock:
+            # The loser of a decided race (or an attempt past the deadline) is not counted again
+            if race.open:
+                self.record(model, ok, latency, error)
+
+    def _hedged(self, call, pair):
+        """Races two models; first success wins. Returns (result, model) or None."""
+        print(f"Hedging synthesis across {', '.join(pair)} (deadline {self.deadline}s)...")
+        race = _Race()
+        pool = ThreadPoolExecutor(max_workers=len(pair))
+        futures = {pool.submit(self._timed, call, model, race): model for model in pair}
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                model = futures[future]
+                try:
+                    return future.result(), model
+                except Exception as e:
+                    print(f"❌ Model {model} failed: {e}")
+        except FuturesTimeout:
+            with race.lock:
+                for future, model in futures.items():
+                    if not future.done():
+                        self.record(model, False, self.deadline, TimeoutError("hedge deadline exceeded"))
+                race.open = False
+            print(f"⏱️ Hedged models missed the {self.deadline}s deadline.")
+        finally:
+            with race.lock:
+                race.open = False
+            # The slower request is abandoned, not awaited
+            pool.shutdown(wait=False, cancel_futures=True)
+        return None
+
+    def run(self, call, models, max_attempts=3):
+        """
+        Calls call(model) until one succeeds. Returns (result, model_name);
+        raises when every model failed on every attempt.
+        """
+        for attempt in range(1, max_attempts + 1):
+            if attempt > 1:
+                delay = self.backoff(attempt)
+                print(f"⚠️ Retry attempt {attempt}/{max_attempts} in {delay:.1f}s...")
+                self.sleep(delay)
+
+            ordered = self.order(models)
+            healthy = [m for m in ordered if self.is_healthy(m)]
+            if self.hedge and len(healthy) >= 2:
+                hedged = self._hedged(call, healthy[:2])
+                if hedged:
+                    return self._served(*hedged, attempt)
+                ordered = [m for m in ordered if m not in healthy[:2]]
+
+            for failures, model in enumerate(ordered, 1):
+                print(f"Attempting news synthesis with {model} (Attempt {attempt})...")
+                try:
+                    return self._served(self._timed(call, model), model, attempt)
+                except Exception as e:
+                    print(f"❌ Model {model} failed: {e}")
+                    if is_overload(e):
+                        delay = self.backoff(failures)
+                        print(f"Server overloaded, waiting {delay:.1f}s before next model...")
+                        self.sleep(delay)
+
+        self._finish_run(None, max_attempts)
+        raise Exception("All attempted AI models failed or were overloaded after multiple retries.")
+
+    def _served(self, result, model, attempt):
+        self._finish_run(model, attempt)
+        return result, model
+
+    def _finish_run(self, model, attempts):
+        run = {
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "served_by": model,
+            "attempts": attempts,
+            "calls": self.run_log
+        }
+        self.health["runs"] = (self.health["runs"] + [run])[-MAX_RUNS_KEPT:]
+        self.run_log = []
+        print(self.summary(run))
+        self.save()
+
+    def summary(self, run):
+        calls = ", ".join(
+            f"{c['model']}={'ok' if c['ok'] else 'fail'}({c['latency']:.1f}s)" for c in run["calls"]
+        )
+        return f"📊 Synthesis served by {run['served_by'] or 'none'} after {run['attempts']} attempt(s): {calls}"
+
+    def save(self):
+        if not self.health_path:
+            return
+        os.makedirs(os.path.dirname(self.health_path) or '.', exist_ok=True)
+        tmp_path = self.health_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.health, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.health_path)
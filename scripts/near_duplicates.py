@@ -0,0 +1,228 @@
+"""
+Near-duplicate story detection.
+
+Exact dedup (item ID, title) misses the same story rewritten by another
+outlet or re-summarized under a slightly different headline. Each item's
+normalized title + summary is cut into character shingles and reduced to a
+MinHash signature. LSH splits the signature into BANDS bands; items sharing a
+band bucket are candidates, so checking a new item touches BANDS buckets
+instead of the whole history, and only candidates are compared by estimated
+Jaccard similarity:
+
+    >= DUPLICATE_THRESHOLD   same story: the new item is not stored
+    >= RELATED_THRESHOLD     related: stored with 'story' = id of the cluster's canonical item
+
+Signatures of the last RETENTION_DAYS are persisted in .cache/near_duplicates.json
+(buckets are rebuilt on load); save() also drops the expired ones from memory,
+so the daemon's index stays within the window. A missing cache is rebuilt from
+the store and the recent archive months. MinHash (all permutations of an item)
+and the candidate comparison are computed with NumPy.
+"""
+import json
+import os
+import random
+import re
+import zlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from headlines import normalize_title
+from pipeline import lazy_import
+from storage import item_id
+
+INDEX_PATH = ".cache/near_duplicates.json"
+INDEX_VERSION = 1
+SHINGLE_SIZE = 3
+NUM_PERM = 60
+BANDS = 20               # 20 bands x 3 rows: a pair at 0.45 shares a bucket ~85% of the time, at 0.65 ~99.8%
+ROWS = NUM_PERM // BANDS
+# Calibrated on the archive: rewrites of one story score 0.65-0.8, recurring
+# series (e.g. weekly schedules) 0.5-0.6
+DUPLICATE_THRESHOLD = 0.65
+RELATED_THRESHOLD = 0.45
+RETENTION_DAYS = 60
+
+_NON_WORD = re.compile(r'[\W_]+')
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260205)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def _numpy():
+    return lazy_import("numpy")
+
+
+@lru_cache(maxsize=None)
+def _permutation_arrays():
+    """(21-bit limbs of each a with their shifts, b) as uint64 columns."""
+    np = _numpy()
+    a = np.array([a for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    b = np.array([b for _, b in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    mask = np.uint64((1 << 21) - 1)
+    limbs = [(np.uint64(shift), (a >> np.uint64(shift)) & mask) for shift in (0, 21, 42)]
+    return limbs, b
+
+
+def shingles(item, k=SHINGLE_SIZE):
+    """Character k-grams of the normalized title + summary."""
+    text = normalize_title(item.get('title')) + _NON_WORD.sub('', (item.get('summary') or '').lower())
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def minhash(shingle_set):
+    """NUM_PERM minimum hashes (32-bit, to keep the persisted index small); None for empty text."""
+    if not shingle_set:
+        return None
+    np = _numpy()
+    limbs, total = _permutation_arrays()
+    x = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    prime = np.uint64(_PRIME)
+    # (a * x + b) % _PRIME without overflowing 64 bits: each 21-bit limb of a times a
+    # 32-bit x fits in 53 bits, and multiplying by 2^shift modulo the Mersenne prime
+    # 2^61 - 1 is a rotation within 61 bits
+    for shift, limb in limbs:
+        part = limb * x
+        if shift:
+            part = ((part << shift) & prime) | (part >> (np.uint64(61) - shift))
+        total = total + part
+    total = (total & prime) + (total >> np.uint64(61))
+    total = np.where(total >= prime, total - prime, total)
+    return [int(h) & 0xFFFFFFFF for h in total.min(axis=1)]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def band_keys(sig):
+    return [(band, tuple(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """Persisted MinHash signatures with LSH buckets and story clusters."""
+
+    def __init__(self, path=INDEX_PATH, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self.entries = {}   # id -> {"sig": [...], "story": canonical id, "published_at": ...}
+        self.buckets = {}   # (band, rows) -> [id, ...]
+        self.arrays = {}    # id -> signature as a uint32 array, for comparing many candidates at once
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == INDEX_VERSION and data.get('params') == self._params():
+                    for key, entry in data['entries'].items():
+                        self._insert(key, entry)
+                else:
+                    print("Near-duplicate index parameters changed; rebuilding.")
+            except Exception as e:
+                print(f"Error loading near-duplicate index: {e}")
+
+    @staticmethod
+    def _params():
+        return {"shingle": SHINGLE_SIZE, "num_perm": NUM_PERM, "bands": BANDS}
+
+    def _insert(self, key, entry):
+        self.entries[key] = entry
+        self.arrays[key] = _numpy().array(entry['sig'], dtype='uint32')
+        for bucket in band_keys(entry['sig']):
+            self.buckets.setdefault(bucket, []).append(key)
+
+    def _remove(self, key):
+        del self.arrays[key]
+        for bucket in band_keys(self.entries.pop(key)['sig']):
+            self.buckets[bucket].remove(key)
+            if not self.buckets[bucket]:
+                del self.buckets[bucket]
+
+    def is_empty(self):
+        return not self.entries
+
+    # --- Lookup ---
+    def best_match(self, sig, exclude=None):
+        """(id, similarity) of the closest indexed item sharing a bucket, or (None, 0.0)."""
+        candidates = set()
+        for bucket in band_keys(sig):
+            candidates.update(self.buckets.get(bucket, ()))
+        candidates.discard(exclude)
+        if not candidates:
+            return None, 0.0
+        # Estimated Jaccard (see similarity()) against all candidates in one comparison
+        np = _numpy()
+        keys = list(candidates)
+        agree = (np.stack([self.arrays[key] for key in keys]) == np.array(sig, dtype='uint32')).sum(axis=1)
+        best = int(agree.argmax())
+        return keys[best], int(agree[best]) / NUM_PERM
+
+    def check(self, item):
+        """
+        Returns (verdict, match_id, sig) with verdict "duplicate", "related" or "new".
+        Items without text are always "new".
+        """
+        sig = minhash(shingles(item))
+        if sig is None:
+            return "new", None, None
+        match, score = self.best_match(sig, exclude=item.get('id'))
+        if score >= DUPLICATE_THRESHOLD:
+            return "duplicate", match, sig
+        if score >= RELATED_THRESHOLD:
+            return "related", match, sig
+        return "new", None, sig
+
+    def story_of(self, key):
+        entry = self.entries.get(key)
+        return entry['story'] if entry else key
+
+    # --- Updates ---
+    def add(self, item, sig=None, related_to=None):
+        """Indexes an item; returns the canonical story id it was clustered under."""
+        key = item.get('id') or item_id(item)
+        sig = sig or minhash(shingles(item))
+        story = self.story_of(related_to) if related_to else key
+        if sig is None:
+            return story
+        if key in self.entries:
+            if self.entries[key]['sig'] == sig:
+                return self.entries[key]['story']
+            # Same link, new text (the archive has such pairs): keep the newest version
+            self._remove(key)
+        self._insert(key, {"sig": sig, "story": story, "published_at": item.get('published_at', '')})
+        return story
+
+    def seed(self, store, archive=None, now=None):
+        """Rebuilds the index from the store and the archive months inside the retention window."""
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        items = []
+        if archive is not None:
+            for month in archive.months:
+                if (month['last_published'] or '') >= cutoff:
+                    items.extend(i for i in archive.read_month(month['id']) if i.get('published_at', '') >= cutoff)
+        for entry in store.shards:
+            items.extend(store.read_shard(entry['id']))
+
+        # Oldest first, so each cluster's canonical item is its earliest story
+        for item in sorted(items, key=lambda i: i.get('published_at', '')):
+            verdict, match, sig = self.check(item)
+            self.add(item, sig, related_to=match if verdict != "new" else None)
+        return len(self.entries)
+
+    def prune(self, now=None):
+        """Drops entries older than the retention window (and their bucket slots). Returns the count."""
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        expired = [k for k, e in self.entries.items() if e['published_at'] < cutoff]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def save(self, now=None):
+        self.prune(now)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "params": self._params(), "entries": self.entries},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,420 @@
+"""
+Stage runner for the news job.
+
+fetch_economic_news() is a graph of Stage(name, func, after=...) steps that
+share one RunContext. PipelineRunner starts every stage as soon as the stages
+named in its `after` have finished, on up to max_workers worker threads, so
+independent branches (RSS + synthesis, market indices, image cleanup) overlap
+and the run takes as long as its critical path. Per stage it records:
+
+    started         offset from the start of the run
+    seconds         wall time
+    read_bytes      bytes passed to read()/write() (from /proc/self/io, Linux only;
+    written_bytes   process-wide, so overlapping stages share them)
+    items           counts the stage reports via ctx.count(name, value)
+    external        latency of calls wrapped in `with ctx.external(name):`
+    imports         seconds of the first import of modules loaded via lazy_import()
+                    (imports on a stage's own worker pools go into the run's "imports")
+
+Heavy dependencies (google-genai, yfinance, Pillow, NumPy) are imported by
+lazy_import() in the code that needs them, so a run only pays for the ones its
+stages use, and the import shows up in the stage that triggered it. The entry
+script's own module imports are reported as startup_seconds (ctx.startup_seconds).
+
+Deadlines: the run has a global deadline (ctx.remaining() tells stages how much
+is left) and a stage may have its own timeout. An optional stage that fails,
+runs past either limit, or has not started when the deadline passes is given up
+on: its fallback(ctx) fills in the results, dependents go ahead, and the run is
+reported as "degraded". Required stages are always waited for. Abandoned stages
+run on daemon threads, so they don't keep the process alive.
+
+A stage may return a dict of RunContext attributes instead of setting them
+itself. The runner applies it when the stage finishes, and drops it when the
+stage was given up on, so a late optional stage cannot overwrite its fallback's
+results or change them after a dependent has read them. Optional stages should
+work this way.
+
+One JSON line per run is appended to data/run_metrics.jsonl.
+
+Environment:
+    PIPELINE_DEADLINE=900                run deadline in seconds
+    PIPELINE_WORKERS=4                   stages running at once
+    PIPELINE_PROFILE=all | stage,stage   cProfile per stage -> .cache/profiles/<stage>.prof
+                                         (top functions are also put in the report)
+    PIPELINE_TRACEMALLOC=1               peak Python heap per stage (peak_memory_bytes)
+
+cProfile and tracemalloc are process-wide, so either one runs the stages one at
+a time.
+"""
+import cProfile
+import importlib
+import json
+import os
+import pstats
+import queue
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+METRICS_PATH = "data/run_metrics.jsonl"
+PROFILE_DIR = ".cache/profiles"
+PROFILE_TOP = 10
+DEFAULT_DEADLINE = 900  # seconds
+DEFAULT_WORKERS = 4
+
+_stage = threading.local()  # record of the stage running on this thread (for lazy_import)
+_pool_imports = {}          # lazy imports made off the stage threads, until the runner collects them
+
+
+def io_counters():
+    """(read_bytes, written_bytes) of this process so far, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['rchar']), int(fields['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def lazy_import(name):
+    """
+    importlib.import_module(name), timed the first time: the seconds go to the
+    record of the stage running on this thread ("imports"), or to the run's
+    when the import happens on a stage's worker pool.
+    """
+    if name in sys.modules:
+        return importlib.import_module(name)  # waits if another thread is still importing it
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    seconds = round(time.perf_counter() - started, 3)
+    record = getattr(_stage, 'record', None)
+    if record is not None:
+        record.setdefault("imports", {})[name] = seconds
+    else:
+        _pool_imports[name] = seconds
+    return module
+
+
+class Stage:
+    """
+    func:     func(ctx); may return {attribute: value} to set on the context when it finishes
+    after:    names of the stages that must finish first
+    optional: the run goes on without it (failure, timeout, deadline); fallback(ctx) runs instead
+    timeout:  seconds before an optional stage is given up on
+    """
+
+    def __init__(self, name, func, after=(), optional=False, timeout=None, fallback=None):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+        self.optional = optional
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class RunContext:
+    """State shared by the stages (plain attributes) plus the metric hooks of the running stage."""
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+        self._local = threading.local()  # each worker thread reports into its own stage record
+        self._deadline = None
+
+    @property
+    def _record(self):
+        return getattr(self._local, 'record', None)
+
+    @_record.setter
+    def _record(self, record):
+        self._local.record = record
+
+    def remaining(self):
+        """Seconds left before the run deadline (None outside a runner)."""
+        if self._deadline is None:
+            return None
+        return self._deadline - time.perf_counter()
+
+    def count(self, name, value):
+        if self._record is not None:
+            self._record["items"][name] = value
+
+    @contextmanager
+    def external(self, name):
+        """Times an external call (RSS, Gemini, yfinance, ...) inside the current stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._record is not None:
+                call = self._record["external"].setdefault(name, {"calls": 0, "seconds": 0.0})
+                call["calls"] += 1
+                call["seconds"] = round(call["seconds"] + time.perf_counter() - started, 3)
+
+
+class PipelineRunner:
+
+    def __init__(self, stages, metrics_path=METRICS_PATH, profile=None, trace_memory=None,
+                 profile_dir=PROFILE_DIR, deadline=None, max_workers=None):
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.after if dep not in names]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+        self.stages = stages
+        self.metrics_path = metrics_path
+        self.profile_dir = profile_dir
+        if profile is None:
+            profile = [p.strip() for p in os.environ.get("PIPELINE_PROFILE", "").split(",") if p.strip()]
+        self.profile = set(profile)
+        if trace_memory is None:
+            trace_memory = os.environ.get("PIPELINE_TRACEMALLOC") == "1"
+        self.trace_memory = trace_memory
+        if deadline is None:
+            deadline = float(os.environ.get("PIPELINE_DEADLINE", DEFAULT_DEADLINE))
+        self.deadline = deadline
+        if max_workers is None:
+            max_workers = int(os.environ.get("PIPELINE_WORKERS", DEFAULT_WORKERS))
+        if self.profile or self.trace_memory:
+            max_workers = 1  # both instruments see every thread
+        self.max_workers = max(1, max_workers)
+        self.records = []
+        self.total_seconds = None
+        self.startup_seconds = None
+        self.pool_imports = {}
+        self._started = None
+        self._late_warned = False
+
+    def _profiled(self, name):
+        return "all" in self.profile or name in self.profile
+
+    def run(self, ctx):
+        """
+        Runs the stage graph. A failing required stage stops new stages from
+        starting and is re-raised once the running ones have finished; the
+        report is written either way.
+        """
+        self._started = time.perf_counter()
+        self.startup_seconds = getattr(ctx, 'startup_seconds', None)
+        ctx._deadline = self._started + self.deadline
+        status = "ok"
+        try:
+            self._run_graph(ctx)
+            if any(r["status"] != "ok" for r in self.records):
+                status = "degraded"
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.total_seconds = time.perf_counter() - self._started
+            self.pool_imports = dict(_pool_imports)
+            _pool_imports.clear()
+            self.print_table()
+            self.save(getattr(ctx, 'timestamp', time.strftime("%Y-%m-%d %H:%M:%S")),
+                      self.total_seconds, status)
+        return self.records
+
+    # --- Scheduling ---
+    def _run_graph(self, ctx):
+        pending = list(self.stages)  # declaration order breaks ties between ready stages
+        running = {}                 # name -> (stage, record, started)
+        finished = set()
+        done = queue.Queue()
+        error = None
+
+        while pending or running:
+            if error is None:
+                self._start_ready(ctx, pending, running, finished, done)
+            if not running:
+                if error is None and pending:
+                    raise ValueError(f"Stage dependencies cannot be met: {[s.name for s in pending]}")
+                break
+
+            try:
+                name, exc, result = done.get(timeout=self._wait_timeout(running))
+            except queue.Empty:
+                self._abandon_overdue(ctx, running, finished)
+                continue
+            if name not in running:
+                continue  # abandoned earlier, finished late: its result is dropped
+            stage, record, _ = running.pop(name)
+            if exc is None:
+                for attribute, value in (result or {}).items():
+                    setattr(ctx, attribute, value)
+                finished.add(name)
+            elif stage.optional:
+                self._degrade(stage, ctx, record, f"failed ({exc})")
+                finished.add(name)
+            elif error is None:
+                error = exc
+
+        if error is not None:
+            raise error
+
+    def _start_ready(self, ctx, pending, running, finished, done):
+        for stage in list(pending):
+            if not all(dep in finished for dep in stage.after):
+                continue
+            if stage.optional and ctx.remaining() <= 0:
+                pending.remove(stage)
+                record = self._new_record(stage, "skipped")
+                self._degrade(stage, ctx, record, "not started before the run deadline")
+                finished.add(stage.name)
+                continue
+            if len(running) >= self.max_workers:
+                break
+            pending.remove(stage)
+            record = self._new_record(stage)
+            running[stage.name] = (stage, record, time.perf_counter())
+            threading.Thread(target=self._worker, args=(stage, ctx, record, done),
+                             name=f"stage-{stage.name}", daemon=True).start()
+
+    def _worker(self, stage, ctx, record, done):
+        try:
+            done.put((stage.name, None, self.run_stage(stage, ctx, record)))
+        except Exception as e:
+            done.put((stage.name, e, None))
+
+    def _limit(self, stage, started):
+        """perf_counter() time at which a running optional stage is given up on."""
+        limit = self._started + self.deadline
+        if stage.timeout is not None:
+            limit = min(limit, started + stage.timeout)
+        return limit
+
+    def _wait_timeout(self, running):
+        now = time.perf_counter()
+        limits = [self._limit(stage, started) for stage, _, started in running.values() if stage.optional]
+        deadline = self._started + self.deadline
+        if now < deadline:
+            limits.append(deadline)
+        return max(0.0, min(limits) - now) if limits else None
+
+    def _abandon_overdue(self, ctx, running, finished):
+        now = time.perf_counter()
+        for name, (stage, record, started) in list(running.items()):
+            if stage.optional and now >= self._limit(stage, started):
+                del running[name]
+                record["seconds"] = round(now - started, 3)
+                record["status"] = "timeout"
+                self._degrade(stage, ctx, record, f"timed out after {now - started:.1f}s")
+                finished.add(name)
+        if now >= self._started + self.deadline and not self._late_warned:
+            self._late_warned = True
+            waiting = [name for name, (stage, _, _) in running.items() if not stage.optional]
+            print(f"⏰ Run deadline ({self.deadline:.0f}s) passed; still waiting for required stages: {waiting}")
+
+    def _degrade(self, stage, ctx, record, reason):
+        if record["status"] == "ok":
+            record["status"] = "degraded"
+        record["degraded"] = reason
+        print(f"⚠️ Stage {stage.name} {reason}; continuing without it.")
+        if stage.fallback:
+            try:
+                stage.fallback(ctx)
+            except Exception as e:
+                print(f"❌ Fallback of stage {stage.name} failed: {e}")
+
+    # --- Measurement ---
+    def _new_record(self, stage, status="ok"):
+        record = {"stage": stage.name, "status": status, "items": {}, "external": {},
+                  "started": round(time.perf_counter() - self._started, 3) if self._started else 0.0}
+        if status != "ok":
+            record["seconds"] = 0.0
+        self.records.append(record)
+        return record
+
+    def run_stage(self, stage, ctx, record=None):
+        """Runs stage.func measured into `record`. Returns what the function returned."""
+        if record is None:
+            record = self._new_record(stage)
+        ctx._record = record
+        _stage.record = record
+
+        profiler = cProfile.Profile() if self._profiled(stage.name) else None
+        if self.trace_memory:
+            tracemalloc.start()
+        io_before = io_counters()
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            return stage.func(ctx)
+        except Exception as e:
+            if record["status"] == "ok":
+                record["status"] = "error"
+            record["error"] = str(e)[:200]
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            if record["status"] != "timeout":  # an abandoned stage keeps the time it was given up at
+                record["seconds"] = round(time.perf_counter() - started, 3)
+            io_after = io_counters()
+            if io_before and io_after:
+                record["read_bytes"] = io_after[0] - io_before[0]
+                record["written_bytes"] = io_after[1] - io_before[1]
+            if self.trace_memory:
+                record["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            if profiler:
+                record["profile"] = self._dump_profile(stage.name, profiler)
+            ctx._record = None
+            _stage.record = None
+
+    def _dump_profile(self, name, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{name}.prof")
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler)
+        top = []
+        for func, (_, calls, _, cumulative, _) in sorted(
+                stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:PROFILE_TOP]:
+            filename, line, funcname = func
+            top.append({
+                "function": f"{os.path.basename(filename)}:{line}({funcname})",
+                "calls": calls,
+                "cumulative": round(cumulative, 4)
+            })
+        return {"path": path, "top": top}
+
+    def print_table(self):
+        if not self.records:
+            return
+        print("⏱️ Stage metrics:")
+        for r in self.records:
+            parts = [f"+{r.get('started', 0):.2f}s", f"{r.get('seconds', 0):.2f}s"]
+            if "written_bytes" in r:
+                parts.append(f"read={r['read_bytes']:,}B written={r['written_bytes']:,}B")
+            if "peak_memory_bytes" in r:
+                parts.append(f"peak={r['peak_memory_bytes']:,}B")
+            parts += [f"{k}={v}" for k, v in r["items"].items()]
+            parts += [f"{k}={v['seconds']:.2f}s/{v['calls']}" for k, v in r["external"].items()]
+            parts += [f"import {k}={v:.2f}s" for k, v in r.get("imports", {}).items()]
+            marker = {"ok": "", "error": " ❌"}.get(r["status"], f" ⚠️ {r['status']}")
+            print(f"  {r['stage']}{marker}: " + ", ".join(parts))
+        if self.total_seconds is not None:
+            busy = sum(r.get('seconds', 0) for r in self.records)
+            print(f"  wall {self.total_seconds:.2f}s for {busy:.2f}s of stage time")
+        if self.startup_seconds is not None:
+            print(f"  startup (module imports) {self.startup_seconds:.2f}s")
+        if self.pool_imports:
+            print("  imports on worker pools: " + ", ".join(f"{k}={v:.2f}s" for k, v in self.pool_imports.items()))
+
+    def save(self, timestamp, total_seconds, status="ok"):
+        if not self.metrics_path:
+            return
+        os.makedirs(os.path.dirname(self.metrics_path) or '.', exist_ok=True)
+        line = {
+            "at": timestamp,
+            "status": status,
+            "total_seconds": round(total_seconds, 3),
+            "stages": self.records
+        }
+        if self.startup_seconds is not None:
+            line["startup_seconds"] = round(self.startup_seconds, 3)
+        if self.pool_imports:
+            line["imports"] = self.pool_imports
+        with open(self.metrics_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
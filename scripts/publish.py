@@ -0,0 +1,165 @@
+"""
+Content-hashed names for the data files that no longer change.
+
+Closed files get a copy next to them named after their content (SHA-1, first
+HASH_LENGTH hex digits):
+
+    archive/2026_02.jsonl           ->  archive/2026_02.<hash>.jsonl
+    store/2026-10-14.jsonl (.gz)    ->  store/2026-10-14.<hash>.jsonl (.gz)
+
+and data/manifest.json maps each logical path to its copy:
+
+    {"version": 12, "updated": "...", "files": {"archive/2026_02.jsonl": "archive/2026_02.3f2a9c1d4e5b.jsonl", ...}}
+
+Closed means nothing will be written to the file again: store day shards
+before today (new items always go to today's shard) and archive months before
+the month of the oldest store shard (the only ones migration can no longer
+append to). Such a copy is written once and, as git stores identical content
+as one blob, costs the repository nothing; browsers and CDNs can keep it as
+long as they like, and a finished month is downloaded once.
+
+Files that change every run (news.json, archive_index.json, the store and
+search manifests, today's shard, the current month, data/search/) keep their
+plain names only. app.js revalidates them, and data/manifest.json, with
+cache: 'no-cache', and fetches a path by its hashed name when the manifest
+lists one.
+
+Each copy and each of its .gz/.br/.msgpack siblings is written when missing,
+and the manifest is rewritten (version + 1) only when a name changed, so a run
+that closes no file changes no file here. Copies named by neither the new nor
+the previous manifest are deleted; the previous generation is kept for pages
+that loaded the old manifest. Article bodies (data/articles/<id>.json) are
+written once and never change, so they keep their names.
+
+Run directly to republish the existing data: python scripts/publish.py
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from archive import MonthArchive
+from artifacts import write_artifact
+from storage import NewsStore, month_shard_id_for
+
+DATA_DIR = "data"
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+SIBLINGS = (".gz", ".br", ".msgpack")  # precompressed encodings written by artifacts.py
+# Directories pruned of stale copies (data/ and data/search/ held them before only closed files were hashed)
+PUBLISHED_DIRS = ("", "store", "archive", "search")
+
+_HASHED = re.compile(r'^.+\.[0-9a-f]{%d}\.jsonl?(\.gz|\.br|\.msgpack)?$' % HASH_LENGTH)
+
+
+def content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(path, digest):
+    """archive/2026_02.jsonl -> archive/2026_02.<digest>.jsonl"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+def closed_paths(data_dir=DATA_DIR, store=None, archive=None, today=None):
+    """
+    Paths (relative to data_dir) of the published files nothing is written to
+    any more, where they exist. `today` is the store shard still being written
+    (default: the newest one).
+    """
+    store = store or NewsStore(os.path.join(data_dir, 'store'))
+    archive = archive or MonthArchive(os.path.join(data_dir, 'archive'))
+    shard_ids = [entry['id'] for entry in store.shards]
+    today = today or (shard_ids[-1] if shard_ids else None)
+    paths = [f"store/{entry['filename']}" for entry in store.shards if today and entry['id'] < today]
+    # Migration appends to the month of the oldest store shard (or today's month) and later
+    open_month = month_shard_id_for({}, shard_ids[0] if shard_ids else today or '9999-99')
+    paths += [f"archive/{month['filename']}" for month in archive.months if month['id'] < open_month]
+    return [path for path in paths if os.path.exists(os.path.join(data_dir, path))]
+
+
+def _copy(source, target):
+    tmp_path = target + ".tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+class Publisher:
+    """Hashed copies of the closed data files and the manifest that names them."""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.manifest_path = os.path.join(data_dir, MANIFEST_NAME)
+        self.manifest = {"version": 0, "updated": None, "files": {}}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self.manifest = json.load(f)
+            except Exception as e:
+                print(f"Error loading data manifest: {e}")
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def publish(self, paths, timestamp=None, report=None):
+        """
+        Writes the missing hashed copies and, if any name changed, the manifest.
+        Returns {'files', 'written', 'unchanged', 'removed', 'version'}.
+        """
+        files = {}
+        stats = {"files": len(paths), "written": 0, "unchanged": 0, "removed": 0}
+        for path in paths:
+            name = files[path] = hashed_name(path, content_hash(self._path(path)))
+            written = False
+            # Each sibling on its own: one missing from an earlier run (or added later) is filled in
+            for suffix in ("",) + SIBLINGS:
+                source, target = self._path(path + suffix), self._path(name + suffix)
+                if os.path.exists(source) and not os.path.exists(target):
+                    _copy(source, target)
+                    written = True
+            stats["written" if written else "unchanged"] += 1
+
+        previous = self.manifest.get("files", {})
+        if files != previous:
+            self.manifest = {
+                "version": self.manifest.get("version", 0) + 1,
+                "updated": timestamp,
+                "files": files
+            }
+            write_artifact(self.manifest_path, self.manifest, report, formats=())
+            stats["removed"] = self.prune(set(files.values()) | set(previous.values()))
+        stats["version"] = self.manifest["version"]
+        return stats
+
+    def prune(self, keep):
+        """Deletes hashed copies (and their siblings) not named in `keep`. Returns the count."""
+        keep = {self._path(name) + suffix for name in keep for suffix in ("",) + SIBLINGS}
+        removed = 0
+        for directory in PUBLISHED_DIRS:
+            directory = self._path(directory)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                path = os.path.join(directory, filename)
+                if _HASHED.match(filename) and path not in keep:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+
+def publish(data_dir=DATA_DIR, store=None, archive=None, today=None, timestamp=None, report=None):
+    """Publishes the closed data files. Returns the Publisher.publish() stats."""
+    stats = Publisher(data_dir).publish(closed_paths(data_dir, store, archive, today), timestamp, report)
+    print(f"Data manifest v{stats['version']}: {stats['files']} closed files, {stats['written']} new copies, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} old copies removed.")
+    return stats
+
+
+if __name__ == "__main__":
+    publish()
@@ -0,0 +1,375 @@
+"""
+Static pages.
+
+The site renders from JSON in the browser; this stage also writes plain HTML
+so the first paint needs neither JS nor JSON parsing, and every article has a
+crawlable URL:
+
+    index.html                          briefing and cards between <!-- prerender:... --> markers
+    news/months/index.html              month list
+    news/months/<YYYY_MM>/<n>.html      month pages of PAGE_SIZE items, numbered from the oldest
+    news/months/<YYYY_MM>/index.html    copy of the newest page
+    news/articles/<id[:2]>/<id>.html    one page per article
+
+Month items come from the archive month plus the store's day shards of that
+month. Pages are counted from the oldest item, so new items only ever change
+the last page of the current month. Each page carries the hash of its HTML
+(also kept in .cache/render.json) and is written only when that changes; a
+month whose shards have the same counts and sizes as on the last build is not
+even read.
+
+Markup follows renderNewsItems() / openModalWithItem() in app.js, with every
+text field escaped.
+
+news/ is not committed: the workflow keeps it in the Actions cache together
+with .cache/render.json and deploys it with the rest of the site. If the cache
+is lost, a month whose pages are missing is rendered again, whatever
+.cache/render.json says. Run directly to rebuild news/ from data/ without
+fetching: python scripts/render.py
+"""
+import hashlib
+import json
+import os
+import re
+from html import escape
+
+from archive import MonthArchive
+from storage import NewsStore, item_id
+
+OUTPUT_DIR = "news"
+STATE_PATH = ".cache/render.json"
+INDEX_HTML = "index.html"
+PAGE_SIZE = 30
+RENDER_VERSION = 1  # bump when the markup changes, so unchanged months are rebuilt once
+STYLE_VERSION = 6
+
+# Same list and title hash as fallbackImages in app.js
+FALLBACK_IMAGES = [
+    "https://images.unsplash.com/photo-1611974714028-ac8a49f70659?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1590283603385-17ffb3a7f29f?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1486406146926-c627a92ad1ab?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1451187580459-43490279c0fa?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1518770660439-4636190af475?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1560518883-ce09059eeffa?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1586528116311-ad8dd3c8310d?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1534951009808-766178b47a8e?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1642543492481-44e81e3914a7?q=80&w=1024&auto=format&fit=crop",
+    "https://images.unsplash.com/photo-1550565118-c974fb6255f0?q=80&w=1024&auto=format&fit=crop",
+]
+
+_HASH_LINE = re.compile(r'<!-- render:([0-9a-f]+) -->')
+
+
+def esc(value):
+    return escape(str(value or ''), quote=True)
+
+
+def fallback_image(title):
+    """JS `hash = (hash << 5) - hash + code` over the title, as 32-bit signed."""
+    value = 0
+    for ch in title or 'default':
+        value = (value * 31 + ord(ch)) & 0xFFFFFFFF
+    if value >= 1 << 31:
+        value -= 1 << 32
+    return FALLBACK_IMAGES[abs(value) % len(FALLBACK_IMAGES)]
+
+
+def asset_url(url, root):
+    """Site-relative URLs ('./data/...') rebased for a page `root` levels down."""
+    if not url:
+        return url
+    if url.startswith('./'):
+        return root + url[2:]
+    if not re.match(r'^[a-z]+:|^/', url):
+        return root + url
+    return url
+
+
+def article_href(key, root):
+    return f"{root}{OUTPUT_DIR}/articles/{key[:2]}/{key}.html"
+
+
+def month_href(month_id, root, page=None):
+    return f"{root}{OUTPUT_DIR}/months/{month_id}/{page if page else 'index'}.html"
+
+
+def month_name(month_id):
+    year, mm = month_id.split('_')
+    return f"{year}년 {mm}월"
+
+
+# --- Templates ---
+def page_html(title, description, body, root):
+    return f"""<!DOCTYPE html>
+<html lang="ko">
+
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{esc(title)} - Econ Gravity</title>
+    <meta name="description" content="{esc(description)}">
+    <link rel="icon" href="https://cdnjs.cloudflare.com/ajax/libs/twemoji/14.0.2/72x72/1f30d.png">
+    <link rel="stylesheet" href="{root}style.css?v={STYLE_VERSION}">
+</head>
+
+<body>
+    <main class="container static-page">
+        <nav class="static-nav">
+            <a href="{root}index.html">ECON GRAVITY</a>
+            <span class="divider">|</span>
+            <a href="{root}{OUTPUT_DIR}/months/index.html">📂 지난 뉴스</a>
+        </nav>
+{body}
+    </main>
+</body>
+
+</html>
+"""
+
+
+def card_html(item, root, index=0):
+    key = item.get('id') or item_id(item)
+    fallback = fallback_image(item.get('title'))
+    image_url = asset_url(item.get('image_url'), root) or fallback
+    published = item.get('published_at') or ''
+    hero = index == 0
+    return f"""            <article class="news-card{' hero-card' if hero else ''}">
+                <div class="news-image-wrapper" style="height: {'300px' if hero else '160px'}; width: 100%; margin-bottom: 20px; overflow: hidden; border-radius: 12px; background-color: #f0f0f0;">
+                    <img src="{esc(image_url)}" alt="{esc(item.get('title'))}" class="news-image-mobile" loading="{'eager' if hero else 'lazy'}"
+                         style="width: 100%; height: 100%; object-fit: cover; display: block;"
+                         onerror="this.onerror=null; this.src='{esc(fallback)}';">
+                </div>
+                <div class="news-content">
+                    <div class="card-meta">
+                        <span class="category-tag">{esc(item.get('category') or '경제')}</span>
+                        <span class="time-tag">{esc(published[:16])}</span>
+                    </div>
+                    <h3><a href="{esc(article_href(key, root))}">{esc(item.get('title'))}</a></h3>
+                    <div class="summary">{esc(item.get('summary') or item.get('description') or '')}</div>
+                </div>
+            </article>
+"""
+
+
+def cards_html(items, root):
+    return "".join(card_html(item, root, i) for i, item in enumerate(items))
+
+
+def content_html(content):
+    paragraphs = [p for p in (content or '상세 내용을 준비 중입니다.').split('\n\n') if p.strip()]
+    return "".join(f"<p>{esc(p).replace(chr(10), '<br>')}</p>" for p in paragraphs)
+
+
+def source_html(item):
+    link = item.get('link') or ''
+    if link.startswith('http'):
+        return f"""<strong>출처:</strong> <a href="{esc(link)}" target="_blank" rel="noopener noreferrer">{esc(item.get('source') or '해당 언론사')}</a><br>
+                <span class="static-note">※ 본 내용은 AI(Gemini)에 의해 자동 수집 및 요약되었습니다. 원문 기사의 저작권은 출처 언론사에 있으며, 자세한 내용은
+                <a href="{esc(link)}" target="_blank" rel="noopener noreferrer">[🔗 원문 기사 보러가기]</a>를 클릭하여 주시기 바랍니다.</span>"""
+    return f"""<strong>출처:</strong> {esc(item.get('source') or 'Unknown')}<br>
+                <span class="static-note">※ 본 내용은 AI에 의해 자동 요약되었습니다. 저작권은 원 출처 언론사에 있습니다.</span>"""
+
+
+def article_page(item, month_id, page):
+    root = "../../../"
+    fallback = fallback_image(item.get('title'))
+    body = f"""        <article class="static-article glass">
+            <img src="{esc(asset_url(item.get('image_url'), root) or fallback)}" alt="{esc(item.get('title'))}" class="modal-img"
+                 onerror="this.onerror=null; this.src='{esc(fallback)}';">
+            <div class="modal-meta">
+                <span class="source-tag">{esc(item.get('published_at'))}</span>
+                <span class="category-tag">{esc(item.get('category') or '경제')}</span>
+            </div>
+            <h1>{esc(item.get('title'))}</h1>
+            <div class="modal-text-content">{content_html(item.get('content') or item.get('summary'))}</div>
+            <div class="static-source">
+                {source_html(item)}
+            </div>
+            <p class="static-back"><a href="{esc(month_href(month_id, root, page))}">← {month_name(month_id)} 뉴스 목록</a></p>
+        </article>"""
+    return page_html(item.get('title'), item.get('summary') or item.get('title'), body, root)
+
+
+def month_page(month_id, items, page, pages, total):
+    root = "../../../"
+    nav = []
+    if page < pages:
+        nav.append(f'<a href="{page + 1}.html">◀ 최근</a>')
+    nav.append(f'<span>{page} / {pages}</span>')
+    if page > 1:
+        nav.append(f'<a href="{page - 1}.html">이전 ▶</a>')
+    body = f"""        <h1 class="static-heading">{month_name(month_id)} <small>{total}건</small></h1>
+        <section class="news-grid">
+{cards_html(items, root)}        </section>
+        <nav class="pagination">{' '.join(nav)}</nav>"""
+    return page_html(f"{month_name(month_id)} 경제 뉴스 ({page}/{pages})",
+                     f"{month_name(month_id)}의 경제 뉴스 {total}건", body, root)
+
+
+def month_list_page(months):
+    """months: [(month_id, count)], newest first."""
+    root = "../../"
+    rows = "".join(
+        f'            <li><a href="{month_id}/index.html">{month_name(month_id)}</a> <span class="time-tag">{count}건</span></li>\n'
+        for month_id, count in months
+    )
+    body = f"""        <h1 class="static-heading">📂 지난 뉴스</h1>
+        <ul class="static-months">
+{rows}        </ul>"""
+    return page_html("지난 뉴스", "월별 경제 뉴스 모음", body, root)
+
+
+def briefing_html(briefing):
+    hidden = '' if briefing else ' style="display: none;"'
+    return f"""<section id="briefing-section" class="glass animate-slide-up"{hidden}>
+                    <div
+                        style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 16px;">
+                        <h2 style="margin-bottom:0;">💡 오늘의 브리핑</h2>
+                        <button id="tts-btn" class="tts-btn" aria-label="Listen to briefing">🔈 듣기</button>
+                    </div>
+                    <p id="briefing-content">{esc(briefing)}</p>
+                </section>"""
+
+
+def replace_region(html, name, content):
+    """Replaces the text between <!-- prerender:name --> and <!-- /prerender:name -->."""
+    pattern = re.compile(r'(<!-- prerender:%s -->).*?(<!-- /prerender:%s -->)' % (name, name), re.S)
+    if not pattern.search(html):
+        raise ValueError(f"{INDEX_HTML} has no prerender:{name} region")
+    return pattern.sub(lambda m: m.group(1) + content + m.group(2), html, count=1)
+
+
+# --- Build ---
+class PageRenderer:
+
+    def __init__(self, output_dir=OUTPUT_DIR, state_path=STATE_PATH):
+        self.output_dir = output_dir
+        self.state_path = state_path
+        self.state = {"version": RENDER_VERSION, "months": {}, "pages": {}}
+        self.stats = {"written": 0, "unchanged": 0, "months_skipped": 0}
+        self.rendered_articles = set()
+        if state_path and os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('version') == RENDER_VERSION:
+                    self.state = state
+            except Exception as e:
+                print(f"Error loading render state: {e}")
+
+    def _stored_hash(self, path):
+        """Hash of the page on disk: from the state, else from the page itself (state lost)."""
+        if path in self.state["pages"]:
+            return self.state["pages"][path] if os.path.exists(path) else None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                f.readline()
+                match = _HASH_LINE.match(f.readline())
+            return match.group(1) if match else None
+        except OSError:
+            return None
+
+    def write_page(self, path, html):
+        """Writes the page unless the same HTML is already there. Returns True if written."""
+        digest = hashlib.sha1(html.encode('utf-8')).hexdigest()[:16]
+        if self._stored_hash(path) == digest:
+            self.state["pages"][path] = digest
+            self.stats["unchanged"] += 1
+            return False
+        doctype, rest = html.split('\n', 1)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{doctype}\n<!-- render:{digest} -->\n{rest}")
+        os.replace(tmp_path, path)
+        self.state["pages"][path] = digest
+        self.stats["written"] += 1
+        return True
+
+    def month_sources(self, store, archive):
+        """{month_id: [(reader, shard entry), ...]} oldest first: the archive month, then its day shards."""
+        sources = {}
+        if archive is not None:
+            for month in archive.months:
+                sources.setdefault(month['id'], []).append((archive.read_month, month))
+        for shard in store.shards:
+            sources.setdefault(shard['id'][:7].replace('-', '_'), []).append((store.read_shard, shard))
+        return dict(sorted(sources.items()))
+
+    def render_month(self, month_id, items):
+        pages = max(1, -(-len(items) // PAGE_SIZE))
+        for page in range(1, pages + 1):
+            chunk = items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            # Newest first on the page (stable: a run's items keep their order)
+            chunk = sorted(chunk, key=lambda i: i.get('published_at') or '', reverse=True)
+            html = month_page(month_id, chunk, page, pages, len(items))
+            self.write_page(os.path.join(self.output_dir, "months", month_id, f"{page}.html"), html)
+            if page == pages:
+                self.write_page(os.path.join(self.output_dir, "months", month_id, "index.html"), html)
+            for item in chunk:
+                key = item.get('id') or item_id(item)
+                if key in self.rendered_articles:
+                    continue  # same link stored twice (older archives): the first version keeps the page
+                self.rendered_articles.add(key)
+                self.write_page(os.path.join(self.output_dir, "articles", key[:2], f"{key}.html"),
+                                article_page(item, month_id, page))
+
+    def render_history(self, store, archive=None):
+        """Month, article and month-list pages for every month whose shards changed."""
+        months = []
+        for month_id, parts in self.month_sources(store, archive).items():
+            fingerprint = [[entry['id'], entry['count'], entry['bytes']] for _, entry in parts]
+            months.append((month_id, sum(entry['count'] for _, entry in parts)))
+            index_path = os.path.join(self.output_dir, "months", month_id, "index.html")
+            if self.state["months"].get(month_id) == fingerprint and os.path.exists(index_path):
+                self.stats["months_skipped"] += 1
+                continue
+            items = []
+            for read, entry in parts:
+                items.extend(read(entry['id']))
+            self.render_month(month_id, items)
+            self.state["months"][month_id] = fingerprint
+        self.write_page(os.path.join(self.output_dir, "months", "index.html"), month_list_page(months[::-1]))
+
+    def render_front(self, items, briefing, last_updated, path=INDEX_HTML):
+        """Fills the prerender regions of index.html. Returns True if the file changed."""
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        updated = replace_region(html, "updated", esc(f"최근 업데이트: {last_updated}"))
+        updated = replace_region(updated, "briefing", briefing_html(briefing))
+        updated = replace_region(updated, "news", "\n" + cards_html(items, "") + "                ")
+        if updated == html:
+            return False
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(updated)
+        os.replace(tmp_path, path)
+        return True
+
+    def save(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.state_path)
+
+
+def build_pages(store, archive, active_items, briefing, last_updated, renderer=None):
+    """Front page plus the changed month / article pages. Returns the renderer's stats."""
+    renderer = renderer or PageRenderer()
+    renderer.render_history(store, archive)
+    front_changed = renderer.render_front(active_items, briefing, last_updated)
+    renderer.save()
+    print(f"Static pages: {renderer.stats['written']} written, {renderer.stats['unchanged']} unchanged, "
+          f"{renderer.stats['months_skipped']} months skipped, front page {'updated' if front_changed else 'unchanged'}.")
+    return dict(renderer.stats, front_changed=front_changed)
+
+
+if __name__ == "__main__":
+    renderer = PageRenderer()
+    renderer.render_history(NewsStore(), MonthArchive())
+    renderer.save()
+    print(f"Static pages: {renderer.stats['written']} written, {renderer.stats['unchanged']} unchanged, "
+          f"{renderer.stats['months_skipped']} months skipped.")
@@ -0,0 +1,187 @@
+"""
+Static search index and category shards for the frontend.
+
+build_search_index() reads every month of the archive (data/archive/) plus the
+active store and writes small files under data/search/:
+
+    manifest.json          doc count, block size, bucket count, sealed count, categories
+    docs_<n>.json          card data for docs n*BLOCK_SIZE .. (n+1)*BLOCK_SIZE-1
+    category_<slug>.json   doc numbers of one filter category, newest first
+    grams_<b>.json         character-bigram postings of the sealed docs for hash bucket b
+    grams_recent.json      character-bigram postings of the docs after the sealed ones
+
+Docs are numbered oldest first, so numbers stay stable as news is added and
+old blocks do not change. Korean text has no reliable word boundaries, so the
+index uses character bigrams over the normalized title and summary; the
+frontend intersects the posting lists of the query's bigrams (bucket plus
+recent file) and then checks the candidates' text.
+
+New docs would touch nearly every bucket, so the buckets only cover the
+"sealed" docs (all full doc blocks) and are rebuilt when another block fills
+or the numbering of the sealed docs changed. Every other run rewrites only
+grams_recent.json, which holds less than one block. Files go through
+artifacts.write_artifact() (.gz/.br siblings, size report); files whose content
+did not change are not rewritten.
+
+Run directly to rebuild from the existing data: python scripts/search_index.py
+"""
+import json
+import os
+
+from artifacts import encode_json, write_artifact, write_artifact_file
+from storage import NewsStore, item_id
+from archive import MonthArchive
+
+SEARCH_DIR = "data/search"
+BLOCK_SIZE = 200
+BUCKETS = 32
+NGRAM = 2
+
+# Sidebar / chip filters (matched by substring, like filterNews() in app.js)
+FILTER_CATEGORIES = [
+    ("거시경제", "macro"),
+    ("금융", "finance"),
+    ("테크", "tech"),
+    ("부동산", "realestate"),
+    ("산업", "industry")
+]
+
+
+def normalize_text(text):
+    """Lowercase letters and digits only (mirrors normalizeSearchText() in app.js)."""
+    return ''.join(ch for ch in (text or '').lower() if ch.isalnum())
+
+
+def char_ngrams(text, n=NGRAM):
+    text = normalize_text(text)
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def gram_bucket(gram, buckets=BUCKETS):
+    """FNV-1a over code points (mirrors gramBucket() in app.js)."""
+    h = 0x811c9dc5
+    for ch in gram:
+        h = ((h ^ ord(ch)) * 0x01000193) & 0xFFFFFFFF
+    return h % buckets
+
+
+def iter_archive_items(data_dir='data', store=None, archive=None):
+    """Yields (item, src) for every archived month and the active store."""
+    archive = archive or MonthArchive(os.path.join(data_dir, 'archive'))
+    for month in archive.months:
+        for item in archive.read_month(month['id']):
+            yield item, f"archive/{month['filename']}"
+
+    store = store or NewsStore(os.path.join(data_dir, 'store'))
+    for entry in store.shards:
+        for item in store.read_shard(entry['id']):
+            yield item, f"store/{entry['filename']}"
+
+
+def write_if_changed(path, data, report=None):
+    """write_artifact() of `data`; returns False if the file already held exactly this content."""
+    unchanged = False
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            unchanged = f.read() == encode_json(data)
+    write_artifact(path, data, report)  # also restores missing siblings of an unchanged file
+    return not unchanged
+
+
+def gram_postings(docs, first=0, buckets=BUCKETS):
+    """Per-bucket {gram: [doc numbers]} for docs numbered from `first`."""
+    postings = [{} for _ in range(buckets)]
+    for n, doc in enumerate(docs, first):
+        for gram in char_ngrams(doc['title'] + ' ' + doc['summary']):
+            postings[gram_bucket(gram, buckets)].setdefault(gram, []).append(n)
+    return [dict(sorted(p.items())) for p in postings]
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading search manifest: {e}")
+        return None
+
+
+def sealed_buckets_current(previous, ordered, sealed, out_dir):
+    """True if grams_<b>.json already hold exactly the first `sealed` docs."""
+    if not previous or previous.get('buckets') != BUCKETS or previous.get('sealed') != sealed:
+        return False
+    # A doc inserted among the sealed ones (e.g. an older import) shifts this one
+    if previous.get('sealed_id') != (ordered[sealed - 1]['id'] if sealed else None):
+        return False
+    return all(os.path.exists(os.path.join(out_dir, f"grams_{b}.json")) for b in range(BUCKETS))
+
+
+def build_search_index(data_dir='data', out_dir=SEARCH_DIR, store=None, archive=None, report=None):
+    """Rebuilds the search index and category shards. Returns the manifest."""
+    # Collect unique docs (a title may exist in both a month file and the store)
+    docs = {}
+    for item, src in iter_archive_items(data_dir, store, archive):
+        key = item.get('id') or item_id(item)
+        docs[key] = {
+            "id": key,
+            "title": item.get('title', ''),
+            "category": item.get('category') or '',
+            "summary": item.get('summary', ''),
+            "published_at": item.get('published_at', ''),
+            "image_url": item.get('image_url', ''),
+            "src": src
+        }
+    ordered = sorted(docs.values(), key=lambda d: (d['published_at'], d['id']))
+
+    os.makedirs(out_dir, exist_ok=True)
+    changed = 0
+
+    # 1. Doc blocks
+    for start in range(0, len(ordered), BLOCK_SIZE):
+        changed += write_if_changed(
+            os.path.join(out_dir, f"docs_{start // BLOCK_SIZE}.json"),
+            ordered[start:start + BLOCK_SIZE], report
+        )
+
+    # 2. Category shards (newest first)
+    categories = []
+    for name, slug in FILTER_CATEGORIES:
+        doc_numbers = [n for n in range(len(ordered) - 1, -1, -1) if name in ordered[n]['category']]
+        changed += write_if_changed(
+            os.path.join(out_dir, f"category_{slug}.json"),
+            {"name": name, "count": len(doc_numbers), "docs": doc_numbers}, report
+        )
+        categories.append({"name": name, "slug": slug, "count": len(doc_numbers)})
+
+    # 3. Bigram postings: sealed docs bucketed by gram hash, the rest in one recent file
+    sealed = len(ordered) // BLOCK_SIZE * BLOCK_SIZE
+    bucket_paths = [os.path.join(out_dir, f"grams_{b}.json") for b in range(BUCKETS)]
+    if sealed_buckets_current(read_manifest(out_dir), ordered, sealed, out_dir):
+        for path in bucket_paths:
+            write_artifact_file(path, report)  # sizes only (and any missing sibling)
+    else:
+        for path, postings in zip(bucket_paths, gram_postings(ordered[:sealed])):
+            changed += write_if_changed(path, postings, report)
+    recent = gram_postings(ordered[sealed:], first=sealed, buckets=1)[0]
+    changed += write_if_changed(os.path.join(out_dir, "grams_recent.json"), recent, report)
+
+    manifest = {
+        "version": 2,
+        "doc_count": len(ordered),
+        "block_size": BLOCK_SIZE,
+        "buckets": BUCKETS,
+        "ngram": NGRAM,
+        "sealed": sealed,
+        "sealed_id": ordered[sealed - 1]['id'] if sealed else None,
+        "categories": categories
+    }
+    changed += write_if_changed(os.path.join(out_dir, "manifest.json"), manifest, report)
+    print(f"Search index: {len(ordered)} docs, {changed} files updated.")
+    return manifest
+
+
+if __name__ == "__main__":
+    build_search_index()
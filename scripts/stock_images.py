@@ -0,0 +1,125 @@
+"""
+Stock image matching.
+
+Items without a generated image get a photo from the tagged catalogue in
+stock_images.json (or STOCK_IMAGES_FILE). The catalogue is indexed once per
+run as a TF-IDF matrix: one L2-normalized row per image over the vocabulary
+of its tags, IDF counted across the catalogue. An item's query is its
+image_prompt, title and category: English words are matched as tokens,
+Korean tags as substrings (titles and categories carry particles and
+compounds, e.g. 국제경제). A single matrix product scores a whole batch
+against every image.
+
+The choice depends on the item and its batch, not on its place in the
+archive: images scoring within TIE_RATIO of the best are ranked by a hash of
+(item id, image URL), and the first one not already used in the batch wins.
+Adding an image to the catalogue only moves the items it now fits best.
+Items matching no tag get one of the catalogue's "default" images the same
+way.
+"""
+import hashlib
+import json
+import os
+import re
+
+from pipeline import lazy_import
+from storage import item_id
+
+CATALOGUE_FILE = os.environ.get(
+    "STOCK_IMAGES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "stock_images.json")
+)
+TIE_RATIO = 0.9
+
+_WORD = re.compile(r'[a-z0-9]+')
+_HANGUL = re.compile(r'[가-힣]')
+
+
+def _numpy():
+    return lazy_import("numpy")
+
+
+def load_catalogue(path=CATALOGUE_FILE):
+    """Catalogue images: [{url, label, tags, default?}]."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['images']
+
+
+def words(text):
+    """Lowercase English tokens, with a plural 's' dropped (barrels -> barrel)."""
+    tokens = []
+    for token in _WORD.findall((text or '').lower()):
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class StockImageIndex:
+    """TF-IDF index of the catalogue tags."""
+
+    def __init__(self, images=None):
+        np = _numpy()
+        self.images = load_catalogue() if images is None else images
+        docs = []
+        for image in self.images:
+            tags = [tag.lower() for tag in image['tags']]
+            docs.append([t for tag in tags if not _HANGUL.search(tag) for t in words(tag)] +
+                        [tag for tag in tags if _HANGUL.search(tag)])
+
+        terms = sorted({t for doc in docs for t in doc})
+        self.vocabulary = {t: i for i, t in enumerate(terms)}
+        self.korean_terms = [t for t in terms if _HANGUL.search(t)]
+
+        counts = np.zeros((len(docs), len(terms)))
+        for row, doc in enumerate(docs):
+            for term in doc:
+                counts[row, self.vocabulary[term]] += 1
+        df = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(docs)) / (1 + df)) + 1
+        matrix = counts * self.idf
+        self.matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self.defaults = [i for i, image in enumerate(self.images) if image.get('default')] or list(range(len(self.images)))
+
+    def _add_terms(self, row, text):
+        for token in words(text):
+            column = self.vocabulary.get(token)
+            if column is not None:
+                row[column] += 1
+        for term in self.korean_terms:
+            if term in text:
+                row[self.vocabulary[term]] += 1
+
+    def query_matrix(self, items):
+        """One L2-normalized TF-IDF row per item."""
+        np = _numpy()
+        queries = np.zeros((len(items), len(self.vocabulary)))
+        for row, item in enumerate(items):
+            text = " ".join(item.get(field) or '' for field in ('image_prompt', 'title', 'category'))
+            self._add_terms(queries[row], text)
+        queries *= self.idf
+        return queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+    def scores(self, items):
+        """(items x images) cosine similarities."""
+        return self.query_matrix(items) @ self.matrix.T
+
+    def _ranked(self, key, candidates):
+        return sorted(candidates, key=lambda i: hashlib.md5((key + self.images[i]['url']).encode('utf-8')).hexdigest())
+
+    def match(self, items):
+        """Catalogue URL for each item, in order."""
+        if not items:
+            return []
+        np = _numpy()
+        scores = self.scores(items)
+        used = set()
+        urls = []
+        for item, row in zip(items, scores):
+            best = row.max()
+            candidates = np.flatnonzero(row >= best * TIE_RATIO).tolist() if best > 0 else self.defaults
+            ranked = self._ranked(item.get('id') or item_id(item), candidates)
+            choice = next((i for i in ranked if i not in used), ranked[0])
+            used.add(choice)
+            urls.append(self.images[choice]['url'])
+        return urls
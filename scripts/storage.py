@@ -0,0 +1,223 @@
+"""
+Append-only news storage.
+
+Items live in JSON Lines shards, one file per day (data/store/YYYY-MM-DD.jsonl),
+plus a small manifest describing the shards. A run only appends its new items
+to the day shard and rewrites the manifest, so per-run I/O (and the size of the
+daily git commits) stays flat no matter how much history has accumulated.
+"""
+import json
+import os
+import hashlib
+from bisect import bisect_left
+from itertools import groupby
+
+STORE_DIR = "data/store"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def item_id(item):
+    """Stable ID for a news item: hash of the original link (title as fallback)."""
+    link = item.get('link') or ''
+    key = link if link.startswith('http') else item.get('title', '')
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def shard_id_for(item, default):
+    """Day shard an item belongs to, derived from 'published_at' (YYYY-MM-DD HH:MM:SS)."""
+    published_at = item.get('published_at') or ''
+    day = published_at[:10]
+    if len(day) == 10 and day[4] == '-' and day[7] == '-':
+        return day
+    return default
+
+
+def month_shard_id_for(item, default):
+    """Month shard (YYYY_MM) an item belongs to; `default` may be a day or a month id."""
+    return shard_id_for(item, default)[:7].replace('-', '_')
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """Writes JSON to a temp file and renames it into place."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+    os.replace(tmp_path, path)
+
+
+class NewsStore:
+    """
+    Day-sharded, append-only item store with a manifest.
+    `shard_of(item, default)` picks the shard; the monthly archive passes month_shard_id_for.
+    """
+
+    def __init__(self, root=STORE_DIR, shard_of=shard_id_for):
+        self.root = root
+        self.shard_of = shard_of
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        self._keys = {}  # shard id -> (bytes, keys) for known_keys()
+
+    # --- Manifest ---
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == MANIFEST_VERSION:
+                    return manifest
+                print(f"Unknown store manifest version: {manifest.get('version')}")
+            except Exception as e:
+                print(f"Error loading store manifest: {e}")
+        return {"version": MANIFEST_VERSION, "last_updated": None, "shards": []}
+
+    def save_manifest(self, timestamp=None):
+        os.makedirs(self.root, exist_ok=True)
+        if timestamp:
+            self.manifest['last_updated'] = timestamp
+        write_json_atomic(self.manifest_path, self.manifest, indent=1)
+
+    @property
+    def shards(self):
+        """Shard entries, oldest first."""
+        return self.manifest['shards']
+
+    def is_empty(self):
+        return not self.shards
+
+    def total_count(self):
+        return sum(s['count'] for s in self.shards)
+
+    def find_shard(self, shard_id):
+        for entry in self.shards:
+            if entry['id'] == shard_id:
+                return entry
+        return None
+
+    def shards_before(self, shard_id):
+        """Ids of the shards older than shard_id. Shards are kept sorted, so this is a bisect."""
+        ids = [s['id'] for s in self.shards]
+        return ids[:bisect_left(ids, shard_id)]
+
+    def _shard_entry(self, shard_id):
+        entry = self.find_shard(shard_id)
+        if entry:
+            return entry
+        entry = {
+            "id": shard_id,
+            "filename": f"{shard_id}.jsonl",
+            "count": 0,
+            "bytes": 0,
+            "first_published": None,
+            "last_published": None
+        }
+        self.shards.append(entry)
+        self.shards.sort(key=lambda s: s['id'])
+        return entry
+
+    def shard_path(self, shard_id):
+        return os.path.join(self.root, f"{shard_id}.jsonl")
+
+    # --- Writes ---
+    def append(self, items, default_shard):
+        """
+        Appends items to their shards (one line per item).
+        Items are expected to be new; dedup happens before calling this.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        buckets = {}
+        for item in items:
+            item.setdefault('id', item_id(item))
+            buckets.setdefault(self.shard_of(item, default_shard), []).append(item)
+
+        for shard_id, shard_items in buckets.items():
+            path = self.shard_path(shard_id)
+            with open(path, 'a', encoding='utf-8') as f:
+                for item in shard_items:
+                    f.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+            entry = self._shard_entry(shard_id)
+            entry['count'] += len(shard_items)
+            entry['bytes'] = os.path.getsize(path)
+            published = sorted(i.get('published_at', '') for i in shard_items)
+            if not entry['first_published'] or published[0] < entry['first_published']:
+                entry['first_published'] = published[0]
+            if not entry['last_published'] or published[-1] > entry['last_published']:
+                entry['last_published'] = published[-1]
+
+        return sum(len(v) for v in buckets.values())
+
+    def retire(self, shard_id):
+        """Removes a shard (after its items were moved to a monthly archive)."""
+        path = self.shard_path(shard_id)
+        if os.path.exists(path):
+            os.remove(path)
+        self.manifest['shards'] = [s for s in self.shards if s['id'] != shard_id]
+
+    # --- Reads ---
+    def read_shard(self, shard_id):
+        """Items of one shard in append order (oldest first)."""
+        path = self.shard_path(shard_id)
+        items = []
+        if not os.path.exists(path):
+            return items
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    items.append(json.loads(line))
+                except Exception as e:
+                    print(f"Skipping corrupt line {line_no} in {path}: {e}")
+        return items
+
+    def iter_latest(self):
+        """
+        Yields items newest first.
+        Runs are reversed, but items of one run (same 'published_at') keep
+        the order the model ranked them in.
+        """
+        for entry in reversed(self.shards):
+            items = self.read_shard(entry['id'])
+            batches = [list(g) for _, g in groupby(items, key=lambda i: i.get('published_at', ''))]
+            for batch in reversed(batches):
+                yield from batch
+
+    def latest(self, limit):
+        result = []
+        for item in self.iter_latest():
+            result.append(item)
+            if len(result) >= limit:
+                break
+        return result
+
+    def known_keys(self):
+        """
+        IDs and titles of everything in the store (for dedup of new items).
+        Keys are kept per shard and size, so a store that stays open (daemon.py)
+        only re-reads the shards that grew since the last call.
+        """
+        keys = set()
+        cache = {}
+        for entry in self.shards:
+            cached = self._keys.get(entry['id'])
+            if cached is None or cached[0] != entry.get('bytes'):
+                shard_keys = set()
+                for item in self.read_shard(entry['id']):
+                    shard_keys.add(item.get('id') or item_id(item))
+                    shard_keys.add(item.get('title', ''))
+                cached = (entry.get('bytes'), shard_keys)
+            cache[entry['id']] = cached
+            keys |= cached[1]
+        self._keys = cache
+        return keys
+
+    def import_items(self, items, default_shard):
+        """One-off migration of a legacy newest-first item list into the store."""
+        batches = [list(g) for _, g in groupby(items, key=lambda i: i.get('published_at', ''))]
+        count = 0
+        for batch in reversed(batches):
+            count += self.append(batch, default_shard)
+        return count
@@ -0,0 +1,541 @@
+"""
+Gemini news synthesis.
+
+synthesize() sends the headline prompt through the model failover chain.
+Replies are streamed and parsed incrementally: each item is validated as soon
+as its object closes, valid items are kept, and only missing ones are asked
+for again in a short follow-up call. Parsed results are kept in an on-disk, content-addressed ResponseCache keyed
+by (prompt, model, headline set), so a run whose inputs match an earlier run
+reuses the result without calling the API. The client is injected;
+FakeGenAIClient stands in for google-genai offline.
+
+The delta filter (headlines.py) keeps headlines that were already synthesized
+out of later prompts, so scheduled runs almost never repeat an input and the
+cache is not meant to hit between them. It serves a repeat of the same
+headlines: a re-run of a run that failed before its headlines were recorded,
+or a manual run before new headlines arrive.
+
+mode="map_reduce" (SYNTHESIS_MODE) splits the work instead: one short call
+writes the briefing and picks the stories by number, then every picked story
+is written up in its own request on a small worker pool. Latency follows the
+longest single article instead of the whole reply, and each article retries
+on its own, so a failure costs one item rather than the run.
+"""
+import json
+import os
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model_scheduler import ModelScheduler
+
+# Failover logic: Try Gemini 3 first, then fallback to 2.0 and 1.5
+MODELS_TO_TRY = [
+    'gemini-3-flash-preview',
+    'gemini-3-pro-preview',
+    'gemini-2.0-flash-exp', # Highly reliable experimental model
+    'gemini-1.5-flash',     # Stable and fast
+    'gemini-1.5-pro',       # High capability
+    'gemini-1.5-flash-8b'
+]
+
+CACHE_DIR = ".cache/synthesis"
+ARTICLE_WORKERS = 3  # concurrent article requests in map_reduce mode
+
+
+def build_prompt(raw_news):
+    return f"""
+            다음은 오늘 수집된 주요 경제 뉴스 목록입니다:
+            {json.dumps(raw_news, ensure_ascii=False)}
+
+            1. 위 기사들을 종합하여 오늘의 경제 흐름을 보여주는 '오늘의 한 줄 브리핑(briefing)'을 2~3문장으로 작성해줘.
+            2. 가장 중요도가 높은 뉴스를 최대 5개까지 엄선해서 'items' 목록으로 정리해줘.
+            3. 각 뉴스 아이템은 상세하고 알찬 기사 내용(content)으로 재구성해줘. (최소 3~4문단 이상)
+            4. 각 뉴스의 주제와 분위기를 나타내는 3~5개의 구체적인 영어 키워드(image_prompt)를 작성해줘. (예: 'Stock market, dynamic graph, blue neon, professional')
+            5. 각 뉴스 아이템에는 반드시 원본 데이터(raw_news)에 있던 정확한 원문 기사 링크 URL(link)을 포함해줘.
+
+            반드시 다음과 같은 JSON 형식으로만 응답해줘.
+            형식:
+            {{
+                "briefing": "오늘의 전체적인 경제 흐름 요약",
+                "items": [
+                    {{
+                        "title": "뉴스 제목",
+                        "source": "출처",
+                        "link": "https://... (원본 기사 URL 그대로 유지)",
+                        "category": "카테고리 (예: 금융, 테크, 시장, 정책 등 2~4글자)",
+                        "summary": "짧은 요약",
+                        "content": "상세 리포트 내용",
+                        "image_prompt": "Clean English Keywords"
+                    }}
+                ]
+            }}
+            """
+
+
+ITEMS_PER_RUN = 5
+REQUIRED_FIELDS = ("title", "link", "category", "summary", "content", "image_prompt")
+
+
+def build_followup_prompt(raw_news, have_items, missing_count, need_briefing):
+    """Asks only for what the first reply was missing."""
+    used_links = {item.get('link') for item in have_items}
+    # A briefing-only follow-up still needs every headline
+    remaining = [n for n in raw_news if n.get('link') not in used_links] if missing_count > 0 else raw_news
+    tasks = []
+    if need_briefing:
+        tasks.append("'오늘의 한 줄 브리핑(briefing)'을 2~3문장으로 작성해줘.")
+    if missing_count > 0:
+        tasks.append(f"위 목록에서 중요도가 높은 뉴스를 최대 {missing_count}개 골라 'items' 목록으로 정리해줘.")
+    return f"""
+            다음은 오늘 수집된 주요 경제 뉴스 목록입니다:
+            {json.dumps(remaining, ensure_ascii=False)}
+
+            이미 정리된 기사 제목(제외): {json.dumps([i.get('title') for i in have_items], ensure_ascii=False)}
+
+            {' '.join(tasks)}
+            각 아이템은 title, source, link, category(2~4글자), summary(짧은 요약), content(최소 3~4문단 이상의 상세 기사), image_prompt(3~5개의 영어 키워드)를 모두 포함해야 해.
+            link는 원본 데이터의 URL을 그대로 유지해줘.
+
+            반드시 {{"briefing": "...", "items": [...]}} 형식의 JSON으로만 응답해줘.
+            """
+
+
+def build_selection_prompt(raw_news, count=ITEMS_PER_RUN):
+    """map_reduce step 1: briefing plus the numbers of the stories to write up (a short reply)."""
+    numbered = [{"no": i, "title": n.get('title'), "source": n.get('source')} for i, n in enumerate(raw_news)]
+    return f"""
+            다음은 오늘 수집된 주요 경제 뉴스 목록입니다 (no = 번호):
+            {json.dumps(numbered, ensure_ascii=False)}
+
+            1. 위 기사들을 종합하여 오늘의 경제 흐름을 보여주는 '오늘의 한 줄 브리핑(briefing)'을 2~3문장으로 작성해줘.
+            2. 가장 중요도가 높은 뉴스를 최대 {count}개까지 골라 중요한 순서대로 번호(no)만 'selected'에 적어줘.
+
+            반드시 {{"briefing": "...", "selected": [번호, ...]}} 형식의 JSON으로만 응답해줘.
+            """
+
+
+def build_article_prompt(news, briefing):
+    """map_reduce step 2: one story written up in full."""
+    return f"""
+            다음 경제 뉴스를 상세하고 알찬 기사로 재구성해줘:
+            {json.dumps({"title": news.get('title'), "source": news.get('source')}, ensure_ascii=False)}
+
+            참고할 오늘의 경제 흐름: {briefing}
+
+            content는 최소 3~4문단 이상으로 작성하고, image_prompt에는 뉴스의 주제와 분위기를 나타내는 3~5개의 구체적인 영어 키워드를 적어줘.
+            반드시 다음과 같은 JSON 형식으로만 응답해줘.
+            {{
+                "title": "뉴스 제목",
+                "category": "카테고리 (예: 금융, 테크, 시장, 정책 등 2~4글자)",
+                "summary": "짧은 요약",
+                "content": "상세 리포트 내용",
+                "image_prompt": "Clean English Keywords"
+            }}
+            """
+
+
+def parse_json_reply(text):
+    """The JSON object in a reply; code fences and chatter around it are ignored."""
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in reply")
+    return json.loads(text[start:end + 1])
+
+
+def validate_item(item):
+    """Returns a list of schema problems (empty when the item is usable)."""
+    if not isinstance(item, dict):
+        return ["not an object"]
+    errors = []
+    for field in REQUIRED_FIELDS:
+        value = item.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f"missing {field}")
+    if isinstance(item.get('link'), str) and not item['link'].startswith('http'):
+        errors.append("link is not a URL")
+    return errors
+
+
+class StreamingItemParser:
+    """
+    Incremental scanner over a streamed {"briefing": ..., "items": [...]} reply.
+    feed() returns the raw JSON text of every item object completed by the chunk;
+    'briefing' is captured as soon as its string closes. Code fences and chatter
+    before the first '{' are ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.pending_string = None  # last complete string at root level
+        self.key = None             # current root-level key
+        self.items_depth = None     # depth inside the items array
+        self.item_start = None
+        self.briefing = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        completed = []
+        buf = self.buffer
+        while self.pos < len(buf):
+            i = self.pos
+            ch = buf[i]
+            self.pos += 1
+
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        literal = buf[self.string_start:i + 1]
+                        if self.key == 'briefing' and self.pending_string == ':':
+                            try:
+                                self.briefing = json.loads(literal)
+                            except ValueError:
+                                pass
+                        self.pending_string = literal
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch == ':' and self.depth == 1:
+                try:
+                    self.key = json.loads(self.pending_string) if self.pending_string else None
+                except ValueError:
+                    self.key = None
+                self.pending_string = ':'
+            elif ch == ',' and self.depth == 1:
+                self.pending_string = None
+            elif ch in '{[':
+                if ch == '[' and self.depth == 1 and self.key == 'items':
+                    self.items_depth = 2
+                elif ch == '{' and self.items_depth is not None and self.depth == self.items_depth:
+                    self.item_start = i
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if ch == '}' and self.item_start is not None and self.depth == self.items_depth:
+                    completed.append(buf[self.item_start:i + 1])
+                    self.item_start = None
+                elif ch == ']' and self.depth == 1:
+                    self.items_depth = None
+        return completed
+
+
+def stream_synthesis(client, model_name, prompt, limit=ITEMS_PER_RUN, exclude_links=()):
+    """
+    Streams one generate_content call and returns (briefing, valid_items, rejected).
+    Broken items are dropped individually instead of failing the whole reply.
+    """
+    parser = StreamingItemParser()
+    items, rejected = [], 0
+    seen_links = set(exclude_links)
+
+    for chunk in client.models.generate_content_stream(model=model_name, contents=prompt):
+        for raw_item in parser.feed(chunk.text or ''):
+            try:
+                item = json.loads(raw_item)
+            except ValueError as e:
+                print(f"  ⚠️ Dropping unparsable item from {model_name}: {e}")
+                rejected += 1
+                continue
+            errors = validate_item(item)
+            if errors or item['link'] in seen_links:
+                print(f"  ⚠️ Dropping invalid item from {model_name}: {', '.join(errors) or 'duplicate link'}")
+                rejected += 1
+                continue
+            seen_links.add(item['link'])
+            if len(items) < limit:
+                items.append(item)
+
+    return parser.briefing, items, rejected
+
+
+def headline_set(raw_news):
+    """Order-independent fingerprint of the input headlines."""
+    return sorted(f"{n.get('link', '')}\n{n.get('title', '')}" for n in raw_news)
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of parsed model results (hits only on a repeated
+    input, see the module docstring).
+    One JSON file per key; entries expire after `ttl` seconds and the oldest
+    are evicted once the directory exceeds `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=24 * 3600, max_bytes=5 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(prompt, model, raw_news):
+        digest = hashlib.sha256()
+        for part in (prompt, model, *headline_set(raw_news)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except Exception as e:
+            print(f"Dropping unreadable cache entry {key[:12]}: {e}")
+            os.remove(path)
+            return None
+        if time.time() - entry['created'] > self.ttl:
+            os.remove(path)
+            return None
+        return entry['result']
+
+    def put(self, key, model, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"created": time.time(), "model": model, "result": result}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Removes expired entries, then the oldest ones until under max_bytes."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        now = time.time()
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            stat = os.stat(path)
+            if now - stat.st_mtime > self.ttl:
+                os.remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenAIClient:
+    """
+    Offline stand-in for genai.Client.
+    responses: {model: reply text, Exception, a list of those served in turn,
+    or a callable prompt -> reply (for replies that depend on the request)};
+    models not listed raise a 503. latency: seconds, or {model: seconds}.
+    Streams are cut into `chunk_size` pieces.
+    """
+
+    def __init__(self, responses, latency=0, chunk_size=64):
+        self.responses = responses
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = []
+        self.models = self
+
+    def _next_reply(self, model, contents):
+        self.calls.append(model)
+        time.sleep(self.latency.get(model, 0) if isinstance(self.latency, dict) else self.latency)
+        reply = self.responses.get(model)
+        if isinstance(reply, list):
+            reply = reply.pop(0) if len(reply) > 1 else reply[0]
+        if callable(reply):
+            reply = reply(contents)
+        if reply is None:
+            raise RuntimeError("503 The model is overloaded.")
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def generate_content(self, model, contents, **kwargs):
+        return _FakeResponse(self._next_reply(model, contents))
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        reply = self._next_reply(model, contents)
+        for start in range(0, len(reply), self.chunk_size):
+            yield _FakeResponse(reply[start:start + self.chunk_size])
+
+
+def synthesize_with(client, model_name, prompt, raw_news):
+    """One model's attempt: streamed reply plus a follow-up for missing parts."""
+    briefing, items, rejected = stream_synthesis(client, model_name, prompt)
+    if not items:
+        raise ValueError(f"no valid items in reply ({rejected} rejected)")
+
+    # Re-request only what is missing instead of failing over
+    wanted = min(ITEMS_PER_RUN, len(raw_news))
+    if len(items) < wanted or not briefing:
+        print(f"  Requesting {max(wanted - len(items), 0)} missing items from {model_name}...")
+        try:
+            followup = build_followup_prompt(raw_news, items, wanted - len(items), not briefing)
+            extra_briefing, extra_items, _ = stream_synthesis(
+                client, model_name, followup, wanted - len(items),
+                exclude_links={item['link'] for item in items}
+            )
+            items += extra_items
+            briefing = briefing or extra_briefing
+        except Exception as followup_err:
+            print(f"  Follow-up failed, keeping {len(items)} items: {followup_err}")
+
+    result = {"items": items}
+    if briefing:
+        result["briefing"] = briefing
+    print(f"✅ Successfully synthesized {len(items)} items using {model_name}.")
+    return result
+
+
+# --- Map-reduce mode ---
+def select_stories(client, model_name, prompt, raw_news, count=ITEMS_PER_RUN):
+    """Selection call: returns (briefing, picked headlines in importance order)."""
+    reply = parse_json_reply(client.models.generate_content(model=model_name, contents=prompt).text or '')
+    briefing = reply.get('briefing')
+    if not isinstance(briefing, str) or not briefing.strip():
+        raise ValueError("selection reply has no briefing")
+    picks, seen = [], set()
+    for number in reply.get('selected') or []:
+        if isinstance(number, int) and 0 <= number < len(raw_news) and number not in seen:
+            seen.add(number)
+            picks.append(raw_news[number])
+    if not picks:
+        raise ValueError("selection reply picked no valid stories")
+    return briefing, picks[:count]
+
+
+def write_article(client, news, briefing, models, max_attempts=3, backoff=None, sleep=time.sleep):
+    """
+    One story's article. Each retry moves on to the next model; raises the
+    last error once max_attempts are used up. Link and source always come
+    from the headline, not from the model.
+    """
+    prompt = build_article_prompt(news, briefing)
+    last_error = None
+    for attempt in range(1, max_attempts + 1):
+        model_name = models[(attempt - 1) % len(models)]
+        if attempt > 1 and backoff:
+            sleep(backoff(attempt - 1))
+        try:
+            reply = parse_json_reply(client.models.generate_content(model=model_name, contents=prompt).text or '')
+            item = {
+                "title": reply.get('title') or news.get('title'),
+                "source": news.get('source', 'Unknown'),
+                "link": news.get('link'),
+                "category": reply.get('category'),
+                "summary": reply.get('summary'),
+                "content": reply.get('content'),
+                "image_prompt": reply.get('image_prompt')
+            }
+            errors = validate_item(item)
+            if errors:
+                raise ValueError(", ".join(errors))
+            return item
+        except Exception as e:
+            last_error = e
+            print(f"  ⚠️ Article '{news.get('title', '')[:30]}' failed on {model_name} (attempt {attempt}): {e}")
+    raise last_error
+
+
+def synthesize_map_reduce(client, raw_news, models, cache, max_attempts, scheduler, workers=ARTICLE_WORKERS):
+    """Selection call through the scheduler, then the articles in parallel. Same return value as synthesize()."""
+    prompt = build_selection_prompt(raw_news)
+    if cache is not None:
+        result = cache.get(cache.make_key(prompt, "map_reduce", raw_news))
+        if result is not None:
+            print("♻️ Reusing cached map-reduce synthesis.")
+            return result, "map_reduce"
+
+    (briefing, picks), model_name = scheduler.run(
+        lambda model: select_stories(client, model, prompt, raw_news),
+        models,
+        max_attempts
+    )
+    # Articles start on the model that just answered, then follow the scheduler's order
+    article_models = [model_name] + [m for m in scheduler.order(models) if m != model_name]
+
+    print(f"Writing {len(picks)} articles ({min(workers, len(picks))} at a time)...")
+    items, failed = [], 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(picks)))) as pool:
+        futures = [
+            pool.submit(write_article, client, news, briefing, article_models, max_attempts,
+                        scheduler.backoff, scheduler.sleep)
+            for news in picks
+        ]
+        # Collected in selection (importance) order
+        for news, future in zip(picks, futures):
+            try:
+                items.append(future.result())
+            except Exception as e:
+                failed += 1
+                print(f"❌ Dropping article '{news.get('title', '')[:30]}': {e}")
+    if not items:
+        raise Exception("Every article request failed.")
+
+    result = {"briefing": briefing, "items": items}
+    print(f"✅ Successfully synthesized {len(items)}/{len(picks)} articles ({failed} failed), led by {model_name}.")
+    # A partial result is not cached, so the next run retries the missing articles
+    if cache is not None and not failed:
+        cache.put(cache.make_key(prompt, "map_reduce", raw_news), model_name, result)
+    return result, model_name
+
+
+def synthesize(client, raw_news, models=None, cache=None, max_attempts=3, scheduler=None, mode="single"):
+    """
+    Returns (result, model_name) where result is the parsed
+    {"briefing": ..., "items": [...]} reply. Raises if every model failed.
+    Model order, backoff and hedging come from the ModelScheduler
+    (an in-memory one when none is passed). mode: "single" (one prompt for
+    everything) or "map_reduce" (selection call, then one request per article).
+    """
+    models = models or MODELS_TO_TRY
+    scheduler = scheduler or ModelScheduler(health_path=None)
+    if mode == "map_reduce":
+        return synthesize_map_reduce(client, raw_news, models, cache, max_attempts, scheduler)
+    prompt = build_prompt(raw_news)
+
+    # A run with the same prompt and headlines as an earlier one reuses its result
+    if cache is not None:
+        for model_name in models:
+            result = cache.get(cache.make_key(prompt, model_name, raw_news))
+            if result is not None:
+                print(f"♻️ Reusing cached synthesis from {model_name}.")
+                return result, model_name
+
+    result, model_name = scheduler.run(
+        lambda model: synthesize_with(client, model, prompt, raw_news),
+        models,
+        max_attempts
+    )
+    if cache is not None:
+        cache.put(cache.make_key(prompt, model_name, raw_news), model_name, result)
+    return result, model_name
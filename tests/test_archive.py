@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from archive import MonthArchive
+from fetch_news import open_store
+from pipeline import RunContext
+from storage import NewsStore
+
+
+def news(n, published_at):
+    return {"title": f"기사 {n}", "link": f"https://news.example.com/{n}", "published_at": published_at}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    # Legacy month file ends at 11:28 on 07-23; the store still has that day's later items
+    legacy = [news(n, "2026-07-23 11:28:18") for n in range(3)] + [news(3, "2026-07-22 09:00:00")]
+    with open(tmp_path / "archive_2026_07.json", 'w', encoding='utf-8') as f:
+        json.dump({"items": legacy}, f, ensure_ascii=False)
+    store = NewsStore(str(tmp_path / "store"))
+    store.append([news(n, "2026-07-23 15:00:00") for n in range(10, 25)], "2026-07-23")
+    store.append([news(n, "2026-07-24 09:00:00") for n in range(30, 35)], "2026-07-24")
+    store.save_manifest()
+    return tmp_path
+
+
+def test_migration_keeps_day_that_legacy_month_ends_in(data_dir):
+    store = NewsStore(str(data_dir / "store"))
+    archive = MonthArchive(str(data_dir / "archive"))
+    assert archive.import_legacy(str(data_dir)) == 4
+
+    moved, retired = archive.migrate(store, "2026-08-30")
+
+    assert (moved, retired) == (20, 2)
+    assert archive.total_count() == 24
+    titles = {item['title'] for item in archive.read_month("2026_07")}
+    assert {f"기사 {n}" for n in range(10, 25)} <= titles
+    assert archive.months[0]['days'] == ["2026-07-23", "2026-07-24"]
+
+
+def test_interrupted_migration_is_not_appended_twice(data_dir, monkeypatch):
+    store = NewsStore(str(data_dir / "store"))
+    archive = MonthArchive(str(data_dir / "archive"))
+    archive.import_legacy(str(data_dir))
+
+    def crash(shard_id):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(store, "retire", crash)
+    with pytest.raises(KeyboardInterrupt):
+        archive.migrate(store, "2026-08-30")
+    monkeypatch.undo()
+
+    # Next run: the month manifest says 07-23 was moved, so it is only retired
+    store = NewsStore(str(data_dir / "store"))
+    archive = MonthArchive(str(data_dir / "archive"))
+    moved, retired = archive.migrate(store, "2026-08-30")
+    assert (moved, retired) == (5, 2)
+    assert archive.total_count() == 24
+
+
+def test_legacy_full_archive_is_imported_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    for name in ("news_archive.json", "news.json"):
+        with open(f"data/{name}", 'w', encoding='utf-8') as f:
+            json.dump({"items": [news(n, "2026-07-22 09:00:00") for n in range(3)]}, f, ensure_ascii=False)
+
+    ctx = RunContext(store=None, archive=None, today_shard="2026-10-16")
+    open_store(ctx)
+    assert ctx.store.total_count() == 3
+    assert not os.path.exists("data/news_archive.json")
+
+    # Migration later moves every day shard out; news.json must not be imported again
+    ctx.archive.migrate(ctx.store, "2026-10-16")
+    ctx.store.save_manifest()
+    again = RunContext(store=None, archive=None, today_shard="2026-10-16")
+    open_store(again)
+    assert again.store.is_empty()
+    assert os.path.exists("data/news.json")
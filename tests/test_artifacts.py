@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from artifacts import SizeReport, verify_artifact, write_artifact, write_artifact_file
+
+DATA = {"last_updated": "2026-10-16 09:00:00", "items": [{"title": "반도체 수출 증가", "count": 3}] * 20}
+
+
+def test_gzip_round_trip(tmp_path):
+    path = str(tmp_path / "news.json")
+    sizes = write_artifact(path, DATA, formats=("gz",))
+
+    with open(path + ".gz", 'rb') as f:
+        assert json.loads(gzip.decompress(f.read()).decode('utf-8')) == DATA
+    assert sizes == {"json": os.path.getsize(path), "gz": os.path.getsize(path + ".gz")}
+    assert verify_artifact(path) == []
+
+
+def test_brotli_round_trip(tmp_path):
+    brotli = pytest.importorskip("brotli")
+    path = str(tmp_path / "news.json")
+    sizes = write_artifact(path, DATA, formats=("br",))
+
+    with open(path + ".br", 'rb') as f:
+        assert json.loads(brotli.decompress(f.read()).decode('utf-8')) == DATA
+    assert sizes["br"] == os.path.getsize(path + ".br")
+    assert verify_artifact(path) == []
+
+
+def test_msgpack_round_trip(tmp_path):
+    msgpack = pytest.importorskip("msgpack")
+    path = str(tmp_path / "news.json")
+    sizes = write_artifact(path, DATA, formats=("msgpack",))
+
+    with open(path + ".msgpack", 'rb') as f:
+        assert msgpack.unpackb(f.read(), raw=False) == DATA
+    assert sizes["msgpack"] == os.path.getsize(path + ".msgpack")
+    assert verify_artifact(path) == []
+
+
+def test_unchanged_file_is_not_rewritten_and_reports_same_sizes(tmp_path):
+    path = str(tmp_path / "news.json")
+    formats = ("gz", "br", "msgpack")
+    first = write_artifact(path, DATA, formats=formats)
+    mtimes = {ext: os.stat(path + ext).st_mtime_ns for ext in ("", ".gz")}
+
+    report = SizeReport(str(tmp_path / "size_report.jsonl"))
+    second = write_artifact(path, DATA, report, formats=formats)
+
+    assert second == first
+    assert report.artifacts[path] == first
+    assert {ext: os.stat(path + ext).st_mtime_ns for ext in ("", ".gz")} == mtimes
+
+
+def test_missing_sibling_is_written_again(tmp_path):
+    path = str(tmp_path / "news.json")
+    first = write_artifact(path, DATA, formats=("gz",))
+    os.remove(path + ".gz")
+
+    assert write_artifact(path, DATA, formats=("gz",)) == first
+    assert os.path.exists(path + ".gz")
+
+
+def test_changed_data_rewrites_siblings(tmp_path):
+    path = str(tmp_path / "news.json")
+    write_artifact(path, DATA, formats=("gz",))
+    changed = dict(DATA, last_updated="2026-10-16 12:00:00")
+
+    write_artifact(path, changed, formats=("gz",))
+
+    with open(path + ".gz", 'rb') as f:
+        assert json.loads(gzip.decompress(f.read()).decode('utf-8')) == changed
+
+
+def test_jsonl_month_shard_gets_siblings_once(tmp_path):
+    path = str(tmp_path / "2026_09.jsonl")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"title":"코스피 반등"}\n{"title":"환율 하락"}\n')
+
+    first = write_artifact_file(path, formats=("gz",))
+    mtime = os.stat(path + ".gz").st_mtime_ns
+    report = SizeReport(str(tmp_path / "size_report.jsonl"))
+
+    assert write_artifact_file(path, report, formats=("gz",)) == first
+    assert os.stat(path + ".gz").st_mtime_ns == mtime
+    assert report.artifacts[path] == first
+    assert verify_artifact(path) == []
+
+
+def test_appended_month_shard_gets_fresh_siblings(tmp_path):
+    path = str(tmp_path / "2026_10.jsonl")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"title":"코스피 반등"}\n')
+    write_artifact_file(path, formats=("gz",))
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"title":"기준금리 동결"}\n')
+    sizes = write_artifact_file(path, formats=("gz",))
+
+    assert sizes["json"] == os.path.getsize(path)
+    with open(path + ".gz", 'rb') as f:
+        assert gzip.decompress(f.read()).decode('utf-8').count('\n') == 2
+    assert verify_artifact(path) == []
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from archive import MonthArchive
+from benchmark import STORE_DAYS, build_archive, load_fixtures, run_size
+from storage import NewsStore
+
+
+def test_synthetic_archive_layout(tmp_path):
+    now = datetime(2026, 10, 16, 21, 0)
+
+    assert build_archive(str(tmp_path), 1000, now=now) == 1000
+
+    store = NewsStore(str(tmp_path / "store"))
+    archive = MonthArchive(str(tmp_path / "archive"))
+    assert store.total_count() + archive.total_count() == 1000
+    assert len(store.shards) == STORE_DAYS + 1  # the oldest day is due for migration
+    assert store.shards[-1]['id'] == "2026-10-16"
+
+
+def test_every_stage_runs_offline_on_the_fixtures():
+    result = run_size(300, load_fixtures(), trace_memory=False)
+
+    statuses = {r["stage"]: r["status"] for r in result["stages"]}
+    assert set(statuses.values()) == {"ok"}, statuses
+    items = {r["stage"]: r["items"] for r in result["stages"]}
+    assert items["merge"]["new_items"] > 0
+    assert items["market"]["indices"] > 0
+    assert items["images"]["images_done"] > 0
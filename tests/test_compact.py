@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+
+from archive import MonthArchive
+from compact import Compactor, JsonItemsReader, ShardSource
+from storage import NewsStore
+
+LEGACY = {
+    "last_updated": "2026-07-31 21:00:00",
+    "items": [
+        {"title": "코스피 \"2600\" 회복 {속보} [1]", "link": "https://news.example.com/1", "score": 12345.678e-3},
+        {"title": "환율\\n하락", "count": -1024, "ratio": 0.5, "tags": ["금융", {"nested": [1, 2]}], "empty": None},
+        {"title": "😀 이모지", "count": 7}
+    ],
+    "briefing": "오늘의 브리핑, \"인용\" 포함"
+}
+
+
+def news(n, published_at, **fields):
+    return dict({"title": f"기사 {n}", "link": f"https://news.example.com/{n}", "published_at": published_at}, **fields)
+
+
+def test_reader_matches_json_load_for_any_chunk_boundary(tmp_path):
+    path = tmp_path / "archive_2026_07.json"
+    path.write_text(json.dumps(LEGACY, ensure_ascii=False, indent=4), encoding='utf-8')
+
+    for chunk_size in (1, 2, 3, 5, 7, 11, 64):
+        reader = JsonItemsReader(str(path), chunk_size=chunk_size)
+
+        assert list(reader) == LEGACY["items"], chunk_size
+        assert reader.meta_before == {"last_updated": LEGACY["last_updated"]}
+        assert reader.meta_after == {"briefing": LEGACY["briefing"]}
+
+
+def test_reader_does_not_end_a_number_at_the_chunk_end(tmp_path):
+    path = tmp_path / "numbers.json"
+    path.write_text("[123456789, 2.5e10, -7]", encoding='utf-8')
+
+    assert list(JsonItemsReader(str(path), chunk_size=4)) == [123456789, 2.5e10, -7]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    archive = MonthArchive(str(tmp_path / "data" / "archive"))
+    archive.store.append([news(1, "2026-10-15 10:00:00"), news(2, "2026-10-15 10:00:00")], "2026_10")
+    archive.store.save_manifest()
+    store = NewsStore(str(tmp_path / "data" / "store"))
+    store.append([news(1, "2026-10-15 09:00:00", summary="먼저 발행"), news(3, "2026-10-15 09:00:00")], "2026-10-15")
+    store.append([news(2, "2026-10-15 10:00:00", summary="같은 시각"), news(4, "2026-10-16 09:00:00")], "2026-10-16")
+    store.save_manifest()
+    return tmp_path / "data"
+
+
+def stored(data_dir):
+    items = {}
+    for store in (MonthArchive(str(data_dir / "archive")).store, NewsStore(str(data_dir / "store"))):
+        for entry in store.shards:
+            for item in store.read_shard(entry['id']):
+                items.setdefault(item['title'], []).append((entry['id'], item.get('summary')))
+    return items
+
+
+def test_dedup_keeps_earliest_copy_and_first_source_on_ties(data_dir, tmp_path):
+    report = Compactor(["dedup"], str(data_dir), state_dir=str(tmp_path / "state")).run()
+
+    assert report["duplicates_dropped"] == 2
+    assert stored(data_dir) == {
+        "기사 1": [("2026-10-15", "먼저 발행")],  # published an hour before the archive copy
+        "기사 2": [("2026_10", None)],             # same time: the archive comes first
+        "기사 3": [("2026-10-15", None)],
+        "기사 4": [("2026-10-16", None)]
+    }
+    assert not os.path.exists(tmp_path / "state")
+
+
+def test_interrupted_run_resumes_without_redoing_written_sources(data_dir, tmp_path, monkeypatch):
+    state_dir = str(tmp_path / "state")
+    commit = ShardSource.commit
+    committed = []
+
+    def interrupt_second(self, *args):
+        if committed:
+            raise KeyboardInterrupt
+        committed.append(self.id)
+        commit(self, *args)
+
+    monkeypatch.setattr(ShardSource, "commit", interrupt_second)
+    with pytest.raises(KeyboardInterrupt):
+        Compactor(["dedup"], str(data_dir), state_dir=state_dir).run()
+    monkeypatch.undo()
+    assert not [f for f in os.listdir(data_dir / "store") if f.endswith(".tmp")]
+
+    report = Compactor(["dedup"], str(data_dir), state_dir=state_dir).run()
+
+    assert report["duplicates_dropped"] == 2
+    assert [title for title, copies in stored(data_dir).items() if len(copies) > 1] == []
+
+
+def test_interrupted_dry_run_removes_its_state(data_dir, monkeypatch):
+    compactor = Compactor(["dedup"], str(data_dir), dry_run=True)
+
+    def interrupt(sources):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(compactor, "rewrite", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        compactor.run()
+
+    assert not os.path.exists(compactor.state_dir)
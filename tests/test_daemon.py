@@ -0,0 +1,51 @@
+import os
+
+import daemon
+from daemon import WarmState, run_daemon
+from fetch_news import open_store
+from pipeline import Stage
+from storage import NewsStore
+
+
+def test_daemon_ticks_reuse_the_warm_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(daemon.signal, "signal", lambda signum, handler: None)
+    loads = []
+    load_manifest = NewsStore._load_manifest
+
+    def counting_load(self):
+        loads.append(self.root)
+        return load_manifest(self)
+
+    stores = []
+    monkeypatch.setattr(NewsStore, "_load_manifest", counting_load)
+    monkeypatch.setattr(daemon, "STAGES", [
+        Stage("store", open_store),
+        Stage("seen", lambda ctx: stores.append(ctx.store), after=("store",))
+    ])
+
+    run_daemon(interval=0.01, runs=3)
+
+    assert len(stores) == 3
+    assert stores[0] is stores[1] is stores[2]
+    assert loads.count(os.path.join("data", "store")) == 1
+
+
+def test_warm_state_reloads_after_another_process_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    made = []
+    warm = WarmState()
+
+    ctx = warm.context(make_client=lambda api_key: made.append(api_key) or object())
+    open_store(ctx)
+    client = ctx.make_client("key")
+    warm.keep(ctx)
+
+    again = warm.context(make_client=lambda api_key: made.append(api_key) or object())
+    assert again.store is ctx.store
+    assert again.make_client("key") is client
+    assert made == ["key"]
+
+    # e.g. a cron run or compact.py rewrote the store manifest
+    os.utime(os.path.join("data", "store", "manifest.json"), ns=(0, 0))
+    assert warm.context().store is None
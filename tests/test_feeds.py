@@ -0,0 +1,55 @@
+from feeds import FeedFetcher, LocalFeedServer
+
+
+def rss(*titles):
+    items = "".join(
+        f"<item><title>{title}</title><link>https://news.example.com/{n}</link>"
+        f"<source>연합뉴스</source><pubDate>Fri, 16 Oct 2026 09:00:00 +0900</pubDate></item>"
+        for n, title in enumerate(titles))
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>{items}</channel></rss>'.encode('utf-8')
+
+
+def fetcher(server, state_path, path="/economy"):
+    config = {"timeout": 5, "max_concurrency": 2, "per_feed": 20, "max_entries": 20,
+              "feeds": [{"name": "경제", "url": server.url(path), "weight": 1.0}]}
+    return FeedFetcher(config, state_path=str(state_path))
+
+
+def test_unchanged_feed_is_served_from_cache_on_304(tmp_path):
+    state_path = tmp_path / "feeds.json"
+    with LocalFeedServer({"/economy": rss("코스피 반등", "환율 하락")}) as server:
+        first = fetcher(server, state_path).fetch()
+
+        # New fetcher, as on the next run: the ETag comes from the saved state
+        again = fetcher(server, state_path)
+        second = again.fetch()
+
+    assert [status for _, status in server.requests] == [200, 304]
+    assert second == first
+    assert [e["title"] for e in second] == ["코스피 반등", "환율 하락"]
+    assert again.stats == {"ok": 0, "not_modified": 1, "failed": 0}
+
+
+def test_changed_feed_is_fetched_again(tmp_path):
+    state_path = tmp_path / "feeds.json"
+    feeds = {"/economy": rss("코스피 반등")}
+    with LocalFeedServer(feeds) as server:
+        fetcher(server, state_path).fetch()
+        feeds["/economy"] = rss("코스피 반등", "기준금리 동결")
+        entries = fetcher(server, state_path).fetch()
+
+    assert [status for _, status in server.requests] == [200, 200]
+    assert len(entries) == 2
+
+
+def test_failed_feed_falls_back_to_cached_entries(tmp_path):
+    state_path = tmp_path / "feeds.json"
+    feeds = {"/economy": rss("코스피 반등")}
+    with LocalFeedServer(feeds) as server:
+        first = fetcher(server, state_path).fetch()
+        del feeds["/economy"]
+        broken = fetcher(server, state_path)
+        entries = broken.fetch()
+
+    assert entries == first
+    assert broken.stats["failed"] == 1
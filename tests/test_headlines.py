@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+from fetch_news import append_to_store, filter_headlines, synthesize_news
+from headlines import HeadlineIndex, normalize_title
+from near_duplicates import NearDuplicateIndex
+from pipeline import PipelineRunner, RunContext, Stage
+from storage import NewsStore
+from synthesis import MODELS_TO_TRY, FakeGenAIClient
+
+HEADLINES = [
+    {"title": "코스피, 2600선 회복 - 연합뉴스", "source": "연합뉴스", "link": "https://news.example.com/1"},
+    {"title": "기준금리 동결 - 한국경제", "source": "한국경제", "link": "https://news.example.com/2"}
+]
+
+
+def reply():
+    items = [dict(h, category="시장", summary="요약", content="본문", image_prompt="Stock market") for h in HEADLINES]
+    return json.dumps({"briefing": "오늘의 브리핑", "items": items}, ensure_ascii=False)
+
+
+def test_outlet_suffix_and_punctuation_collide_but_wording_does_not():
+    assert normalize_title("코스피, 2600선 회복 - 연합뉴스") == normalize_title("코스피 2600선 회복! | 매일경제")
+    assert normalize_title("K-칩스법 국회 통과 - 연합뉴스") == "k칩스법국회통과"
+    assert normalize_title("코스피 2600선 회복") != normalize_title("코스피 2600선 붕괴")
+
+
+def test_filter_new_drops_known_and_repeated_headlines(tmp_path):
+    index = HeadlineIndex(str(tmp_path / "headlines.json"))
+    index.mark_seen([HEADLINES[0]])
+    batch = [
+        dict(HEADLINES[0], link="https://other.example.com/1", title="코스피 2600선 회복 - 매일경제"),
+        HEADLINES[1],
+        dict(HEADLINES[1], title="금리 동결 결정")  # same link, another wording
+    ]
+
+    assert index.filter_new(batch) == [HEADLINES[1]]
+
+
+def test_expired_and_seeded_keys_are_not_saved(tmp_path):
+    path = tmp_path / "headlines.json"
+    index = HeadlineIndex(str(path), retention_days=30)
+    index.mark_seen([HEADLINES[1]])
+    index.seen = {key: time.time() - 31 * 24 * 3600 for key in index.seen}
+    index.mark_seen([HEADLINES[0]])
+    index.add_store_keys({"환율 하락"})
+
+    index.save()
+
+    reloaded = HeadlineIndex(str(path))
+    assert reloaded.is_known(HEADLINES[0])
+    assert not reloaded.is_known(HEADLINES[1])
+    assert not reloaded.is_known({"title": "환율 하락"})
+
+
+def run_news_stages(tmp_path, append):
+    ctx = RunContext(
+        raw_news=[dict(h) for h in HEADLINES], seen_keys=set(), headline_index=None,
+        api_key="offline", make_client=lambda api_key: client, synthesis_mode="single",
+        store=NewsStore(str(tmp_path / "store")), today_shard="2026-10-16",
+        near_duplicates=NearDuplicateIndex(str(tmp_path / "near_duplicates.json")),
+        new_items=[dict(h, id=str(n)) for n, h in enumerate(HEADLINES)]
+    )
+    client = FakeGenAIClient({MODELS_TO_TRY[0]: reply()})
+    try:
+        PipelineRunner([
+            Stage("delta", filter_headlines),
+            Stage("synthesis", synthesize_news, after=("delta",)),
+            Stage("append", append, after=("synthesis",))
+        ], metrics_path=None).run(ctx)
+    except RuntimeError:
+        pass
+    return ctx, client
+
+
+def test_failed_run_leaves_headlines_unseen_until_stored(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def broken(ctx):
+        raise RuntimeError("disk full")
+
+    failed, _ = run_news_stages(tmp_path, broken)
+    assert len(failed.final_news) == 2
+    assert not os.path.exists(".cache/headlines.json")
+
+    # The re-run sends the same headlines again (served from the response cache)
+    rerun, client = run_news_stages(tmp_path, append_to_store)
+    assert len(rerun.raw_news) == 2
+    assert client.calls == []
+    assert all(HeadlineIndex().is_known(h) for h in HEADLINES)
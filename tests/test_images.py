@@ -0,0 +1,43 @@
+import os
+
+from images import ImageManifest, ImagePipeline, StubImageGenerator, resolve_feed_images
+from stock_images import StockImageIndex
+
+STOCK = [
+    {"url": "https://stock.example.com/chip.jpg", "label": "chip", "tags": ["semiconductor", "반도체"]},
+    {"url": "https://stock.example.com/city.jpg", "label": "city", "tags": ["economy"], "default": True}
+]
+
+
+def news(n, prompt):
+    return {"title": f"기사 {n}", "link": f"https://news.example.com/{n}", "image_prompt": prompt}
+
+
+def test_feed_uses_generated_image_only_while_its_file_exists(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pipeline = ImagePipeline(StubImageGenerator(), ImageManifest("data/news_images"), rate_per_minute=6000)
+    item = news(1, "semiconductor factory")
+    pipeline.enqueue([item])
+    assert pipeline.run()["done"] == 1
+
+    ai_image_url = pipeline.image_url(item)
+    stored = dict(item, image_url=STOCK[0]["url"], ai_image_url=ai_image_url)
+
+    card = dict(stored)
+    assert resolve_feed_images([card], pipeline) == 1
+    assert card["image_url"] == ai_image_url
+
+    # After the weekly cleanup the card falls back to the stored stock photo
+    os.remove(ai_image_url[2:])
+    card = dict(stored)
+    assert resolve_feed_images([card], pipeline) == 0
+    assert card["image_url"] == STOCK[0]["url"]
+
+
+def test_legacy_local_image_url_gets_stock_match(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy = dict(news(2, "semiconductor exports"), image_url="./data/news_images/news_gone.jpg")
+
+    resolve_feed_images([legacy], stock_images=StockImageIndex(STOCK))
+
+    assert legacy["image_url"] == STOCK[0]["url"]
@@ -0,0 +1,112 @@
+import math
+import os
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from market_data import FakeMarketSource, fetch_market_indices
+from market_series import SeriesStore, day_number, indicators, update_series
+
+
+def daily_bars(closes, highs=None, lows=None, first_day=20000):
+    highs = highs if highs is not None else [math.nan] * len(closes)
+    lows = lows if lows is not None else [math.nan] * len(closes)
+    return np.array([(first_day + n, c, h, l) for n, (c, h, l) in enumerate(zip(closes, highs, lows))])
+
+
+def test_moving_averages_of_a_linear_series():
+    result = indicators(daily_bars(list(range(1, 101))))
+
+    assert result["ma20"] == 90.5   # mean of 81..100
+    assert result["ma60"] == 70.5   # mean of 41..100
+    assert result["sparkline"] == [float(c) for c in range(71, 101)]
+
+
+def test_short_series_has_no_long_average():
+    result = indicators(daily_bars([10.0] * 30))
+
+    assert result["ma20"] == 10.0
+    assert result["ma60"] is None
+
+
+def test_volatility_of_constant_and_alternating_returns():
+    steady = indicators(daily_bars([100 * 1.01 ** n for n in range(40)]))
+    assert steady["volatility"] == 0.0
+
+    # 20 log returns of +-ln(1.1): mean 0, sample stdev ln(1.1) * sqrt(20 / 19)
+    swinging = indicators(daily_bars([100.0, 110.0] * 20 + [100.0]))
+    expected = math.log(1.1) * math.sqrt(20 / 19) * math.sqrt(252) * 100
+    assert swinging["volatility"] == round(expected, 2)
+
+
+def test_52_week_range_ignores_older_bars_and_falls_back_to_closes():
+    closes = [100.0] * 400
+    highs = [math.nan] * 400
+    lows = [math.nan] * 400
+    highs[10] = 500.0    # older than 365 days
+    highs[300] = 130.0
+    closes[350] = 80.0   # no low on that day: the close counts
+    result = indicators(daily_bars(closes, highs, lows))
+
+    assert result["high_52w"] == 130.0
+    assert result["low_52w"] == 80.0
+
+
+def test_no_bars_no_indicators():
+    assert indicators(np.empty((0, 4))) == {}
+
+
+def test_update_fetches_only_from_the_last_stored_day(tmp_path):
+    today = date(2026, 10, 16)  # a Friday
+    store = SeriesStore(str(tmp_path))
+    source = FakeMarketSource({"^KS11": [float(n) for n in range(1, 31)]}, today=today)
+
+    assert update_series(store, source, ["^KS11"], today=today) == {"fetched": 30, "added": 30}
+    # The last bar is refetched (intraday runs move it) and replaced in place
+    source.closes["^KS11"][-1] = 99.0
+    assert update_series(store, source, ["^KS11"], today=today) == {"fetched": 1, "added": 0}
+
+    bars = store.read("^KS11")
+    assert len(bars) == 30
+    assert bars[-1, 1] == 99.0
+    assert int(bars[-1, 0]) == day_number(today)
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+
+CONFIG = {"tickers": [{"name": "KOSPI", "symbol": "^KS11"}, {"name": "KOSDAQ", "symbol": "^KQ11"},
+                      {"name": "USD/KRW", "symbol": "KRW=X"}]}
+
+
+def test_failed_ticker_is_served_from_its_stored_series(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    closes = {"^KS11": [2500.0, 2550.0], "^KQ11": [800.0, 780.0], "KRW=X": [1350.0, 1350.0]}
+    fetch_market_indices(CONFIG, FakeMarketSource(closes), store)
+
+    # Next run: KOSDAQ fails, KOSPI moved
+    closes["^KS11"][-1] = 2600.0
+    source = FakeMarketSource(closes, failures={"^KQ11"})
+    indices = fetch_market_indices(CONFIG, source, store)
+
+    assert [(i["name"], i["value"], i["change"]) for i in indices] == [
+        ("KOSPI", "2,600.00", "▲ 4.00%"), ("KOSDAQ", "780.00", "▼ 2.50%"), ("USD/KRW", "1,350.00", "- 0.00%")
+    ]
+    assert {symbol for symbol, _ in source.calls} == {"^KS11", "^KQ11", "KRW=X"}
+
+
+def test_ticker_without_any_bars_is_skipped(tmp_path):
+    source = FakeMarketSource({"^KS11": [2500.0, 2550.0]}, failures={"KRW=X"})
+
+    indices = fetch_market_indices(CONFIG, source, SeriesStore(str(tmp_path)))
+
+    assert [i["name"] for i in indices] == ["KOSPI"]
+
+
+def test_empty_batch_returns_no_indices(tmp_path):
+    source = FakeMarketSource({})
+
+    assert fetch_market_indices(CONFIG, source, SeriesStore(str(tmp_path))) == []
+    assert len(source.calls) == 3
+    assert fetch_market_indices({"tickers": []}, source, SeriesStore(str(tmp_path))) == []
+    assert len(source.calls) == 3
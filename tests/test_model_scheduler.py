@@ -0,0 +1,54 @@
+import threading
+
+from model_scheduler import ModelScheduler
+
+
+def test_backoff_is_full_jitter():
+    low = ModelScheduler(health_path=None, base_delay=1.0, max_delay=30.0, rng=lambda: 0.0)
+    high = ModelScheduler(health_path=None, base_delay=1.0, max_delay=30.0, rng=lambda: 0.999)
+
+    assert low.backoff(3) == 0.0
+    assert 3.99 < high.backoff(3) < 4.0
+    assert high.backoff(10) < 30.0
+
+
+def test_losing_hedged_attempt_is_not_recorded():
+    started = threading.Event()
+    release = threading.Event()
+    finished = threading.Event()
+
+    def call(model):
+        if model == "slow":
+            started.set()
+            release.wait(5)
+            finished.set()
+        else:
+            started.wait(5)  # both requests are in flight
+        return f"article from {model}"
+
+    scheduler = ModelScheduler(health_path=None, hedge=True, deadline=5)
+    result, model = scheduler.run(call, ["fast", "slow"])
+    release.set()
+    assert finished.wait(5)
+
+    assert (result, model) == ("article from fast", "fast")
+    assert scheduler.health["models"]["fast"]["calls"] == 1
+    assert scheduler.health["models"]["slow"]["calls"] == 0
+
+
+def test_hedged_attempt_past_deadline_counts_once():
+    release = threading.Event()
+    finished = threading.Event()
+
+    def call(model):
+        release.wait(5)
+        finished.set()
+        raise RuntimeError("503 overloaded")
+
+    scheduler = ModelScheduler(health_path=None, hedge=True, deadline=0.05)
+    assert scheduler._hedged(call, ["a", "b"]) is None
+    release.set()
+    assert finished.wait(5)
+
+    assert scheduler.health["models"]["a"]["calls"] == 1
+    assert scheduler.health["models"]["b"]["calls"] == 1
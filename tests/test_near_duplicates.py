@@ -0,0 +1,78 @@
+import zlib
+from datetime import datetime
+
+from near_duplicates import _PERMUTATIONS, _PRIME, NearDuplicateIndex, minhash, shingles, similarity
+
+EARNINGS = {"id": "a", "title": "삼성전자, 3분기 영업이익 10조 돌파… 반도체 회복세",
+            "summary": "삼성전자가 3분기 잠정 영업이익 10조원을 기록하며 반도체 업황 회복을 확인했다.",
+            "published_at": "2026-10-16 09:00:00"}
+# Same story from another outlet: headline punctuation and one clause differ
+REWRITE = {"id": "b", "title": "삼성전자 3분기 영업이익 10조 돌파, 반도체 회복",
+           "summary": "삼성전자가 3분기 잠정 영업이익 10조원을 기록하며 반도체 업황 회복을 확인했다고 밝혔다.",
+           "published_at": "2026-10-16 10:00:00"}
+# Same company and vocabulary, different story
+OUTLOOK = {"id": "d", "title": "삼성전자, 4분기 영업이익 전망 하향… 반도체 회복 지연",
+           "summary": "증권가는 삼성전자의 4분기 영업이익 전망을 낮추며 반도체 업황 회복이 지연될 것으로 봤다.",
+           "published_at": "2026-10-16 11:00:00"}
+RATES = {"id": "c", "title": "한국은행, 기준금리 3.25%로 동결",
+         "summary": "한국은행 금융통화위원회가 물가와 환율 흐름을 지켜보겠다며 기준금리를 동결했다.",
+         "published_at": "2026-10-16 12:00:00"}
+
+
+def test_identical_text_has_identical_signature():
+    assert similarity(minhash(shingles(EARNINGS)), minhash(shingles(dict(EARNINGS, id="x")))) == 1.0
+
+
+def test_rewritten_story_is_duplicate():
+    index = NearDuplicateIndex(path=None)
+    index.add(EARNINGS)
+
+    verdict, match, _ = index.check(REWRITE)
+
+    assert (verdict, match) == ("duplicate", "a")
+
+
+def test_different_stories_are_new():
+    index = NearDuplicateIndex(path=None)
+    index.add(EARNINGS)
+
+    assert index.check(OUTLOOK)[0] == "new"
+    assert index.check(RATES)[:2] == ("new", None)
+
+
+def test_item_without_text_is_new():
+    index = NearDuplicateIndex(path=None)
+    index.add(EARNINGS)
+
+    assert index.check({"id": "e", "title": "", "summary": ""}) == ("new", None, None)
+
+
+def test_index_survives_save_and_reload(tmp_path):
+    path = str(tmp_path / "near_duplicates.json")
+    index = NearDuplicateIndex(path=path)
+    index.add(EARNINGS)
+    index.save(now=datetime(2026, 10, 16))
+
+    reloaded = NearDuplicateIndex(path=path)
+
+    assert reloaded.check(REWRITE)[:2] == ("duplicate", "a")
+
+
+def test_vectorized_minhash_matches_the_formula():
+    shingle_set = shingles(EARNINGS)
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+
+    assert minhash(shingle_set) == [min((a * x + b) % _PRIME for x in hashes) & 0xFFFFFFFF
+                                    for a, b in _PERMUTATIONS]
+
+
+def test_save_prunes_expired_entries_in_memory(tmp_path):
+    index = NearDuplicateIndex(path=str(tmp_path / "near_duplicates.json"), retention_days=60)
+    index.add(dict(EARNINGS, published_at="2026-07-01 09:00:00"))
+    index.add(RATES)
+
+    index.save(now=datetime(2026, 10, 16))
+
+    assert set(index.entries) == {"c"}
+    assert all(keys == ["c"] for keys in index.buckets.values())
+    assert index.check(REWRITE)[0] == "new"
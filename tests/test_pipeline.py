@@ -0,0 +1,178 @@
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import PipelineRunner, RunContext, Stage, lazy_import
+
+
+def run(stages, ctx=None, **kwargs):
+    ctx = ctx or RunContext()
+    runner = PipelineRunner(stages, metrics_path=None, **kwargs)
+    runner.run(ctx)
+    return ctx, {r["stage"]: r for r in runner.records}
+
+
+def test_late_optional_stage_result_is_dropped_after_fallback():
+    release = threading.Event()
+    finished = threading.Event()
+    seen = []
+
+    def slow_market(ctx):
+        release.wait(5)
+        finished.set()
+        return {"market_indices": ["late"]}
+
+    def previous(ctx):
+        ctx.market_indices = ["previous"]
+
+    def feed(ctx):
+        seen.append(list(ctx.market_indices))
+
+    ctx, records = run([
+        Stage("market", slow_market, optional=True, timeout=0.05, fallback=previous),
+        Stage("feed", feed, after=("market",))
+    ])
+    release.set()
+    assert finished.wait(5)
+
+    assert seen == [["previous"]]
+    assert ctx.market_indices == ["previous"]
+    assert records["market"]["status"] == "timeout"
+
+
+def test_returned_result_is_applied_before_dependents_start():
+    seen = []
+    ctx, _ = run([
+        Stage("market", lambda ctx: {"market_indices": ["KOSPI"]}, optional=True, fallback=lambda ctx: None),
+        Stage("feed", lambda ctx: seen.append(ctx.market_indices), after=("market",))
+    ])
+    assert seen == [["KOSPI"]]
+
+
+def test_failed_optional_stage_runs_fallback_and_run_is_degraded():
+    def broken(ctx):
+        raise RuntimeError("yfinance down")
+
+    def previous(ctx):
+        ctx.market_indices = []
+
+    ctx, records = run([Stage("market", broken, optional=True, fallback=previous)])
+
+    assert ctx.market_indices == []
+    assert records["market"]["status"] == "error"
+    assert "failed" in records["market"]["degraded"]
+
+
+def test_optional_stage_not_started_before_deadline_is_skipped():
+    release = threading.Event()
+
+    def slow(ctx):
+        release.wait(0.2)
+
+    fallbacks = []
+    _, records = run([
+        Stage("required", slow),
+        Stage("market", lambda ctx: None, after=("required",), optional=True,
+              fallback=lambda ctx: fallbacks.append("market"))
+    ], deadline=0.05)
+
+    assert records["required"]["status"] == "ok"
+    assert records["market"]["status"] == "skipped"
+    assert fallbacks == ["market"]
+
+
+def test_failing_required_stage_is_raised():
+    def broken(ctx):
+        raise ValueError("store unreadable")
+
+    with pytest.raises(ValueError):
+        run([Stage("store", broken), Stage("feed", lambda ctx: None, after=("store",))])
+
+
+def test_stages_start_after_their_dependencies():
+    events = []
+    lock = threading.Lock()
+
+    def stage(name):
+        def func(ctx):
+            with lock:
+                events.append(("start", name))
+            with lock:
+                events.append(("end", name))
+        return func
+
+    run([
+        Stage("feed", stage("feed"), after=("merge", "market")),
+        Stage("rss", stage("rss")),
+        Stage("market", stage("market")),
+        Stage("merge", stage("merge"), after=("rss",))
+    ], max_workers=4)
+
+    position = {event: n for n, event in enumerate(events)}
+    assert position[("end", "rss")] < position[("start", "merge")]
+    assert position[("end", "merge")] < position[("start", "feed")]
+    assert position[("end", "market")] < position[("start", "feed")]
+
+
+def test_independent_stages_overlap():
+    both_running = threading.Barrier(2, timeout=5)
+
+    def meet(ctx):
+        both_running.wait()  # BrokenBarrierError unless the two stages run at once
+
+    _, records = run([Stage("rss", meet), Stage("market", meet)], max_workers=2)
+
+    assert records["rss"]["status"] == records["market"]["status"] == "ok"
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        PipelineRunner([Stage("feed", lambda ctx: None, after=("missing",))], metrics_path=None)
+
+
+def test_counts_and_metrics_line(tmp_path):
+    path = tmp_path / "run_metrics.jsonl"
+    ctx = RunContext(timestamp="2026-10-16 09:00:00")
+
+    def merge(ctx):
+        ctx.count("new_items", 3)
+        with ctx.external("gemini"):
+            pass
+
+    PipelineRunner([Stage("merge", merge)], metrics_path=str(path)).run(ctx)
+
+    line = json.loads(path.read_text(encoding='utf-8'))
+    assert line["status"] == "ok"
+    assert line["stages"][0]["items"] == {"new_items": 3}
+    assert line["stages"][0]["external"]["gemini"]["calls"] == 1
+
+
+def test_lazy_import_time_goes_to_the_stage_that_first_imports(tmp_path, monkeypatch):
+    (tmp_path / "lazy_probe_stage.py").write_text("import time\ntime.sleep(0.02)\n")
+    (tmp_path / "lazy_probe_pool.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    path = tmp_path / "run_metrics.jsonl"
+
+    def load(ctx):
+        lazy_import("lazy_probe_stage")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(lazy_import, "lazy_probe_pool").result()
+
+    def again(ctx):
+        lazy_import("lazy_probe_stage")
+
+    try:
+        PipelineRunner([Stage("load", load), Stage("again", again, after=("load",))],
+                       metrics_path=str(path)).run(RunContext())
+    finally:
+        sys.modules.pop("lazy_probe_stage", None)
+        sys.modules.pop("lazy_probe_pool", None)
+
+    line = json.loads(path.read_text(encoding='utf-8'))
+    stages = {record["stage"]: record for record in line["stages"]}
+    assert stages["load"]["imports"]["lazy_probe_stage"] >= 0.02
+    assert "imports" not in stages["again"]  # already imported: not timed again
+    assert "lazy_probe_pool" in line["imports"]  # off the stage thread: the run's
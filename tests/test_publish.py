@@ -0,0 +1,49 @@
+import os
+
+from archive import MonthArchive
+from publish import Publisher, closed_paths, hashed_name, content_hash
+from storage import NewsStore
+
+
+def news(n, published_at):
+    return {"title": f"기사 {n}", "link": f"https://news.example.com/{n}", "published_at": published_at}
+
+
+def make_data(tmp_path):
+    store = NewsStore(str(tmp_path / "store"))
+    for day in ("2026-09-15", "2026-10-15", "2026-10-16"):
+        store.append([news(day + str(n), f"{day} 09:00:00") for n in range(3)], day)
+    store.save_manifest()
+    archive = MonthArchive(str(tmp_path / "archive"))
+    archive.store.import_items([news(n, "2026-08-10 09:00:00") for n in range(3)], "2026_08")
+    archive.store.import_items([news(n, "2026-09-10 09:00:00") for n in range(3, 6)], "2026_09")
+    archive.save()
+    return store, archive
+
+
+def test_only_closed_files_are_published(tmp_path):
+    store, archive = make_data(tmp_path)
+
+    paths = closed_paths(str(tmp_path), store, archive, today="2026-10-16")
+
+    # 2026_09 still receives 2026-09-15 when it leaves the store window
+    assert paths == ["store/2026-09-15.jsonl", "store/2026-10-15.jsonl", "archive/2026_08.jsonl"]
+
+
+def test_missing_sibling_is_restored_and_unchanged_run_keeps_manifest(tmp_path):
+    store, archive = make_data(tmp_path)
+    path = "archive/2026_08.jsonl"
+    paths = closed_paths(str(tmp_path), store, archive, today="2026-10-16")
+    first = Publisher(str(tmp_path)).publish(paths)
+    assert (first["written"], first["version"]) == (3, 1)
+
+    # A .gz written after the hashed copy existed is copied on the next run
+    with open(tmp_path / (path + ".gz"), 'wb') as f:
+        f.write(b"gz")
+    second = Publisher(str(tmp_path)).publish(paths)
+    name = hashed_name(path, content_hash(str(tmp_path / path)))
+    assert os.path.exists(tmp_path / (name + ".gz"))
+    assert (second["written"], second["unchanged"], second["version"]) == (1, 2, 1)
+
+    third = Publisher(str(tmp_path)).publish(paths)
+    assert (third["written"], third["version"]) == (0, 1)
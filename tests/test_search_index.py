@@ -0,0 +1,79 @@
+import json
+import os
+
+from archive import MonthArchive
+from search_index import BLOCK_SIZE, BUCKETS, build_search_index, char_ngrams, gram_bucket, normalize_text
+from storage import NewsStore
+
+
+def news(n, category="시장", day="2026-10-16"):
+    return {"title": f"반도체 수출 {n}호", "link": f"https://news.example.com/{n}", "category": category,
+            "summary": "요약", "published_at": f"{day} 09:{n // 60 % 60:02d}:{n % 60:02d}"}
+
+
+def build(tmp_path, items_by_day):
+    store = NewsStore(str(tmp_path / "store"))
+    for day, items in items_by_day.items():
+        store.append(items, day)
+    store.save_manifest()
+    out_dir = str(tmp_path / "search")
+    manifest = build_search_index(str(tmp_path), out_dir, store, MonthArchive(str(tmp_path / "archive")))
+    return manifest, out_dir
+
+
+def read(out_dir, name):
+    with open(os.path.join(out_dir, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def postings(out_dir, manifest, gram):
+    """Doc numbers for one gram, looked up the way searchNews() in app.js does."""
+    found = list(read(out_dir, "grams_recent.json").get(gram, []))
+    if manifest["sealed"]:
+        found += read(out_dir, f"grams_{gram_bucket(gram)}.json").get(gram, [])
+    return sorted(found)
+
+
+def test_tokenization_keeps_letters_and_digits_only():
+    assert normalize_text("삼성전자, 3분기 실적! (속보)") == "삼성전자3분기실적속보"
+    assert char_ngrams("AB c·d") == {"ab", "bc", "cd"}
+    assert char_ngrams("가") == set()
+
+
+def test_gram_bucket_matches_the_frontend():
+    # Values from gramBucket() in app.js (Math.imul FNV-1a over code points)
+    assert [gram_bucket(g) for g in ("반도", "ab", "𝟘1")] == [25, 10, 2]
+    assert all(0 <= gram_bucket(g) < BUCKETS for g in char_ngrams("코스피 2600선 회복"))
+
+
+def test_category_shards_list_matching_docs_newest_first(tmp_path):
+    manifest, out_dir = build(tmp_path, {"2026-10-16": [
+        news(0, "금융"), news(1, "테크"), news(2, "금융/증권"), news(3, "시장")
+    ]})
+
+    finance = read(out_dir, "category_finance.json")
+    assert finance == {"name": "금융", "count": 2, "docs": [2, 0]}
+    assert {c["slug"]: c["count"] for c in manifest["categories"]}["tech"] == 1
+
+
+def test_new_docs_only_rewrite_the_recent_grams(tmp_path):
+    items = [news(n) for n in range(BLOCK_SIZE + 1)]
+    manifest, out_dir = build(tmp_path, {"2026-10-15": items})
+    assert (manifest["sealed"], manifest["doc_count"]) == (BLOCK_SIZE, BLOCK_SIZE + 1)
+    mtimes = {b: os.stat(os.path.join(out_dir, f"grams_{b}.json")).st_mtime_ns for b in range(BUCKETS)}
+
+    manifest, _ = build(tmp_path, {"2026-10-16": [dict(news(BLOCK_SIZE + 1), title="환율 급등")]})
+
+    assert {b: os.stat(os.path.join(out_dir, f"grams_{b}.json")).st_mtime_ns for b in range(BUCKETS)} == mtimes
+    assert postings(out_dir, manifest, "반도") == list(range(BLOCK_SIZE + 1))
+    assert postings(out_dir, manifest, "환율") == [BLOCK_SIZE + 1]
+
+
+def test_doc_inserted_among_sealed_docs_rebuilds_the_buckets(tmp_path):
+    manifest, out_dir = build(tmp_path, {"2026-10-15": [news(n) for n in range(BLOCK_SIZE + 1)]})
+
+    older = dict(news(999, day="2026-09-01"), title="환율 급등")
+    manifest, _ = build(tmp_path, {"2026-09-01": [older]})
+
+    assert postings(out_dir, manifest, "환율") == [0]
+    assert postings(out_dir, manifest, "반도") == list(range(1, BLOCK_SIZE + 2))
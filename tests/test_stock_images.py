@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from stock_images import StockImageIndex
+
+CATALOGUE = [
+    {"url": "https://stock.example.com/chip-a.jpg", "label": "chip a", "tags": ["semiconductor", "wafer", "반도체"]},
+    {"url": "https://stock.example.com/chip-b.jpg", "label": "chip b", "tags": ["semiconductor", "wafer", "반도체"]},
+    {"url": "https://stock.example.com/oil.jpg", "label": "oil", "tags": ["oil", "barrel", "유가"]},
+    {"url": "https://stock.example.com/city.jpg", "label": "city", "tags": ["skyline"], "default": True},
+    {"url": "https://stock.example.com/desk.jpg", "label": "desk", "tags": ["office"], "default": True}
+]
+CHIPS = {CATALOGUE[0]["url"], CATALOGUE[1]["url"]}
+DEFAULTS = {CATALOGUE[3]["url"], CATALOGUE[4]["url"]}
+
+
+def news(n, title, image_prompt=""):
+    return {"id": f"news-{n}", "title": title, "image_prompt": image_prompt, "category": ""}
+
+
+def test_assignment_is_deterministic_and_independent_of_catalogue_order():
+    items = [news(n, f"기사 {n}", "Semiconductor wafers, factory") for n in range(4)]
+
+    first = StockImageIndex(CATALOGUE).match(items)
+
+    assert StockImageIndex(CATALOGUE).match(items) == first
+    assert StockImageIndex(list(reversed(CATALOGUE))).match(items) == first
+    assert set(first) == CHIPS
+
+
+def test_tied_images_are_spread_over_a_batch():
+    items = [news(n, f"기사 {n}", "semiconductor wafer") for n in range(2)]
+
+    assert set(StockImageIndex(CATALOGUE).match(items)) == CHIPS
+
+
+def test_item_matching_no_tag_gets_a_default_image():
+    urls = StockImageIndex(CATALOGUE).match([news(n, "기준금리 동결", "central bank") for n in range(3)])
+
+    assert set(urls) <= DEFAULTS
+    assert len(set(urls)) == 2
+
+
+def test_korean_tags_match_as_substrings():
+    index = StockImageIndex(CATALOGUE)
+
+    assert index.match([news(1, "국제유가 급등에 물가 우려")]) == [CATALOGUE[2]["url"]]
+    assert index.match([dict(news(2, "수출 회복"), category="반도체산업")])[0] in CHIPS
+
+
+def test_empty_batch():
+    assert StockImageIndex(CATALOGUE).match([]) == []
@@ -0,0 +1,191 @@
+import json
+import os
+import time
+
+import pytest
+
+from model_scheduler import ModelScheduler
+from synthesis import (FakeGenAIClient, ResponseCache, StreamingItemParser, stream_synthesis, synthesize,
+                       synthesize_with, validate_item, write_article)
+
+HEADLINES = [{"title": f"기사 {n}", "source": "연합뉴스", "link": f"https://news.example.com/{n}"} for n in range(3)]
+
+
+def article(n, **fields):
+    item = {"title": f"기사 {n}", "source": "연합뉴스", "link": f"https://news.example.com/{n}",
+            "category": "시장", "summary": "요약 {\"중괄호\"}", "content": "본문 [1] {2}",
+            "image_prompt": "Stock market, graph"}
+    item.update(fields)
+    return item
+
+
+def reply(items, briefing="오늘의 브리핑"):
+    body = {"briefing": briefing, "items": items} if briefing else {"items": items}
+    return "```json\n" + json.dumps(body, ensure_ascii=False) + "\n```"
+
+
+def test_parser_yields_the_same_items_for_any_chunk_boundary():
+    text = reply([article(0), article(1)])
+
+    for size in (1, 2, 7, 64, len(text)):
+        parser = StreamingItemParser()
+        raw = [r for start in range(0, len(text), size) for r in parser.feed(text[start:start + size])]
+
+        assert [json.loads(r) for r in raw] == [article(0), article(1)]
+        assert parser.briefing == "오늘의 브리핑"
+
+
+def test_malformed_item_is_dropped_and_the_rest_kept():
+    client = FakeGenAIClient({"m": reply([article(0), article(1, content=""), article(2, link="news/2")])},
+                             chunk_size=5)
+
+    briefing, items, rejected = stream_synthesis(client, "m", "prompt")
+
+    assert briefing == "오늘의 브리핑"
+    assert [item["link"] for item in items] == ["https://news.example.com/0"]
+    assert rejected == 2
+    assert validate_item(article(1, content="")) == ["missing content"]
+    assert validate_item(article(2, link="news/2")) == ["link is not a URL"]
+
+
+def test_followup_fills_in_missing_items_and_briefing():
+    prompts = []
+
+    def followup(prompt):
+        prompts.append(prompt)
+        # The model repeats a story it already wrote; only the new one is kept
+        return reply([article(0), article(2)], briefing="후속 브리핑")
+
+    client = FakeGenAIClient({"m": [reply([article(0)], briefing=None), followup]}, chunk_size=9)
+
+    result = synthesize_with(client, "m", "prompt", HEADLINES)
+
+    assert client.calls == ["m", "m"]
+    assert [item["link"] for item in result["items"]] == [f"https://news.example.com/{n}" for n in (0, 2)]
+    assert result["briefing"] == "후속 브리핑"
+    # The follow-up lists only the headlines still without an article
+    assert "https://news.example.com/0" not in prompts[0]
+    assert "최대 2개" in prompts[0]
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_cache_key_covers_prompt_model_and_headlines():
+    key = ResponseCache.make_key("prompt", "m", HEADLINES)
+
+    assert ResponseCache.make_key("prompt", "m", list(reversed(HEADLINES))) == key
+    assert ResponseCache.make_key("prompt", "other", HEADLINES) != key
+    assert ResponseCache.make_key("prompt 2", "m", HEADLINES) != key
+    assert ResponseCache.make_key("prompt", "m", HEADLINES[:2]) != key
+
+
+def test_expired_entry_is_a_miss_and_removed(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.put("k", "m", {"items": []})
+    assert cache.get("k") == {"items": []}
+
+    monkeypatch.setattr(time, "time", lambda: os.path.getmtime(tmp_path / "k.json") + 61)
+
+    assert cache.get("k") is None
+    assert not os.path.exists(tmp_path / "k.json")
+
+
+def test_oldest_entries_are_evicted_over_max_bytes(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for n, key in enumerate(("old", "mid", "new")):
+        cache.put(key, "m", {"items": [article(n)]})
+        age(tmp_path / f"{key}.json", 30 - n * 10)
+    sizes = {key: os.path.getsize(tmp_path / f"{key}.json") for key in ("old", "mid", "new")}
+
+    cache.max_bytes = sizes["mid"] + sizes["new"]
+    cache.evict()
+
+    assert sorted(os.listdir(tmp_path)) == ["mid.json", "new.json"]
+
+
+def test_repeated_input_is_served_from_cache_and_new_headline_is_not(tmp_path):
+    reply_text = reply([article(n) for n in range(3)])
+    cache = ResponseCache(str(tmp_path))
+
+    first = synthesize(FakeGenAIClient({"m": reply_text}), HEADLINES, models=["m"], cache=cache)
+    rerun = FakeGenAIClient({"m": reply_text})
+    assert synthesize(rerun, HEADLINES, models=["m"], cache=cache) == first
+    assert rerun.calls == []
+
+    # The next scheduled run only sends headlines the delta filter has not seen
+    later = FakeGenAIClient({"m": reply_text})
+    synthesize(later, HEADLINES[1:] + [dict(HEADLINES[0], title="새 기사")], models=["m"], cache=cache)
+    assert later.calls == ["m"]
+
+
+def map_reduce_model(broken=(), selected=(2, 0, 1)):
+    """Reply callable: the selection call, or an article unless its headline is in `broken`."""
+    def respond(prompt):
+        if '"selected"' in prompt:
+            return json.dumps({"briefing": "오늘의 브리핑", "selected": list(selected)}, ensure_ascii=False)
+        n = next(n for n in range(len(HEADLINES)) if f"기사 {n}" in prompt)
+        if n in broken:
+            return "죄송합니다, 지금은 답변할 수 없습니다."
+        fields = article(n)
+        return json.dumps({k: fields[k] for k in ("title", "category", "summary", "content", "image_prompt")},
+                          ensure_ascii=False)
+    return respond
+
+
+def run_map_reduce(client, cache=None):
+    scheduler = ModelScheduler(health_path=None, sleep=lambda seconds: None)
+    return synthesize(client, HEADLINES, models=["m"], cache=cache, scheduler=scheduler, mode="map_reduce")
+
+
+def test_map_reduce_writes_picked_stories_in_selection_order(tmp_path):
+    client = FakeGenAIClient({"m": map_reduce_model()})
+
+    result, model = run_map_reduce(client, ResponseCache(str(tmp_path)))
+
+    assert model == "m"
+    assert result["briefing"] == "오늘의 브리핑"
+    assert [item["link"] for item in result["items"]] == [f"https://news.example.com/{n}" for n in (2, 0, 1)]
+    assert len(client.calls) == 4  # one selection call, one per article
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_failed_article_costs_one_item_and_is_not_cached(tmp_path):
+    client = FakeGenAIClient({"m": map_reduce_model(broken={0})})
+
+    result, _ = run_map_reduce(client, ResponseCache(str(tmp_path)))
+
+    assert [item["link"] for item in result["items"]] == [f"https://news.example.com/{n}" for n in (2, 1)]
+    assert len(client.calls) == 1 + 2 + 3  # the broken article used all three attempts
+    # The next run asks again for the missing article
+    assert os.listdir(tmp_path) == []
+
+
+def test_article_retry_moves_to_the_next_model():
+    client = FakeGenAIClient({"bad": RuntimeError("503 The model is overloaded."), "good": map_reduce_model()})
+    waits = []
+
+    item = write_article(client, HEADLINES[1], "오늘의 브리핑", ["bad", "good"],
+                         backoff=lambda attempt: attempt, sleep=waits.append)
+
+    assert client.calls == ["bad", "good"]
+    assert waits == [1]
+    # Link and source come from the headline, not the reply
+    assert (item["link"], item["source"]) == (HEADLINES[1]["link"], "연합뉴스")
+
+
+def test_article_raises_after_every_attempt_fails():
+    client = FakeGenAIClient({"m": map_reduce_model(broken={1})})
+
+    with pytest.raises(ValueError):
+        write_article(client, HEADLINES[1], "오늘의 브리핑", ["m"], max_attempts=2)
+    assert client.calls == ["m", "m"]
+
+
+def test_map_reduce_fails_when_every_article_fails():
+    client = FakeGenAIClient({"m": map_reduce_model(broken={0, 1, 2})})
+
+    with pytest.raises(Exception, match="Every article request failed"):
+        run_map_reduce(client)